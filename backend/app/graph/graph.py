@@ -1,27 +1,310 @@
+import os
+import time
+from collections import Counter
 from langgraph.graph import StateGraph, END
-from app.models.state import DocGenState
+from langgraph.types import interrupt
+from app.models.state import DocGenState, DocGenFilePlan
 from app.graph.nodes.fetch_code import fetch_code
 from app.graph.nodes.parse_code import parse_code
-from app.graph.nodes.summarize_code import summarize_code_node
-from app.graph.nodes.add_docstrings import add_docstrings
+from app.graph.nodes.summarize_code import (
+    summarize_file, summarize_small_files, summarize_signatures, pack_small_files,
+)
+from app.graph.nodes.add_docstrings import comment_file
 from app.graph.nodes.generate_readme import generate_readme
 from app.graph.nodes.visualize_code import visualize_code_node
 from app.graph.nodes.output_node import output_node
+from app.utils.concurrency import map_ordered, FILE_CONCURRENCY
+from app.utils.progress import emit_progress
+from app.utils.manifest import manifest_key, load_records, load_commented, save_records, prune_records, file_hash
+from app.utils.metrics import timed_node
+from app.utils.blob_store import store_text, load_text, text_digest
+from app.utils.file_results import save_results, load_results
+from app.utils.scheduler import effective_budget, plan_treatments, FULL, SIGNATURE, SKIPPED
+
+# Files handled per graph step. Jobs are checkpointed after every step, so this
+# is the most work a crashed job redoes when it is resumed.
+FILE_BATCH_SIZE = int(os.getenv("DOCGEN_FILE_BATCH_SIZE", str(FILE_CONCURRENCY * 4)))
+# Every batch is a graph step, so LangGraph's default limit of 25 steps would
+# cap a job at a few hundred files.
+RECURSION_LIMIT = 100_000
+
+def _previous_record(previous_files: dict, file_path: str, current_hash: str) -> dict:
+    previous = previous_files.get(file_path)
+    return previous if previous and previous.get("hash") == current_hash else {}
+
+def plan_files(state: DocGenState) -> dict:
+    # Only the plan is returned: visualize_code may run in the same step, and
+    # two nodes writing a whole state at once would conflict.
+    if not state.parsed_data:
+        return {}
 
-def summarize_and_comment_node(state: DocGenState) -> DocGenState:
     repo_data = state.parsed_data.get("repo_path", {})
-    for file_path in repo_data.keys():
-        state.current_file_path = file_path
-        state = summarize_code_node(state)
-        state = add_docstrings(state)
-    return state
+    summarize = state.preferences.generate_summary
+    comment = state.preferences.add_inline_comments
+
+    planned_at = time.time()
+    previous_files = load_records(manifest_key(state))
+    file_paths = list(repo_data.keys())
+    hashes = {file_path: file_hash(repo_data[file_path]) for file_path in file_paths}
+
+    def needs_work(file_path):
+        previous = _previous_record(previous_files, file_path, hashes[file_path])
+        return (summarize and not previous.get("summary")) or (comment and previous.get("commented") is None)
+
+    # Only files that need LLM calls count against the job's budget. Everything
+    # is processed most important first, so a time budget cuts the tail.
+    budget = effective_budget(state.budget)
+    pending = [file_path for file_path in file_paths if needs_work(file_path)]
+    ranked, treatments = plan_treatments(repo_data, pending, budget, comment)
+    order = ranked + [file_path for file_path in file_paths if file_path not in treatments]
+
+    # Small files that need a fresh summary are summarized several to a request.
+    # The packs are only formed here; process_files sends them under the job's
+    # budget. A pack's files sit next to each other in the order, so a batch
+    # can send it whole.
+    packs = {}
+    if summarize:
+        fresh = [file_path for file_path in ranked if treatments[file_path] == FULL
+                 and not _previous_record(previous_files, file_path, hashes[file_path]).get("summary")]
+        for number, pack in enumerate(pack_small_files(fresh, repo_data)):
+            packs.update((file_path, number) for file_path in pack)
+        order = _group_packs(order, packs)
+
+    return {"file_plan": DocGenFilePlan(
+        order=order,
+        treatments=treatments,
+        hashes=hashes,
+        packs=packs,
+        max_seconds=budget.max_seconds,
+        planned_at=planned_at,
+    )}
+
+def _group_packs(order: list[str], packs: dict[str, int]) -> list[str]:
+    # Moves the rest of each pack up to its highest ranked file.
+    members = {}
+    for file_path in order:
+        if file_path in packs:
+            members.setdefault(packs[file_path], []).append(file_path)
+    grouped = []
+    for file_path in order:
+        if file_path not in packs:
+            grouped.append(file_path)
+        elif members[packs[file_path]][0] == file_path:
+            grouped.extend(members[packs[file_path]])
+    return grouped
+
+def process_files(state: DocGenState, comment: bool) -> dict:
+    """
+    Summarizes (and comments) the next FILE_BATCH_SIZE files of the plan. A
+    file that raises goes back to the front of the queue and is reported in
+    plan.failed instead of failing the batch. Returns the advanced plan, and
+    with the last batch every file's results.
+    """
+    if not state.parsed_data or state.file_plan is None or not state.file_plan.pending:
+        return {}
+    plan = state.file_plan.model_copy(deep=True)
 
-def summarize_only_node(state: DocGenState) -> DocGenState:
     repo_data = state.parsed_data.get("repo_path", {})
-    for file_path in repo_data.keys():
-        state.current_file_path = file_path
-        state = summarize_code_node(state)
-    return state
+    summarize = state.preferences.generate_summary
+    comment = comment and state.preferences.add_inline_comments
+
+    # A batch ends after the last file of its last pack.
+    end = min(FILE_BATCH_SIZE, len(plan.pending))
+    last_pack = plan.packs.get(plan.pending[end - 1])
+    while last_pack is not None and end < len(plan.pending) and plan.packs.get(plan.pending[end]) == last_pack:
+        end += 1
+    batch = plan.pending[:end]
+    key = manifest_key(state)
+    previous_files = load_records(key, batch)
+    started = time.monotonic()
+
+    def out_of_time():
+        return plan.max_seconds is not None and plan.elapsed + time.monotonic() - started > plan.max_seconds
+
+    # The batch's packs go out first, unless the deadline has already passed.
+    packed = {}
+    if summarize and not out_of_time():
+        packed = summarize_small_files([file_path for file_path in batch if file_path in plan.packs], repo_data)
+
+    def process(file_path):
+        file_info = repo_data[file_path]
+        current_hash = plan.hashes[file_path]
+        previous = _previous_record(previous_files, file_path, current_hash)
+        treatment = plan.treatments.get(file_path, FULL)
+        # Past the deadline no new LLM work starts. Files with nothing left to
+        # ask for (summary reused or already packed, comments reused) are not
+        # skipped, since skipping them would save nothing.
+        needs_summary = summarize and not previous.get("summary") and file_path not in packed
+        needs_comments = comment and previous.get("commented") is None
+        if treatment != SKIPPED and (needs_summary or needs_comments) and out_of_time():
+            treatment = SKIPPED
+        if treatment == SIGNATURE and not summarize:
+            treatment = SKIPPED
+
+        summary = None
+        if summarize:
+            summary = previous.get("summary")
+            if summary:
+                summary = tuple(summary)
+            elif treatment == FULL:
+                summary = packed.get(file_path) or summarize_file(file_path, file_info)
+            elif treatment == SIGNATURE:
+                summary = summarize_signatures(file_path, file_info)
+            else:
+                summary = packed.get(file_path)
+
+        commented = None
+        if comment:
+            if previous.get("commented") is not None:
+                commented = load_commented(previous["commented"])
+            if commented is None and treatment == FULL:
+                commented = comment_file(file_path, file_info)
+            if commented is not None:
+                # Only the handle is held until the merge below.
+                commented = store_text(state.workspace_id, commented)
+
+        return current_hash, previous, summary, commented, treatment
+
+    def attempt(file_path):
+        # The error reaches the job's event stream through report() and the
+        # interrupt that follows the batch.
+        try:
+            return process(file_path)
+        except Exception as e:
+            return e
+
+    completed = 0
+
+    def report(index, result):
+        nonlocal completed
+        if isinstance(result, Exception):
+            emit_progress({"type": "file", "file": batch[index], "error": str(result) or type(result).__name__})
+            return
+        completed += 1
+        summary = result[2]
+        emit_progress({
+            "type": "file",
+            "file": batch[index],
+            "done": plan.done + completed,
+            "total": len(plan.order),
+            "summary": summary[0] if summary else None,
+            "treatment": result[4],
+        })
+
+    results = map_ordered(attempt, batch, FILE_CONCURRENCY, on_result=report)
+
+    new_files = {}
+    new_texts = {}
+    new_results = {}
+    failed = {}
+    for file_path, result in zip(batch, results):
+        if isinstance(result, Exception):
+            failed[file_path] = str(result) or type(result).__name__
+            continue
+        current_hash, previous, summary, commented, treatment = result
+        new_results[file_path] = {"summary": summary, "commented": commented, "treatment": treatment}
+        if previous:
+            plan.reused += 1
+
+        record = {"hash": current_hash}
+        # Downgraded results are not kept, so the next run with room in its
+        # budget does the full treatment.
+        stored_summary = summary if summary is not None and treatment == FULL else previous.get("summary")
+        # Empty summaries mean every chunk failed, so retry them next run.
+        if stored_summary is not None and stored_summary[0]:
+            record["summary"] = list(stored_summary)
+        if commented is not None and key:
+            # The manifest keeps its own copy of the text; it outlives this
+            # job's blobs. Reused text is already there under its digest.
+            text = load_text(commented)
+            record["commented"] = text_digest(text)
+            if record["commented"] != previous.get("commented"):
+                new_texts[record["commented"]] = text
+        elif previous.get("commented") is not None:
+            record["commented"] = previous["commented"]
+        new_files[file_path] = record
+
+    # Results go to the job's own store rather than the state, so a checkpoint
+    # carries only the plan's position.
+    save_results(state.workspace_id, new_results)
+    plan.done += len(batch) - len(failed)
+    plan.elapsed += time.monotonic() - started
+    # Files from the retry list were at the front of the batch; the rest came
+    # from the order.
+    retried = min(len(plan.retry), len(batch))
+    plan.position += len(batch) - retried
+    plan.retry = list(failed) + plan.retry[retried:]
+    plan.failed = failed
+    finished = not plan.pending
+
+    file_paths = list(repo_data.keys())
+    if key:
+        # Only this batch's records are written.
+        save_records(key, new_files, new_texts)
+        if finished:
+            # Files that were deleted since the last run are not carried over.
+            prune_records(key, file_paths, plan.planned_at)
+            print(f"[Manifest] Reused {plan.reused}/{len(file_paths)} files from the previous run")
+
+    if not finished:
+        return {"file_plan": plan}
+
+    # Results arrive in rank order; put them back in repo order so the output
+    # matches a serial run.
+    saved = load_results(state.workspace_id)
+    update = {"file_plan": plan, "summaries": {}, "readme_summaries": {}, "modified_files": {}, "downgraded": {}}
+    for file_path in file_paths:
+        result = saved.get(file_path)
+        if result is None:
+            continue
+        if result["summary"] is not None:
+            update["summaries"][file_path], update["readme_summaries"][file_path] = result["summary"]
+        if result["commented"] is not None:
+            update["modified_files"][file_path] = result["commented"]
+        if result["treatment"] != FULL:
+            update["downgraded"][file_path] = result["treatment"]
+    if update["downgraded"]:
+        counts = Counter(update["downgraded"].values())
+        print(f"[Budget] Downgraded {len(update['downgraded'])}/{len(file_paths)} files: {dict(counts)}")
+        emit_progress({"type": "budget", "downgraded": dict(counts), "total": len(file_paths)})
+    return update
+
+def _failure_message(failed: dict) -> str:
+    shown = "; ".join(f"{file_path}: {error}" for file_path, error in list(failed.items())[:5])
+    return f"{len(failed)} files failed: {shown}"
+
+def files_failed(state: DocGenState) -> dict:
+    """
+    Pauses the job after a batch in which some files raised. The finished
+    files are already checkpointed; resuming the job retries the failed ones.
+    """
+    plan = state.file_plan
+    interrupt({"type": "files_failed", "failed": plan.failed, "message": _failure_message(plan.failed)})
+    return {"file_plan": plan.model_copy(update={"failed": {}})}
+
+def raise_files_failed(state: DocGenState) -> dict:
+    # Without a checkpointer there is nothing to resume, so the run fails.
+    raise RuntimeError(_failure_message(state.file_plan.failed))
+
+def summarize_and_comment_node(state: DocGenState) -> dict:
+    return process_files(state, comment=True)
+
+def summarize_only_node(state: DocGenState) -> dict:
+    return process_files(state, comment=False)
+
+def decide_branches(state: DocGenState) -> list[str]:
+    """
+    Fans out after parsing: the per-file stage (and the README built from its
+    summaries) and the structure diagram only need the parsed files, so they
+    run side by side. Branches the preferences don't ask for are skipped.
+    """
+    preferences = state.preferences
+    branches = []
+    if preferences.generate_summary or preferences.add_inline_comments or preferences.generate_readme:
+        branches.append("plan_files")
+    if preferences.visualize_structure:
+        branches.append("visualize_code")
+    return branches or ["output"]
 
 def decide_doc_summary_path(state: DocGenState) -> str:
     if state.preferences.add_inline_comments:
@@ -31,21 +314,42 @@ def decide_doc_summary_path(state: DocGenState) -> str:
         print("Path: summarize_only")
         return "summarize_only"
 
-def build_graph():
+def decide_next_batch(state: DocGenState) -> str:
+    plan = state.file_plan
+    if plan is not None and plan.failed:
+        return "files_failed"
+    if plan is not None and plan.pending:
+        return "summarize_and_comment" if state.preferences.add_inline_comments else "summarize_only"
+    return "generate_readme" if state.preferences.generate_readme else "output"
+
+def build_graph(checkpointer=None):
+    """
+    Compiles the documentation graph. With a checkpointer the state is saved
+    after every step, including each batch of files, and runs need a
+    thread_id in their config.
+    """
     builder = StateGraph(DocGenState)
-    builder.add_node("fetch_code", fetch_code)
-    builder.add_node("parse_code", parse_code)
-    builder.add_node("summarize_and_comment", summarize_and_comment_node)
-    builder.add_node("summarize_only", summarize_only_node)
-    builder.add_node("generate_readme", generate_readme)
-    builder.add_node("visualize_code", visualize_code_node)
-    builder.add_node("output", output_node)
+    builder.add_node("fetch_code", timed_node("fetch_code", fetch_code))
+    builder.add_node("parse_code", timed_node("parse_code", parse_code))
+    builder.add_node("plan_files", timed_node("plan_files", plan_files))
+    builder.add_node("summarize_and_comment", timed_node("summarize_and_comment", summarize_and_comment_node))
+    builder.add_node("summarize_only", timed_node("summarize_only", summarize_only_node))
+    builder.add_node("files_failed", timed_node("files_failed", files_failed if checkpointer else raise_files_failed))
+    builder.add_node("generate_readme", timed_node("generate_readme", generate_readme))
+    builder.add_node("visualize_code", timed_node("visualize_code", visualize_code_node))
+    # Deferred, so it runs once, after every branch that was started.
+    builder.add_node("output", timed_node("output", output_node), defer=True)
     builder.set_entry_point("fetch_code")
     builder.add_edge("fetch_code", "parse_code")
-    builder.add_conditional_edges("parse_code", decide_doc_summary_path)
-    builder.add_edge("summarize_and_comment", "generate_readme")
-    builder.add_edge("summarize_only", "generate_readme")
-    builder.add_edge("generate_readme", "visualize_code")
+    builder.add_conditional_edges("parse_code", decide_branches, ["plan_files", "visualize_code", "output"])
+    builder.add_conditional_edges("plan_files", decide_doc_summary_path)
+    # The per-file stage loops over batches until the plan is done.
+    for node in ("summarize_and_comment", "summarize_only", "files_failed"):
+        builder.add_conditional_edges(
+            node, decide_next_batch,
+            ["summarize_and_comment", "summarize_only", "files_failed", "generate_readme", "output"],
+        )
+    builder.add_edge("generate_readme", "output")
     builder.add_edge("visualize_code", "output")
     builder.add_edge("output", END)
-    return builder.compile()
+    return builder.compile(checkpointer=checkpointer).with_config(recursion_limit=RECURSION_LIMIT)
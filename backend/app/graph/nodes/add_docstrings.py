@@ -1,20 +1,25 @@
 import os
 import re
-import time
+import ast
+from typing import Optional
 from app.models.state import DocGenState
 from app.utils.mistral import get_llm_response_commenting
-import random
-
-CHUNK_SIZE = 300
-CHUNK_OVERLAP = 10
-
-def split_code_into_chunks(code: str, lines_per_chunk=CHUNK_SIZE, overlap=CHUNK_OVERLAP) -> list[str]:
-    lines = code.splitlines()
-    chunks = []
-    for i in range(0, len(lines), lines_per_chunk - overlap):
-        chunk = "\n".join(lines[i:i + lines_per_chunk])
-        chunks.append(chunk)
-    return chunks
+from app.utils.concurrency import map_ordered, PROVIDER_CONCURRENCY
+from app.utils.chunking import split_code_into_chunks
+from app.utils.comment_patch import (
+    number_lines, parse_insertions, resolve_anchor, render_comment, apply_insertions,
+)
+from app.graph.nodes.parse_code import get_parser
+from app.utils.blob_store import load_code, store_text
+
+# DOCGEN_COMMENT_MODE picks how inline comments are produced:
+#   "patch" (default): the model returns only the comments to insert, as JSON
+#       anchored to line numbers, and they are inserted locally; original lines
+#       are never rewritten and insertions that don't parse are dropped.
+#   "full": the model echoes every chunk back with the comments added. It
+#       costs about twice the output tokens and may alter code, so it is kept
+#       only for models that can't follow the JSON format.
+COMMENT_MODE = os.getenv("DOCGEN_COMMENT_MODE", "patch").lower()
 
 def build_file_prompt(lang: str, chunk_code: str) -> str:
     prompt = f"""You are a highly skilled, professional {lang} developer.
@@ -34,22 +39,168 @@ Start your output directly with the modified code.
 """
     return prompt
 
-def safe_llm_call(prompt: str, max_retries: int = 5, base_wait: float = 2.0) -> str:
-    for attempt in range(max_retries):
+def build_patch_prompt(lang: str, numbered_chunk: str) -> str:
+    prompt = f"""You are a highly skilled, professional {lang} developer.
+
+Your task: Decide where the following code needs docstrings or comments to clarify purpose, behavior, and improve understanding, and write them.
+
+⚠️ Very important instructions:
+- Do NOT return the code. Return ONLY a JSON array, one object per comment:
+  [{{"line": <line number>, "symbol": "<name of the function, class or variable on that line, or empty>", "comment": "<comment text>"}}]
+- "line" is the number shown at the left of the line the comment documents. For a function or class, use the line of its definition.
+- "comment" is plain text without comment markers; the markers are added for you.
+- Do NOT include any explanations, reasoning steps, markdown or ``` code fences.
+- Return [] if nothing needs a comment.
+
+### Code:
+{numbered_chunk}
+"""
+    return prompt
+
+def remove_think_blocks(text: str) -> str:
+    # Only blank lines are trimmed: a chunk can start inside a class body, and its
+    # leading indentation has to survive.
+    return re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL).strip("\n").rstrip() + "\n"
+
+def comment_file(file_path: str, file_data: dict) -> Optional[str]:
+    if COMMENT_MODE == "full":
+        return comment_file_full(file_path, file_data)
+    return comment_file_patch(file_path, file_data)
+
+def comment_file_full(file_path: str, file_data: dict) -> Optional[str]:
+    file_code = load_code(file_data)
+    if not file_code.strip():
+        return None
+
+    lang = os.path.splitext(file_path)[1].lstrip(".") or "text"
+    chunks = split_code_into_chunks(file_code, file_data.get("boundaries"))
+
+    def comment_chunk(indexed_chunk):
+        idx, chunk = indexed_chunk
+        print(f"Processing chunk {idx + 1}/{len(chunks)} for {file_path}")
+        prompt = build_file_prompt(lang, chunk)
         try:
-            return get_llm_response_commenting(prompt).strip()
+            result = get_llm_response_commenting(prompt)
+            return remove_think_blocks(result)
         except Exception as e:
-            wait_time = base_wait * (2 ** attempt) + random.uniform(0, 1)
-            if "429" in str(e) or "rate limit" in str(e).lower():
-                print(f"Rate limit hit or transient error. Retrying in {wait_time:.1f}s... (Attempt {attempt+1}/{max_retries})")
-                time.sleep(wait_time)
-            else:
-                print(f"LLM call failed: {e}")
-                raise
-    raise RuntimeError("LLM call failed after maximum retries.")
+            print(f"Error processing chunk {idx + 1} in {file_path}: {e}")
+            return None
+
+    results = map_ordered(comment_chunk, enumerate(chunks), PROVIDER_CONCURRENCY["mistralai"])
+    # Chunks no longer overlap, so a failed chunk keeps its original code.
+    updated_chunks = [result if result is not None else chunk for chunk, result in zip(chunks, results)]
+
+    return "".join(updated_chunks)
+
+def python_syntax_error_row(original_code: str, new_code: str) -> Optional[int]:
+    try:
+        compile(original_code, "<original>", "exec", ast.PyCF_ONLY_AST, dont_inherit=True)
+    except (SyntaxError, ValueError):
+        return None
+    try:
+        compile(new_code, "<commented>", "exec", ast.PyCF_ONLY_AST, dont_inherit=True)
+    except (SyntaxError, ValueError) as e:
+        return (getattr(e, "lineno", None) or 1) - 1
+    return None
+
+def invalid_insert_positions(lang_key: str, original_code: str, new_code: str, ranges) -> Optional[set]:
+    """
+    Re-parses the commented code and returns the insert positions whose lines
+    did not come out as comments or docstrings (e.g. because they landed inside
+    a string literal). Returns None if the insertions broke the parse as a whole.
+    """
+    parser = get_parser(lang_key)
+    if parser is None:
+        return set()
+
+    original_tree = parser.parse(original_code.encode("utf-8"))
+    new_tree = parser.parse(new_code.encode("utf-8"))
+    if new_tree.root_node.has_error and not original_tree.root_node.has_error:
+        return None
+
+    new_lines = new_code.splitlines()
+    invalid = set()
+    if lang_key == "python":
+        # tree-sitter accepts a few things CPython does not, such as a comment
+        # line after a backslash continuation.
+        error_row = python_syntax_error_row(original_code, new_code)
+        if error_row is not None:
+            # Blame the insertion at or closest above the reported line.
+            preceding = [position for position, first, last in ranges if first <= error_row]
+            if not preceding:
+                return None
+            invalid.add(preceding[-1])
+    for position, first, last in ranges:
+        for row in range(first, last + 1):
+            text = new_lines[row]
+            start_col = len(text.encode("utf-8")) - len(text.lstrip().encode("utf-8"))
+            node = new_tree.root_node.descendant_for_point_range((row, start_col), (row, len(text.encode("utf-8"))))
+            while node is not None and not ("comment" in node.type or node.type == "string"):
+                node = node.parent
+            if node is None or node.start_point[0] < first or node.end_point[0] > last:
+                invalid.add(position)
+                break
+    return invalid
+
+def comment_file_patch(file_path: str, file_data: dict) -> Optional[str]:
+    file_code = load_code(file_data)
+    if not file_code.strip():
+        return None
 
-def remove_think_blocks(text: str) -> str:
-    return re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL).strip()
+    lang = os.path.splitext(file_path)[1].lstrip(".") or "text"
+    chunks = split_code_into_chunks(file_code, file_data.get("boundaries"))
+    lines = file_code.splitlines(keepends=True)
+
+    first_lines = []
+    line_number = 1
+    for chunk in chunks:
+        first_lines.append(line_number)
+        line_number += len(chunk.splitlines())
+
+    def comment_chunk(indexed_chunk):
+        idx, chunk = indexed_chunk
+        print(f"Processing chunk {idx + 1}/{len(chunks)} for {file_path}")
+        first_line = first_lines[idx]
+        last_line = first_line + len(chunk.splitlines()) - 1
+        prompt = build_patch_prompt(lang, number_lines(chunk, first_line))
+        try:
+            insertions = parse_insertions(get_llm_response_commenting(prompt))
+        except Exception as e:
+            print(f"Error processing chunk {idx + 1} in {file_path}: {e}")
+            return []
+        anchored = []
+        for insertion in insertions:
+            index = resolve_anchor(lines, insertion, first_line, last_line)
+            if index is not None:
+                anchored.append((index, insertion["comment"]))
+        return anchored
+
+    results = map_ordered(comment_chunk, enumerate(chunks), PROVIDER_CONCURRENCY["mistralai"])
+
+    placed = []
+    seen = set()
+    for index, comment in (item for anchored in results for item in anchored):
+        if index in seen:
+            continue
+        seen.add(index)
+        rendered = render_comment(lines, index, comment, lang)
+        if rendered is not None:
+            placed.append(rendered)
+
+    # Each round drops the insertions that failed to validate; a Python syntax
+    # error only points at one of them at a time.
+    for _ in range(len(placed) + 1):
+        new_code, ranges = apply_insertions(file_code, placed)
+        invalid = invalid_insert_positions(file_data.get("type", ""), file_code, new_code, ranges)
+        if not invalid:
+            break
+        print(f"Dropping {len(invalid)} comment(s) that don't parse as comments in {file_path}")
+        placed = [item for item in placed if item[0] not in invalid]
+    if invalid is None or invalid:
+        print(f"Comments could not be applied cleanly to {file_path}, keeping it unchanged")
+        return file_code
+
+    return new_code
 
 def add_docstrings(state: DocGenState) -> DocGenState:
     print("Inside DocStrings")
@@ -63,30 +214,13 @@ def add_docstrings(state: DocGenState) -> DocGenState:
     if not file_data:
         return state
 
-    file_code = file_data.get("code", "")
-    if not file_code.strip():
+    final_code = comment_file(file_path, file_data)
+    if final_code is None:
         return state
 
-    lang = os.path.splitext(file_path)[1].lstrip(".") or "text"
-    chunks = split_code_into_chunks(file_code)
-
-    updated_chunks = []
-
-    for idx, chunk in enumerate(chunks):
-        print(f"Processing chunk {idx + 1}/{len(chunks)} for {file_path}")
-        prompt = build_file_prompt(lang, chunk)
-        try:
-            result = safe_llm_call(prompt)
-            cleaned_result = remove_think_blocks(result)
-            updated_chunks.append(cleaned_result)
-        except Exception as e:
-            print(f"Error processing chunk {idx + 1} in {file_path}: {e}")
-
-    final_code = "\n\n".join(updated_chunks)
-
     if not state.modified_files:
         state.modified_files = {}
 
-    state.modified_files[file_path] = final_code
+    state.modified_files[file_path] = store_text(state.workspace_id, final_code)
 
     return state
@@ -1,24 +1,28 @@
-import random
-import tempfile
 from app.models.state import DocGenState
-from app.utils.file_ops import clone_github_repo, extract_zip_file
+from app.utils.file_ops import clone_github_repo
+from app.utils.workspace import workspace_manager
 
 def fetch_code(state: DocGenState) -> DocGenState:
-    no = random.randint(1, 10000000)
-    path = f"{no}"
-    custom_clone_path = path
+    # Every job needs a workspace for its blobs. The job runner allocates one
+    # up front; this covers graphs run directly.
+    if state.workspace_id is None:
+        state.workspace_id = workspace_manager.create().id
 
     if state.input_type == "github":
+        state.repo_url = state.input_data
         if state.branch:
-            state.working_dir = {"repo_path": clone_github_repo(state.input_data, custom_clone_path, branch=state.branch)}
+            state.working_dir = {"repo_path": clone_github_repo(state.input_data, branch=state.branch)}
         else:
-            state.working_dir = {"repo_path": clone_github_repo(state.input_data, custom_clone_path)}
+            state.working_dir = {"repo_path": clone_github_repo(state.input_data)}
     elif state.input_type == "zip":
-        extracted_path = extract_zip_file(state.input_data, custom_clone_path)
-        state.working_dir = {"repo_path": extracted_path}
+        # input_data is the path of the archive saved by the upload handler;
+        # parse_code reads members from it directly.
+        state.working_dir = {"repo_path": state.input_data}
     elif state.input_type == "upload":
         state.working_dir = state.input_data
     else:
         raise ValueError(f"Unsupported input_type: {state.input_type}")
 
+    # Everything later stages need is in working_dir (and repo_url) now.
+    state.input_data = None
     return state
@@ -1,9 +1,17 @@
 import os
 import re
-import time
-import random
 from app.models.state import DocGenState
 from app.utils.mistral import get_llm_response_readme
+from app.utils.manifest import manifest_key, load_readme, save_readme, content_hash
+from app.utils.concurrency import map_ordered, PROVIDER_CONCURRENCY
+from app.utils.tokens import count_tokens
+from app.utils.metrics import log_payload
+
+PARTIAL_CHUNK_CHARS = 6000
+# Token budget for the merged Code Summary placed in the final README prompt,
+# leaving room in the model's context for the instructions and the answer.
+README_SUMMARY_TOKEN_BUDGET = int(os.getenv("DOCGEN_README_SUMMARY_TOKENS", "8000"))
+MAX_REDUCE_LEVELS = 6
 
 def clean_llm_markdown_response(raw_response: str) -> str:
     cleaned = re.sub(r"<think>.*?</think>", "", raw_response, flags=re.DOTALL).strip()
@@ -11,20 +19,6 @@ def clean_llm_markdown_response(raw_response: str) -> str:
     cleaned = re.sub(r"\n?```$", "", cleaned)
     return cleaned.strip()
 
-def safe_llm_call(callable_fn, prompt: str, retries: int = 5, base_delay: int = 5) -> str:
-    for attempt in range(1, retries + 1):
-        try:
-            return callable_fn(prompt).strip()
-        except Exception as e:
-            if "429" in str(e):
-                delay = base_delay * (2 ** (attempt - 1)) + random.uniform(0, 3)
-                print(f"[429 Rate Limit] Retrying in {delay:.1f}s... (Attempt {attempt}/{retries})")
-                time.sleep(delay)
-            else:
-                print(f"[LLM Error] {e}")
-                raise
-    raise Exception("Max retries exceeded for LLM call")
-
 def chunk_summaries(summaries, max_chars=6000):
     chunks = []
     current_chunk = []
@@ -32,7 +26,7 @@ def chunk_summaries(summaries, max_chars=6000):
 
     for s in summaries:
         s_len = len(s)
-        if current_len + s_len > max_chars:
+        if current_chunk and current_len + s_len > max_chars:
             chunks.append("\n\n".join(current_chunk))
             current_chunk = [s]
             current_len = s_len
@@ -45,6 +39,55 @@ def chunk_summaries(summaries, max_chars=6000):
 
     return chunks
 
+def summarize_partial(chunk_text: str) -> str:
+    partial_prompt = f"""
+You are an expert technical writer.
+
+Generate only a **Code Summary** section in markdown based on these summaries. Do not include any other sections, no title, no folder structure. Only return the "Code Summary" section.
+
+---
+{chunk_text}
+---
+"""
+    return clean_llm_markdown_response(get_llm_response_readme(partial_prompt))
+
+def merge_partials(chunk_text: str) -> str:
+    merge_prompt = f"""
+You are an expert technical writer.
+
+Merge the following partial **Code Summary** sections into a single, shorter **Code Summary** section in markdown. Keep every component, API endpoint and key detail, remove repetition, and group related files together. Do not include any other sections. Only return the "Code Summary" section.
+
+---
+{chunk_text}
+---
+"""
+    return clean_llm_markdown_response(get_llm_response_readme(merge_prompt))
+
+def reduce_code_summaries(sections: list[str]) -> str:
+    """
+    Tree-reduces partial Code Summary sections, merging neighbours in parallel
+    level by level until the result fits the final README prompt's budget.
+    """
+    level = 0
+    while len(sections) > 1 and count_tokens("\n\n".join(sections)) > README_SUMMARY_TOKEN_BUDGET:
+        if level >= MAX_REDUCE_LEVELS:
+            break
+        groups = chunk_summaries(sections, max_chars=PARTIAL_CHUNK_CHARS)
+        if len(groups) == len(sections):
+            # Every section already fills a chunk on its own; pair them up so
+            # each level still halves the count.
+            groups = ["\n\n".join(sections[i:i + 2]) for i in range(0, len(sections), 2)]
+        level += 1
+        print(f"[README] Reduce level {level}: merging {len(sections)} sections into {len(groups)}")
+        sections = map_ordered(merge_partials, groups, PROVIDER_CONCURRENCY["groq"])
+
+    merged = "\n\n".join(sections)
+    max_chars = README_SUMMARY_TOKEN_BUDGET * 4
+    if count_tokens(merged) > README_SUMMARY_TOKEN_BUDGET:
+        print(f"[README] Code summary still over budget after {level} levels, truncating")
+        merged = merged[:max_chars]
+    return merged
+
 def generate_readme(state: DocGenState) -> DocGenState:
     print("Inside readme")
 
@@ -54,8 +97,8 @@ def generate_readme(state: DocGenState) -> DocGenState:
     folder_structure = "\n".join(sorted(state.working_dir.keys())) if state.working_dir else "Not Available"
     summaries_section = []
 
-    if state.readme_summaries and isinstance(state.readme_summaries, list):
-        for item in state.readme_summaries:
+    if state.readme_summaries:
+        for item in state.readme_summaries.values():
             file = item.get("file", "unknown")
             summary = item.get("summary", "No summary available.")
             ftype = item.get("type", "unknown")
@@ -68,24 +111,19 @@ def generate_readme(state: DocGenState) -> DocGenState:
 
             summaries_section.append("\n".join(lines))
 
-    chunks = chunk_summaries(summaries_section, max_chars=6000)
-
-    partial_code_summaries = []
-    for chunk_text in chunks:
-        partial_prompt = f"""
-You are an expert technical writer.
-
-Generate only a **Code Summary** section in markdown based on these summaries. Do not include any other sections, no title, no folder structure. Only return the "Code Summary" section.
-
----
-{chunk_text}
----
-"""
-        partial_summary_md = safe_llm_call(get_llm_response_readme, partial_prompt)
-        cleaned_partial = clean_llm_markdown_response(partial_summary_md)
-        partial_code_summaries.append(cleaned_partial)
+    # Skip the README calls when the summaries are identical to the last run.
+    key = manifest_key(state)
+    readme_hash = content_hash([folder_structure] + summaries_section)
+    if key:
+        previous_hash, previous_readme = load_readme(key)
+        if previous_readme and previous_hash == readme_hash:
+            print("[Manifest] Summaries unchanged, reusing previous README")
+            state.readme = previous_readme
+            return state
 
-    merged_code_summary = "\n\n".join(partial_code_summaries)
+    chunks = chunk_summaries(summaries_section, max_chars=PARTIAL_CHUNK_CHARS)
+    partial_code_summaries = map_ordered(summarize_partial, chunks, PROVIDER_CONCURRENCY["groq"])
+    merged_code_summary = reduce_code_summaries(partial_code_summaries)
 
     final_prompt = f"""
 You are an expert technical writer. Generate professional README.md documentation.
@@ -131,10 +169,12 @@ You are an expert technical writer. Generate professional README.md documentatio
 """
 
     try:
-        final_readme_raw = safe_llm_call(get_llm_response_readme, final_prompt)
+        final_readme_raw = get_llm_response_readme(final_prompt)
         final_readme_clean = clean_llm_markdown_response(final_readme_raw).replace("\\n", "\n")
-        print("Generated README:\n", final_readme_clean)
+        log_payload("Generated README", final_readme_clean)
         state.readme = final_readme_clean.strip()
+        if key and state.readme:
+            save_readme(key, readme_hash, state.readme)
     except Exception as e:
         print(f"[Error] Failed to generate README: {e}")
         state.readme = ""
@@ -1,13 +1,16 @@
 
 from app.models.state import DocGenState
+from app.utils.blob_store import load_text
 
 
 def output_node(state: DocGenState) -> dict:
     return {
-        "modified_files": state.modified_files or {},
+        # The result outlives the job's workspace, so handles are resolved here.
+        "modified_files": {file_path: load_text(value) for file_path, value in (state.modified_files or {}).items()},
         "summaries": state.summaries or {},
         "readme": state.readme or "",
         "visuals": state.visuals or {},
         "folder_tree": state.working_dir or {},
         "input_type": state.input_type,
+        "downgraded": state.downgraded or {},
     }
\ No newline at end of file
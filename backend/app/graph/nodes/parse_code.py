@@ -1,30 +1,35 @@
 import os
+import math
+import importlib
+import zipfile
+import threading
+import multiprocessing
+from typing import Optional
+from functools import partial
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from app.models.state import DocGenState
+from app.utils.file_ops import MAX_MEMBER_BYTES, MAX_ARCHIVE_SOURCE_BYTES
+from app.utils.metrics import record_parsed_files
+from app.utils.blob_store import BlobStore
+from app.utils.workspace import workspace_manager, Workspace
 from tree_sitter import Language, Parser
 
-import tree_sitter_python as tspython
-import tree_sitter_java as tsjava
-import tree_sitter_javascript as tsjs
-import tree_sitter_html as tshtml
-import tree_sitter_typescript as tsts
-import tree_sitter_css as tscss
-import tree_sitter_c as tsc
-import tree_sitter_cpp as tscpp
-import tree_sitter_go as tsgo
-import tree_sitter_kotlin as tskotlin
-
-LANGUAGE_MAP = {
-    "python": tspython.language(),
-    "java": tsjava.language(),
-    "javascript": tsjs.language(),
-    "typescript": tsts.language_typescript(),
-    "tsx": tsts.language_tsx(),
-    "html": tshtml.language(),
-    "css": tscss.language(),
-    "c": tsc.language(),
-    "cpp": tscpp.language(),
-    "go": tsgo.language(),
-    "kotlin": tskotlin.language(),
+# Grammar package and the function returning its language, per language key.
+# Grammars are imported on first use, so a job only loads the ones its files need.
+GRAMMARS = {
+    "python": ("tree_sitter_python", "language"),
+    "java": ("tree_sitter_java", "language"),
+    "javascript": ("tree_sitter_javascript", "language"),
+    "typescript": ("tree_sitter_typescript", "language_typescript"),
+    "tsx": ("tree_sitter_typescript", "language_tsx"),
+    "html": ("tree_sitter_html", "language"),
+    "css": ("tree_sitter_css", "language"),
+    "c": ("tree_sitter_c", "language"),
+    "cpp": ("tree_sitter_cpp", "language"),
+    "go": ("tree_sitter_go", "language"),
+    "kotlin": ("tree_sitter_kotlin", "language"),
 }
 
 LANGUAGE_EXTENSIONS = {
@@ -81,71 +86,139 @@ EXCLUDED_FILES = {
 
 VENV_MARKERS = {"bin", "lib", "pyvenv.cfg", "Scripts", "Include"}
 
+# Files are read and parsed on a process pool once a repo has at least
+# PARALLEL_PARSE_MIN_FILES of them; smaller repos are not worth the IPC.
+PARSE_WORKERS = int(os.getenv("DOCGEN_PARSE_WORKERS", "0")) or os.cpu_count() or 1
+PARALLEL_PARSE_MIN_FILES = int(os.getenv("DOCGEN_PARALLEL_PARSE_MIN_FILES", "64"))
+_parse_pool = None
+
 def detect_language(file_name: str):
     for lang, extensions in LANGUAGE_EXTENSIONS.items():
         if any(file_name.endswith(ext) for ext in extensions):
             return lang
     return None
 
-def extract_names_and_clean(source_code: str, lang_key: str):
-    language_obj = LANGUAGE_MAP.get(lang_key)
-    if not language_obj:
-        return [], source_code
-
-    parser = Parser(Language(language_obj))
-    tree = parser.parse(bytes(source_code, "utf-8"))
-    root_node = tree.root_node
+SYMBOL_NODE_TYPES = {
+    "function_definition", "function_declaration", "method_definition", "method_declaration",
+    "class_definition", "class_declaration", "class_specifier", "struct_specifier", "type_declaration"
+}
 
+_languages = {}
+_languages_lock = threading.Lock()
+_parser_pool = threading.local()
+
+def load_language(lang_key: str):
+    """
+    Returns the tree-sitter Language for lang_key, importing its grammar the
+    first time. None if the language is unknown or its grammar can't be loaded.
+    """
+    if lang_key in _languages:
+        return _languages[lang_key]
+    grammar = GRAMMARS.get(lang_key)
+    if grammar is None:
+        return None
+    with _languages_lock:
+        if lang_key not in _languages:
+            module_name, function_name = grammar
+            try:
+                module = importlib.import_module(module_name)
+                _languages[lang_key] = Language(getattr(module, function_name)())
+            except (ImportError, ValueError) as e:
+                # A missing package, or a grammar built for a newer tree-sitter
+                # ABI; files of this language are passed through unparsed
+                # instead of failing the whole job.
+                print(f"Grammar for {lang_key} unavailable: {e}")
+                _languages[lang_key] = None
+    return _languages[lang_key]
+
+def get_parser(lang_key: str):
+    # Parsers are not thread-safe, so each thread keeps one per language.
+    parsers = getattr(_parser_pool, "parsers", None)
+    if parsers is None:
+        parsers = _parser_pool.parsers = {}
+    if lang_key not in parsers:
+        language = load_language(lang_key)
+        parsers[lang_key] = Parser(language) if language is not None else None
+    return parsers[lang_key]
+
+def analyze_source(source_code: str, lang_key: str):
+    """
+    Returns (symbol names, code with comments removed, chunk boundaries), where
+    boundaries are [line, depth] pairs: the lines in the cleaned code at which
+    top-level nodes and definitions start, and how deeply they are nested.
+    """
+    parser = get_parser(lang_key)
+    if parser is None:
+        return [], source_code, []
+
+    source_bytes = source_code.encode("utf-8")
+    tree = parser.parse(source_bytes)
+
+    # One pre-order walk collects comment spans, symbol names and boundary
+    # offsets. Comment subtrees are not descended into.
     comment_ranges = []
-
-    def collect_comments(node):
-        if "comment" in node.type:
-            comment_ranges.append((node.start_byte, node.end_byte))
-        for child in node.children:
-            collect_comments(child)
-
-    collect_comments(root_node)
-
-    code_bytes = bytearray(source_code, "utf-8")
-    for start, end in sorted(comment_ranges, reverse=True):
-        del code_bytes[start:end]
-
-    cleaned_code = code_bytes.decode("utf-8")
-    tree = parser.parse(bytes(cleaned_code, "utf-8"))
-    root_node = tree.root_node
-
-    cursor = root_node.walk()
-    visited = set()
     found_names = []
-
+    boundary_offsets = []
+    cursor = tree.walk()
     while True:
         node = cursor.node
-        if node.id in visited:
-            if cursor.goto_next_sibling():
-                continue
-            if not cursor.goto_parent():
-                break
-            continue
-
-        visited.add(node.id)
-
-        if node.type in [
-            "function_definition", "function_declaration", "method_definition", "method_declaration",
-            "class_definition", "class_declaration", "class_specifier", "struct_specifier", "type_declaration"
-        ]:
+        descend = True
+        if "comment" in node.type:
+            comment_ranges.append((node.start_byte, node.end_byte))
+            descend = False
+        elif node.type in SYMBOL_NODE_TYPES:
+            boundary_offsets.append((node.start_byte, cursor.depth))
             name_node = node.child_by_field_name("name")
             if name_node:
-                name = cleaned_code[name_node.start_byte:name_node.end_byte]
+                name = source_bytes[name_node.start_byte:name_node.end_byte].decode("utf-8", errors="replace")
                 found_names.append(name.strip())
+        elif cursor.depth == 1:
+            boundary_offsets.append((node.start_byte, 1))
 
-        if cursor.goto_first_child():
-            continue
-        if cursor.goto_next_sibling():
+        if descend and cursor.goto_first_child():
             continue
+        finished = False
         while not cursor.goto_next_sibling():
             if not cursor.goto_parent():
+                finished = True
                 break
+        if finished:
+            break
+
+    pieces = []
+    position = 0
+    for start, end in comment_ranges:
+        if start > position:
+            pieces.append(source_bytes[position:start])
+        position = max(position, end)
+    pieces.append(source_bytes[position:])
+    cleaned_bytes = b"".join(pieces) if comment_ranges else source_bytes
+
+    # Shift boundary offsets past the removed comments and turn them into line
+    # numbers. Both lists are in source order, so one forward pass is enough.
+    boundaries = []
+    removed = 0
+    span_index = 0
+    line = 0
+    last_offset = 0
+    for offset, depth in boundary_offsets:
+        while span_index < len(comment_ranges) and comment_ranges[span_index][0] < offset:
+            span_start, span_end = comment_ranges[span_index]
+            removed += span_end - span_start
+            span_index += 1
+        cleaned_offset = offset - removed
+        line += cleaned_bytes.count(b"\n", last_offset, cleaned_offset)
+        last_offset = cleaned_offset
+        if not boundaries or boundaries[-1][0] != line:
+            boundaries.append([line, depth])
+        elif depth < boundaries[-1][1]:
+            boundaries[-1][1] = depth
+
+    cleaned_code = cleaned_bytes.decode("utf-8") if comment_ranges else source_code
+    return found_names, cleaned_code, boundaries
 
+def extract_names_and_clean(source_code: str, lang_key: str):
+    found_names, cleaned_code, _ = analyze_source(source_code, lang_key)
     return found_names, cleaned_code
 
 def is_virtual_env(folder_path: str) -> bool:
@@ -155,8 +228,108 @@ def is_virtual_env(folder_path: str) -> bool:
     except Exception:
         return False
 
-def walk_folder(base_path: str):
-    structure = {}
+def _get_parse_pool():
+    global _parse_pool
+    if _parse_pool is None:
+        # forkserver avoids forking a process that already has job threads running.
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _parse_pool = ProcessPoolExecutor(
+            max_workers=PARSE_WORKERS,
+            mp_context=multiprocessing.get_context(method),
+        )
+    return _parse_pool
+
+def parse_in_batches(worker_fn, tasks: list) -> list:
+    """
+    Runs worker_fn over tasks, split into batches across the parse process pool
+    when there are enough files to be worth the IPC. Results keep task order.
+    """
+    if PARSE_WORKERS <= 1 or len(tasks) < PARALLEL_PARSE_MIN_FILES:
+        return worker_fn(tasks)
+
+    batch_size = max(8, math.ceil(len(tasks) / (PARSE_WORKERS * 4)))
+    batches = [tasks[i:i + batch_size] for i in range(0, len(tasks), batch_size)]
+    try:
+        batch_results = list(_get_parse_pool().map(worker_fn, batches))
+    except (OSError, BrokenProcessPool) as e:
+        global _parse_pool
+        print(f"Parallel parse unavailable ({e}), parsing serially")
+        _parse_pool = None
+        return worker_fn(tasks)
+    return [result for batch in batch_results for result in batch]
+
+def _parse_entry(rel_path: str, lang: str, source_code: str, store: Optional[BlobStore] = None) -> dict:
+    contains, cleaned_code, boundaries = analyze_source(source_code, lang)
+    entry = {
+        "file": rel_path,
+        "type": lang,
+        "contains": contains,
+        "boundaries": boundaries,
+        "size": len(cleaned_code.encode("utf-8")),
+    }
+    # With a store the code goes straight to disk from the worker and only the
+    # handle crosses back to the job.
+    if store is not None:
+        entry["code_ref"] = store.put(cleaned_code)
+    else:
+        entry["code"] = cleaned_code
+    return entry
+
+def _parse_folder_batch(store: Optional[BlobStore], batch: list) -> list:
+    results = []
+    for file_path, rel_path, lang in batch:
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                source_code = f.read()
+        except Exception as e:
+            print(f"Error reading file {file_path}: {e}")
+            results.append((rel_path, None))
+            continue
+        results.append((rel_path, _parse_entry(rel_path, lang, source_code, store)))
+    return results
+
+def _parse_archive_batch(archive_path: str, store: Optional[BlobStore], batch: list) -> list:
+    # The batch may decompress no more than its members' headers declare, so a
+    # header that understates a member's size can't get past walk_archive's
+    # total check.
+    allowance = sum(declared for _, _, declared in batch)
+    results = []
+    with zipfile.ZipFile(archive_path, "r") as zf:
+        for name, lang, declared in batch:
+            with zf.open(name) as f:
+                data = f.read(min(declared, allowance) + 1)
+            if len(data) > min(declared, allowance):
+                raise ValueError(f"Archive member {name} is larger than its header declares")
+            allowance -= len(data)
+            try:
+                source_code = data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+            except UnicodeDecodeError as e:
+                print(f"Error reading file {name}: {e}")
+                results.append((name, None))
+                continue
+            results.append((name, _parse_entry(name, lang, source_code, store)))
+    return results
+
+def _parse_reserved(worker_fn, tasks: list, declared: int, workspace: Optional[Workspace]) -> list:
+    """
+    Runs the parse with declared bytes reserved in the job's workspace up front,
+    since the workers write blobs without quota accounting of their own, then
+    settles the reservation to the size actually stored.
+    """
+    if workspace is not None:
+        workspace.reserve(declared)
+    try:
+        results = parse_in_batches(worker_fn, tasks)
+    except BaseException:
+        if workspace is not None:
+            workspace.unreserve(declared)
+        raise
+    if workspace is not None:
+        workspace.settle(declared, sum(entry["size"] for _, entry in results if entry is not None))
+    return results
+
+def walk_folder(base_path: str, store: Optional[BlobStore] = None, workspace: Optional[Workspace] = None):
+    tasks = []
 
     for root, dirs, files in os.walk(base_path):
         filtered_dirs = []
@@ -182,22 +355,68 @@ def walk_folder(base_path: str):
             if not lang:
                 continue
 
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    source_code = f.read()
-            except Exception as e:
-                print(f"Error reading file {file_path}: {e}")
-                continue
+            tasks.append((file_path, rel_path, lang))
 
-            contains, cleaned_code = extract_names_and_clean(source_code, lang)
+    declared = 0
+    for file_path, _, _ in tasks:
+        try:
+            declared += os.path.getsize(file_path)
+        except OSError:
+            pass
 
-            structure[rel_path] = {
-                "file": rel_path,
-                "code": cleaned_code,
-                "type": lang,
-                "contains": contains
-            }
+    structure = {}
+    for rel_path, entry in _parse_reserved(partial(_parse_folder_batch, store), tasks, declared, workspace):
+        if entry is not None:
+            structure[rel_path] = entry
+    return structure
+
+def walk_archive(archive_path: str, store: Optional[BlobStore] = None, workspace: Optional[Workspace] = None):
+    tasks = []
+
+    with zipfile.ZipFile(archive_path, "r") as zf:
+        infos = zf.infolist()
+
+    # Directory listings, used for the same virtualenv check walk_folder does.
+    children = defaultdict(set)
+    for info in infos:
+        parts = info.filename.rstrip("/").split("/")
+        for i in range(len(parts)):
+            children["/".join(parts[:i])].add(parts[i])
+
+    for info in infos:
+        if info.is_dir():
+            continue
 
+        parts = info.filename.split("/")
+        folders, file = parts[:-1], parts[-1]
+        if file in EXCLUDED_FILES:
+            continue
+        if any(d in EXCLUDED_FOLDERS or d == "__MACOSX" for d in folders):
+            continue
+        if any(children["/".join(folders[:i + 1])] & VENV_MARKERS for i in range(len(folders))):
+            continue
+
+        lang = detect_language(file)
+        if not lang:
+            continue
+
+        if info.file_size > MAX_MEMBER_BYTES:
+            print(f"Skipping oversized archive member: {info.filename}")
+            continue
+
+        tasks.append((info.filename, lang, info.file_size))
+
+    # Rejected before anything is decompressed; the batches then hold every
+    # member to its declared size.
+    declared = sum(size for _, _, size in tasks)
+    if declared > MAX_ARCHIVE_SOURCE_BYTES:
+        raise ValueError(f"Archive source exceeds the {MAX_ARCHIVE_SOURCE_BYTES} byte limit")
+
+    structure = {}
+    worker_fn = partial(_parse_archive_batch, archive_path, store)
+    for name, entry in _parse_reserved(worker_fn, tasks, declared, workspace):
+        if entry is not None:
+            structure[name] = entry
     return structure
 
 def parse_code(state: DocGenState):
@@ -206,11 +425,20 @@ def parse_code(state: DocGenState):
     working_dir = state.working_dir
     print(f"Parsing code from: {working_dir}")
 
+    store = BlobStore(state.workspace_id, reserve=False) if state.workspace_id else None
+    workspace = workspace_manager.get(state.workspace_id)
+
     if isinstance(working_dir, dict):
         for section, path in working_dir.items():
-            parsed = walk_folder(path)
+            # Blobs written by the parse workers are reserved by the walkers.
+            reserving = workspace if store is not None else None
+            if os.path.isfile(path) and zipfile.is_zipfile(path):
+                parsed = walk_archive(path, store, reserving)
+            else:
+                parsed = walk_folder(path, store, reserving)
             if parsed:
                 all_parsed[section] = parsed
+                record_parsed_files(parsed)
     else:
         raise ValueError("Invalid working_dir format")
 
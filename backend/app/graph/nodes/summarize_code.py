@@ -1,19 +1,22 @@
+from typing import Optional
 from app.models.state import DocGenState
 from app.utils.mistral import get_llm_response_summary
+from app.utils.concurrency import map_ordered, PROVIDER_CONCURRENCY
+from app.utils.chunking import split_code_into_chunks
+from app.utils.tokens import count_tokens
+from app.utils.scheduler import signature_lines
+from app.utils.metrics import log_payload
+from app.utils.blob_store import load_code
+import os
 import re
-import time
-import random
 
-CHUNK_SIZE = 300
-CHUNK_OVERLAP = 10
+# Files at or under PACK_FILE_TOKENS are summarized together, several to a
+# request, up to PACK_TOKEN_BUDGET tokens of code and PACK_MAX_FILES files.
+PACK_FILE_TOKENS = int(os.getenv("DOCGEN_PACK_FILE_TOKENS", "400"))
+PACK_TOKEN_BUDGET = int(os.getenv("DOCGEN_PACK_TOKENS", "3000"))
+PACK_MAX_FILES = int(os.getenv("DOCGEN_PACK_MAX_FILES", "20"))
 
-def split_code_into_chunks(code: str, lines_per_chunk=CHUNK_SIZE, overlap=CHUNK_OVERLAP) -> list[str]:
-    lines = code.splitlines()
-    chunks = []
-    for i in range(0, len(lines), lines_per_chunk - overlap):
-        chunk = "\n".join(lines[i:i + lines_per_chunk])
-        chunks.append(chunk)
-    return chunks
+PACKED_FILE_HEADER = re.compile(r"^\s*#*\s*\**File:\**\s*`?(.+?)`?\**\s*$", re.MULTILINE)
 
 def parse_llm_summary_response(response: str) -> list[dict]:
     lines = [
@@ -31,76 +34,196 @@ def parse_llm_summary_response(response: str) -> list[dict]:
             structured.append({"symbol": None, "summary": line})
     return structured
 
-def safe_llm_call(prompt: str, language: str, max_retries=5, base_wait=2.0):
-    for attempt in range(max_retries):
+def build_summary_prompt(chunk: str, language: str) -> str:
+    return (
+        f"Analyze the following {language} source file carefully for README documentation purposes. "
+        f"Write a concise technical summary (2-4 sentences) that includes: "
+        f"1) The file's primary purpose and functionality "
+        f"2) Key classes/functions and their roles (only the most important ones) "
+        f"3) How this file contributes to the overall application "
+        f"4) Any notable implementation details, algorithms, or patterns used "
+        f"5) **All** API endpoints, routes, or public interfaces if present (with HTTP methods and paths) "
+        f"Focus on information that would help developers understand this component's role in the codebase. "
+        f"Do NOT list every function - only highlight core functionality that defines what this file does. "
+        f"If this file contains API routes, endpoints, or public interfaces, mention them specifically. "
+        f"Keep it technical but accessible for README documentation.\n\n"
+        f"### Code:\n{chunk.strip()}"
+    )
+
+def build_packed_summary_prompt(files: list[tuple[str, str]], language: str) -> str:
+    sections = "\n\n".join(f"### File: {file_path}\n{code.strip()}" for file_path, code in files)
+    return (
+        f"Analyze each of the following small {language} source files for README documentation purposes. "
+        f"For every file, write a concise technical summary (1-2 sentences) of its purpose, its key "
+        f"classes/functions, and any API endpoints, routes, or public interfaces it defines.\n"
+        f"Output format, repeated for every file in the order given and with nothing else:\n"
+        f"### File: <file path exactly as given>\n"
+        f"- <summary>\n\n"
+        f"{sections}"
+    )
+
+def parse_packed_summary_response(response: str, file_paths: list[str]) -> dict[str, list[dict]]:
+    """
+    Splits a packed response into per-file structured summaries. Files whose
+    section is missing or has no summary lines are left out.
+    """
+    wanted = set(file_paths)
+    headers = list(PACKED_FILE_HEADER.finditer(response))
+    parsed = {}
+    for index, header in enumerate(headers):
+        file_path = header.group(1).strip()
+        if file_path not in wanted or file_path in parsed:
+            continue
+        end = headers[index + 1].start() if index + 1 < len(headers) else len(response)
+        structured = parse_llm_summary_response(response[header.end():end])
+        if structured:
+            parsed[file_path] = structured
+    return parsed
+
+def build_file_summary(file_path: str, file_info: dict, structured: list[dict]) -> tuple[str, dict]:
+    combined_summary = " ".join([s['summary'] for s in structured if s['summary']]).strip()
+
+    return combined_summary, {
+        "file": file_path,
+        "summary": combined_summary if combined_summary else "No summary available.",
+        "type": file_info.get("type", "text"),
+        "contains": file_info.get("contains", [])
+    }
+
+def pack_small_files(file_paths: list[str], repo_data: dict) -> list[list[str]]:
+    """
+    Groups the small files among file_paths by language into packs for a
+    single summarization request each. Larger files are not packed.
+    """
+    small = []
+    for file_path in file_paths:
+        code = load_code(repo_data[file_path])
+        if not code.strip():
+            continue
+        tokens = count_tokens(code)
+        if tokens <= PACK_FILE_TOKENS:
+            small.append((repo_data[file_path].get("type", "text"), file_path, tokens))
+
+    packs = []
+    current = []
+    current_tokens = 0
+    current_language = None
+    for language, file_path, tokens in sorted(small):
+        if current and (language != current_language or len(current) >= PACK_MAX_FILES
+                        or current_tokens + tokens > PACK_TOKEN_BUDGET):
+            packs.append(current)
+            current = []
+            current_tokens = 0
+        current.append(file_path)
+        current_tokens += tokens
+        current_language = language
+    if current:
+        packs.append(current)
+    # A pack of one saves nothing over the regular per-file path.
+    return [pack for pack in packs if len(pack) > 1]
+
+def summarize_small_files(file_paths: list[str], repo_data: dict) -> dict[str, tuple[str, dict]]:
+    """
+    Summarizes the small files among file_paths several to a request. Returns
+    results for the files whose summaries came back intact; the rest are left
+    for summarize_file to retry one by one.
+    """
+    packs = pack_small_files(file_paths, repo_data)
+    if not packs:
+        return {}
+
+    def summarize_pack(pack: list[str]) -> dict[str, list[dict]]:
+        language = repo_data[pack[0]].get("type", "text")
+        files = [(file_path, load_code(repo_data[file_path])) for file_path in pack]
+        prompt = build_packed_summary_prompt(files, language)
         try:
-            print("summarizing")
-            sum = get_llm_response_summary(prompt=prompt, language=language)
-            print(sum)
-            return sum.strip()
+            response = get_llm_response_summary(prompt=prompt, language=language)
+            log_payload(f"[LLM RAW RESPONSE for {len(pack)} packed files]", response)
+            return parse_packed_summary_response(response, pack)
         except Exception as e:
-            print(e)
-            wait_time = base_wait * (2 ** attempt) + random.uniform(0, 1)
-            print(f"[Retry] LLM call failed on attempt {attempt+1}: {e}. Retrying in {wait_time:.1f}s...")
-            time.sleep(wait_time)
-    raise RuntimeError("LLM call failed after maximum retries.")
-
-def summarize_code_node(state: DocGenState) -> DocGenState:
-    if not state.preferences.generate_summary or not state.parsed_data:
-        return state
-
-    file_path = state.current_file_path
-    file_info = state.parsed_data["repo_path"][file_path]
-
-    file_code = file_info.get("code", "")
+            print(f"[Error] Failed summarizing {len(pack)} packed files even after retries: {e}")
+            return {}
+
+    results = {}
+    for parsed in map_ordered(summarize_pack, packs, PROVIDER_CONCURRENCY["mistralai"]):
+        for file_path, structured in parsed.items():
+            results[file_path] = build_file_summary(file_path, repo_data[file_path], structured)
+
+    packed_files = sum(len(pack) for pack in packs)
+    print(f"[Summary] Packed {packed_files} small files into {len(packs)} requests, "
+          f"{packed_files - len(results)} left to retry individually")
+    return results
+
+def build_signature_prompt(signatures: list[str], language: str) -> str:
+    listing = "\n".join(signatures)
+    return (
+        f"Below are only the class and function signatures of a {language} source file; the bodies are omitted. "
+        f"Write a concise technical summary (1-2 sentences) of what the file most likely provides, "
+        f"as a single line starting with '- '.\n\n"
+        f"### Signatures:\n{listing}"
+    )
+
+def summarize_signatures(file_path: str, file_info: dict) -> Optional[tuple[str, dict]]:
+    """
+    The lighter treatment for files outside a job's token budget: a summary
+    from the file's definition lines alone.
+    """
+    signatures = signature_lines(file_info)
+    if not signatures:
+        return None
+    language = file_info.get("type", "text")
+    try:
+        response = get_llm_response_summary(prompt=build_signature_prompt(signatures, language), language=language)
+    except Exception as e:
+        print(f"[Error] Failed summarizing signatures of {file_path} even after retries: {e}")
+        return None
+    return build_file_summary(file_path, file_info, parse_llm_summary_response(response))
+
+def summarize_file(file_path: str, file_info: dict) -> Optional[tuple[str, dict]]:
+    file_code = load_code(file_info)
     language = file_info.get("type", "text")
-    symbols = file_info.get("contains", [])
 
     if not file_code.strip():
-        return state
+        return None
 
-    chunks = split_code_into_chunks(file_code)
-    all_structured_summaries = []
+    chunks = split_code_into_chunks(file_code, file_info.get("boundaries"))
 
-    for chunk in chunks:
-        prompt = (
-            f"Analyze the following {language} source file carefully for README documentation purposes. "
-            f"Write a concise technical summary (2-4 sentences) that includes: "
-            f"1) The file's primary purpose and functionality "
-            f"2) Key classes/functions and their roles (only the most important ones) "
-            f"3) How this file contributes to the overall application "
-            f"4) Any notable implementation details, algorithms, or patterns used "
-            f"5) **All** API endpoints, routes, or public interfaces if present (with HTTP methods and paths) "
-            f"Focus on information that would help developers understand this component's role in the codebase. "
-            f"Do NOT list every function - only highlight core functionality that defines what this file does. "
-            f"If this file contains API routes, endpoints, or public interfaces, mention them specifically. "
-            f"Keep it technical but accessible for README documentation.\n\n"
-            f"### Code:\n{chunk.strip()}"
-        )
+    def summarize_chunk(chunk: str) -> list[dict]:
+        prompt = build_summary_prompt(chunk, language)
         try:
-            response = safe_llm_call(prompt, language)
-            print(f"[LLM RAW RESPONSE for {file_path}]:\n{response}\n{'-' * 50}")
-            structured = parse_llm_summary_response(response)
-            all_structured_summaries.extend(structured)
+            response = get_llm_response_summary(prompt=prompt, language=language)
+            log_payload(f"[LLM RAW RESPONSE for {file_path}]", response)
+            return parse_llm_summary_response(response)
         except Exception as e:
             print(f"[Error] Failed summarizing chunk in {file_path} even after retries: {e}")
+            return []
 
-    combined_summary = " ".join([s['summary'] for s in all_structured_summaries if s['summary']]).strip()
+    all_structured_summaries = []
+    for structured in map_ordered(summarize_chunk, chunks, PROVIDER_CONCURRENCY["mistralai"]):
+        all_structured_summaries.extend(structured)
 
-    if not state.readme_summaries:
-        state.readme_summaries = []
+    return build_file_summary(file_path, file_info, all_structured_summaries)
 
-    state.readme_summaries = [
-        s for s in state.readme_summaries if s["file"] != file_path
-    ]
+def apply_file_summary(state: DocGenState, file_path: str, result: tuple[str, dict]) -> DocGenState:
+    combined_summary, entry = result
 
-    state.readme_summaries.append({
-        "file": file_path,
-        "summary": combined_summary if combined_summary else "No summary available.",
-        "type": language,
-        "contains": symbols
-    })
+    # Re-summarized files move to the end, as they did when this was a list.
+    state.readme_summaries.pop(file_path, None)
+    state.readme_summaries[file_path] = entry
 
     state.summaries[file_path] = combined_summary
 
     return state
+
+def summarize_code_node(state: DocGenState) -> DocGenState:
+    if not state.preferences.generate_summary or not state.parsed_data:
+        return state
+
+    file_path = state.current_file_path
+    file_info = state.parsed_data["repo_path"][file_path]
+
+    result = summarize_file(file_path, file_info)
+    if result is None:
+        return state
+
+    return apply_file_summary(state, file_path, result)
@@ -1,15 +1,22 @@
-import base64
-from fastapi import FastAPI, UploadFile, File, Form
+import asyncio
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from app.graph.graph import build_graph
-from app.models.state import DocGenState, DocGenPreferences
-from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from app.models.state import DocGenState, DocGenPreferences, DocGenBudget
+from app.utils.jobs import job_manager, RESULT_KEYS, JobNotResumable, POLL_SECONDS
+from app.utils.artifact_store import artifact_store
+from app.utils.file_ops import save_upload, MAX_UPLOAD_BYTES
+from app.utils.workspace import workspace_manager, WorkspaceFull
+from app.utils.metrics import render_metrics
+from fastapi.responses import StreamingResponse, JSONResponse, FileResponse, Response
 import io
 import zipfile
 import json
 
 app = FastAPI()
-graph = build_graph()
+
+# Idle event streams get a keep-alive this often, so proxies don't drop them.
+EVENTS_KEEPALIVE_SECONDS = 15.0
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,42 +29,132 @@ app.add_middleware(
 def read_root():
     return {"message": "Hello from FastAPI on Render!"}
 
+@app.get("/metrics")
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+async def build_state(input_type: str, input_data: str, zip_file: UploadFile, branch: str, add_inline_comments: bool,
+                      budget: DocGenBudget = None) -> DocGenState:
+    preferences = DocGenPreferences(
+        add_inline_comments=add_inline_comments,
+        generate_readme=True,
+        generate_summary=True,
+        visualize_structure=True
+    )
+    if input_type == "zip" and zip_file:
+        if zip_file.size is not None and zip_file.size > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="Uploaded archive is too large")
+        workspace = workspace_manager.create()
+        try:
+            archive_path, digest = await run_in_threadpool(save_upload, zip_file.file, workspace)
+        except BaseException as e:
+            workspace.release()
+            if isinstance(e, WorkspaceFull):
+                raise HTTPException(status_code=503, detail=str(e))
+            if isinstance(e, ValueError):
+                raise HTTPException(status_code=400, detail=str(e))
+            raise
+        return DocGenState(input_type="zip", input_data=archive_path, branch=branch, preferences=preferences,
+                           budget=budget, workspace_id=workspace.id, input_digest=digest)
+    return DocGenState(input_type=input_type, input_data=input_data, branch=branch, preferences=preferences, budget=budget)
+
+async def run_job(state: DocGenState) -> dict:
+    job = await run_in_threadpool(job_manager.submit, state)
+    while not job.done:
+        await asyncio.sleep(POLL_SECONDS)
+        job = await run_in_threadpool(job_manager.get, job.id)
+    if job.status != "completed":
+        raise HTTPException(status_code=500, detail=job.error or "Job failed")
+    return job.result
+
 @app.post("/generate")
 async def generate_docs(
     input_type: str = Form(...),
     input_data: str = Form(None),
     zip_file: UploadFile = File(None),
-    branch: str = Form(None)
+    branch: str = Form(None),
+    max_tokens: int = Form(None),
+    max_seconds: float = Form(None)
 ):
     print("/generate")
-    if input_type == "zip" and zip_file:
-        content = await zip_file.read()
-        base64_zip = base64.b64encode(content).decode("utf-8")
-        state = DocGenState(input_type="zip", input_data=base64_zip, branch=branch, preferences=DocGenPreferences(
-            add_inline_comments=False,
-            generate_readme=True,
-            generate_summary=True,
-            visualize_structure=True
-        ))
-    else:
-        state = DocGenState(input_type=input_type, input_data=input_data, branch=branch, preferences=DocGenPreferences(
-            add_inline_comments=False,
-            generate_readme=True,
-            generate_summary=True,
-            visualize_structure=True
-        ))
-
-    result = graph.invoke(state)
+    budget = DocGenBudget(max_tokens=max_tokens, max_seconds=max_seconds)
+    state = await build_state(input_type, input_data, zip_file, branch, add_inline_comments=False, budget=budget)
+    result = await run_job(state)
+
+    return {key: result.get(key) for key in RESULT_KEYS}
 
+@app.post("/jobs")
+async def submit_job(
+    input_type: str = Form(...),
+    input_data: str = Form(None),
+    zip_file: UploadFile = File(None),
+    branch: str = Form(None),
+    add_inline_comments: bool = Form(False),
+    max_tokens: int = Form(None),
+    max_seconds: float = Form(None)
+):
+    budget = DocGenBudget(max_tokens=max_tokens, max_seconds=max_seconds)
+    state = await build_state(input_type, input_data, zip_file, branch, add_inline_comments, budget)
+    job = await run_in_threadpool(job_manager.submit, state)
     return {
-        "readme": result.get("readme"),
-        "summaries": result.get("summaries"),
-        "modified_files": result.get("modified_files"),
-        "visuals": result.get("visuals"),
-        "folder_tree": result.get("folder_tree"),
-        "input_type": result.get("input_type")
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events"
     }
 
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        return JSONResponse({"error": "Unknown job ID"}, status_code=404)
+    return job.to_dict()
+
+@app.post("/jobs/{job_id}/resume")
+def resume_job(job_id: str):
+    try:
+        job = job_manager.resume(job_id)
+    except JobNotResumable as e:
+        return JSONResponse({"error": str(e)}, status_code=409)
+    if not job:
+        return JSONResponse({"error": "Unknown job ID"}, status_code=404)
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events"
+    }
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, format: str = "sse"):
+    job = job_manager.get(job_id)
+    if not job:
+        return JSONResponse({"error": "Unknown job ID"}, status_code=404)
+
+    ndjson = format == "ndjson"
+
+    async def event_stream():
+        cursor = 0
+        while True:
+            events, done = await run_in_threadpool(job_manager.wait_for_events, job_id, cursor,
+                                                   EVENTS_KEEPALIVE_SECONDS)
+            if not events:
+                if done:
+                    break
+                # NDJSON readers parse every line, so they get an object to skip.
+                yield json.dumps({"type": "ping"}) + "\n" if ndjson else ": keep-alive\n\n"
+                continue
+            cursor += len(events)
+            for event in events:
+                payload = json.dumps(event)
+                yield f"{payload}\n" if ndjson else f"event: {event['type']}\ndata: {payload}\n\n"
+            if done:
+                break
+
+    media_type = "application/x-ndjson" if ndjson else "text/event-stream"
+    return StreamingResponse(event_stream(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
 @app.post("/download-zip")
 async def download_modified_zip(modified_files_json: str = Form(...)):
     modified_files = json.loads(modified_files_json)
@@ -74,68 +171,47 @@ async def download_modified_zip(modified_files_json: str = Form(...)):
         headers={"Content-Disposition": "attachment; filename=modified_code.zip"}
     )
 
-from fastapi.responses import JSONResponse
-import uuid
-
-zip_store = {}
-
 @app.post("/generate-and-download")
 async def generate_and_download(
     input_type: str = Form(...),
     input_data: str = Form(None),
     zip_file: UploadFile = File(None),
-    branch: str = Form(None)
+    branch: str = Form(None),
+    max_tokens: int = Form(None),
+    max_seconds: float = Form(None)
 ):
-    if input_type == "zip" and zip_file:
-        content = await zip_file.read()
-        base64_zip = base64.b64encode(content).decode("utf-8")
-        state = DocGenState(input_type="zip", input_data=base64_zip, branch=branch, preferences=DocGenPreferences(
-            add_inline_comments=True,
-            generate_readme=True,
-            generate_summary=True,
-            visualize_structure=True
-        ))
-    else:
-        state = DocGenState(input_type=input_type, input_data=input_data, branch=branch, preferences=DocGenPreferences(
-            add_inline_comments=True,
-            generate_readme=True,
-            generate_summary=True,
-            visualize_structure=True
-        ))
-
-    result = graph.invoke(state)
-    modified_files = result.get("modified_files", {})
-    readme = result.get("readme")
-
-    zip_stream = io.BytesIO()
-    with zipfile.ZipFile(zip_stream, "w", zipfile.ZIP_DEFLATED) as zf:
-        for filepath, code in modified_files.items():
-            zf.writestr(filepath, code)
-        if readme:
-            zf.writestr("README.md", readme)
-    zip_stream.seek(0)
-
-    download_id = str(uuid.uuid4())
-    zip_store[download_id] = zip_stream.getvalue()
+    budget = DocGenBudget(max_tokens=max_tokens, max_seconds=max_seconds)
+    state = await build_state(input_type, input_data, zip_file, branch, add_inline_comments=True, budget=budget)
+    result = await run_job(state)
+    download_id = await run_in_threadpool(write_result_zip, result)
 
     return {
         "download_url": f"/download-zip/{download_id}",
-        "readme": result.get("readme"),
-        "summaries": result.get("summaries"),
-        "modified_files": result.get("modified_files"),
-        "visuals": result.get("visuals"),
-        "folder_tree": result.get("folder_tree"),
-        "input_type": result.get("input_type")
+        **{key: result.get(key) for key in RESULT_KEYS}
     }
 
+def write_result_zip(result: dict) -> str:
+    modified_files = result.get("modified_files") or {}
+    readme = result.get("readme")
+
+    writer = artifact_store.writer("docgen_output.zip")
+    with writer as f:
+        with zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED) as zf:
+            for filepath, code in modified_files.items():
+                zf.writestr(filepath, code)
+            if readme:
+                zf.writestr("README.md", readme)
+    return writer.id
+
 @app.get("/download-zip/{download_id}")
 def download_zip(download_id: str):
-    zip_bytes = zip_store.get(download_id)
-    if not zip_bytes:
+    artifact = artifact_store.get(download_id)
+    if not artifact:
         return JSONResponse({"error": "Invalid or expired download ID"}, status_code=404)
 
-    return StreamingResponse(
-        io.BytesIO(zip_bytes),
+    return FileResponse(
+        artifact["path"],
         media_type="application/x-zip-compressed",
-        headers={"Content-Disposition": "attachment; filename=docgen_output.zip"}
+        filename=artifact["filename"],
+        headers={"ETag": f'"{artifact["etag"]}"'}
     )
@@ -8,17 +8,60 @@ class DocGenPreferences(BaseModel):
     generate_readme: bool
     visualize_structure: bool
 
+class DocGenBudget(BaseModel):
+    # Caps on the per-file LLM stages of one job; None means no cap.
+    max_tokens: Optional[int] = None
+    max_seconds: Optional[float] = None
+
+class DocGenFilePlan(BaseModel):
+    # Work list of the per-file stage. It is saved with every checkpoint, so a
+    # resumed job carries on with the files it had not finished. Results are
+    # not kept here but in the job's workspace (see app.utils.file_results).
+    order: List[str]
+    # Files of the order taken so far, and files to try again before the rest.
+    position: int = 0
+    retry: List[str] = Field(default_factory=list)
+    treatments: Dict[str, str] = Field(default_factory=dict)
+    hashes: Dict[str, str] = Field(default_factory=dict)
+    # File path -> number of the pack it is summarized in with other small files.
+    packs: Dict[str, int] = Field(default_factory=dict)
+    max_seconds: Optional[float] = None
+    elapsed: float = 0.0
+    done: int = 0
+    reused: int = 0
+    # Files whose processing raised in the last batch, with the error.
+    failed: Dict[str, str] = Field(default_factory=dict)
+    # When the plan was made; manifest records older than this may be pruned.
+    planned_at: float = 0.0
+
+    @property
+    def pending(self) -> List[str]:
+        return self.retry + self.order[self.position:]
+
 class DocGenState(BaseModel):
     input_type: str
-    input_data: Union[str, Dict]
+    # Dropped by fetch_code once working_dir is set.
+    input_data: Optional[Union[str, Dict]]
+    repo_url: Optional[str] = None
     working_dir: Optional[Dict[str, str]] = None
     current_file_path: Optional[str] = None
+    # Per-file entries carry a blob handle ("code_ref") instead of the source;
+    # see app.utils.blob_store.
     parsed_data: Optional[Dict[str, Any]] = None
     summaries: Dict[str, str] = Field(default_factory=dict)
+    # File path -> blob handle of the commented file.
     modified_files: Dict[str, str] = Field(default_factory=dict)
     folder_tree: Optional[str] = None
     readme: Optional[str] = None
     visuals: Optional[Dict[str, str]] = None
-    readme_summaries: Optional[List[Dict[str, Any]]] = None
+    readme_summaries: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
     preferences: Optional[DocGenPreferences]
+    budget: Optional[DocGenBudget] = None
+    file_plan: Optional[DocGenFilePlan] = None
+    downgraded: Dict[str, str] = Field(default_factory=dict)
     branch: Optional[str] = None
+    # Scratch directory owned by this job (see app.utils.workspace), removed
+    # when the job finishes.
+    workspace_id: Optional[str] = None
+    # Content hash of an uploaded archive, so identical uploads share a job.
+    input_digest: Optional[str] = None
@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import shutil
+from typing import Optional
+from filelock import FileLock
+
+# Extracted GitHub archives, one directory per (repo, resolved commit). Entries
+# are read-only once committed, so concurrent jobs for the same commit share
+# them. The directory mtime of an entry is its last-use time for LRU eviction.
+ARCHIVE_CACHE_DIR = os.getenv("DOCGEN_ARCHIVE_CACHE_DIR", "/tmp/docgen_cache/archives")
+ARCHIVE_CACHE_MAX_BYTES = int(os.getenv("DOCGEN_ARCHIVE_CACHE_MAX_BYTES", str(4 * 1024 * 1024 * 1024)))
+# Entries used this recently are never evicted, since a running job may still be reading them.
+ARCHIVE_CACHE_GRACE_SECONDS = int(os.getenv("DOCGEN_ARCHIVE_CACHE_GRACE", "1800"))
+
+REFS_FILE = "refs.json"
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(ARCHIVE_CACHE_DIR, "entries", key)
+
+
+def lock(name: str) -> FileLock:
+    os.makedirs(os.path.join(ARCHIVE_CACHE_DIR, "locks"), exist_ok=True)
+    return FileLock(os.path.join(ARCHIVE_CACHE_DIR, "locks", f"{name}.lock"))
+
+
+def lookup(key: str) -> Optional[str]:
+    entry = _entry_path(key)
+    try:
+        with open(os.path.join(entry, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        os.utime(entry)
+    except (OSError, ValueError):
+        return None
+    return os.path.join(entry, meta["root"])
+
+
+def staging_dir(key: str) -> str:
+    path = os.path.join(ARCHIVE_CACHE_DIR, "staging", f"{key}.{os.getpid()}.{time.monotonic_ns()}")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def commit(key: str, staged: str, root: str) -> str:
+    """
+    Moves a fully extracted staging directory into the cache and returns the
+    path of the repository root inside it.
+    """
+    size = 0
+    for dirpath, _, filenames in os.walk(staged):
+        for name in filenames:
+            try:
+                size += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    with open(os.path.join(staged, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"root": root, "size": size, "created_at": time.time()}, f)
+
+    entry = _entry_path(key)
+    os.makedirs(os.path.dirname(entry), exist_ok=True)
+    with lock("store"):
+        if os.path.exists(entry):
+            shutil.rmtree(staged, ignore_errors=True)
+        else:
+            os.replace(staged, entry)
+        evict()
+    return lookup(key) or os.path.join(entry, root)
+
+
+def evict():
+    entries_root = os.path.join(ARCHIVE_CACHE_DIR, "entries")
+    if not os.path.isdir(entries_root):
+        return
+    now = time.time()
+    entries = []
+    total = 0
+    for key in os.listdir(entries_root):
+        entry = os.path.join(entries_root, key)
+        try:
+            with open(os.path.join(entry, "meta.json"), "r", encoding="utf-8") as f:
+                size = json.load(f)["size"]
+            used_at = os.path.getmtime(entry)
+        except (OSError, ValueError, KeyError):
+            continue
+        total += size
+        entries.append((used_at, entry, size))
+
+    for used_at, entry, size in sorted(entries):
+        if total <= ARCHIVE_CACHE_MAX_BYTES:
+            break
+        if now - used_at < ARCHIVE_CACHE_GRACE_SECONDS:
+            continue
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+
+
+def load_ref(ref_key: str) -> dict:
+    path = os.path.join(ARCHIVE_CACHE_DIR, REFS_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get(ref_key, {})
+    except (OSError, ValueError):
+        return {}
+
+
+def save_ref(ref_key: str, data: dict):
+    os.makedirs(ARCHIVE_CACHE_DIR, exist_ok=True)
+    path = os.path.join(ARCHIVE_CACHE_DIR, REFS_FILE)
+    with lock("refs"):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                refs = json.load(f)
+        except (OSError, ValueError):
+            refs = {}
+        refs[ref_key] = data
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(refs, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import uuid
+import xxhash
+from typing import Optional
+from filelock import FileLock
+
+# Generated download archives live on disk under ARTIFACT_DIR so every worker
+# process on the host can serve them. Each artifact is <id>.zip plus an <id>.json
+# sidecar; the file mtime doubles as the last-access time for LRU eviction.
+ARTIFACT_DIR = os.getenv("DOCGEN_ARTIFACT_DIR", "/tmp/docgen_artifacts")
+ARTIFACT_TTL_SECONDS = int(os.getenv("DOCGEN_ARTIFACT_TTL", "3600"))
+ARTIFACT_QUOTA_BYTES = int(os.getenv("DOCGEN_ARTIFACT_QUOTA_BYTES", str(2 * 1024 * 1024 * 1024)))
+ARTIFACT_MAX_BYTES = int(os.getenv("DOCGEN_ARTIFACT_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+class ArtifactTooLarge(Exception):
+    pass
+
+
+class _QuotaFile:
+    """
+    File wrapper that aborts the write once the per-artifact limit is exceeded.
+    """
+
+    def __init__(self, f, limit: int):
+        self._f = f
+        self._limit = limit
+
+    def write(self, data):
+        if self._f.tell() + len(data) > self._limit:
+            raise ArtifactTooLarge(f"Artifact exceeds {self._limit} bytes")
+        return self._f.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+
+class ArtifactWriter:
+    def __init__(self, store: "ArtifactStore", artifact_id: str, filename: str):
+        self.store = store
+        self.id = artifact_id
+        self.filename = filename
+        self.tmp_path = os.path.join(store.root, f".{artifact_id}.partial")
+        self.file = None
+
+    def __enter__(self):
+        self.file = _QuotaFile(open(self.tmp_path, "w+b"), self.store.max_bytes)
+        return self.file
+
+    def __exit__(self, exc_type, exc, tb):
+        self.file.close()
+        if exc_type is not None:
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+            return False
+        self.store._commit(self)
+        return False
+
+
+class ArtifactStore:
+    def __init__(self, root: str = ARTIFACT_DIR, ttl: int = ARTIFACT_TTL_SECONDS,
+                 quota_bytes: int = ARTIFACT_QUOTA_BYTES, max_bytes: int = ARTIFACT_MAX_BYTES):
+        self.root = root
+        self.ttl = ttl
+        self.quota_bytes = quota_bytes
+        self.max_bytes = min(max_bytes, quota_bytes)
+        os.makedirs(root, exist_ok=True)
+        self._lock = FileLock(os.path.join(root, ".store.lock"))
+
+    def _data_path(self, artifact_id: str) -> str:
+        return os.path.join(self.root, f"{artifact_id}.zip")
+
+    def _meta_path(self, artifact_id: str) -> str:
+        return os.path.join(self.root, f"{artifact_id}.json")
+
+    def writer(self, filename: str) -> ArtifactWriter:
+        return ArtifactWriter(self, str(uuid.uuid4()), filename)
+
+    def _commit(self, writer: ArtifactWriter):
+        size = os.path.getsize(writer.tmp_path)
+        h = xxhash.xxh3_64()
+        with open(writer.tmp_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(block)
+        meta = {
+            "id": writer.id,
+            "filename": writer.filename,
+            "size": size,
+            "etag": h.hexdigest(),
+            "created_at": time.time(),
+        }
+        with self._lock:
+            self._evict(reserve=size)
+            with open(self._meta_path(writer.id), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(writer.tmp_path, self._data_path(writer.id))
+
+    def get(self, artifact_id: str) -> Optional[dict]:
+        # Ids are uuid4 strings; anything else could escape the store root.
+        try:
+            artifact_id = str(uuid.UUID(artifact_id))
+        except ValueError:
+            return None
+        meta_path = self._meta_path(artifact_id)
+        data_path = self._data_path(artifact_id)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - meta["created_at"] > self.ttl or not os.path.exists(data_path):
+            return None
+        try:
+            os.utime(data_path)
+        except OSError:
+            return None
+        return {**meta, "path": data_path}
+
+    def _entries(self) -> list:
+        entries = []
+        for name in os.listdir(self.root):
+            if not name.endswith(".zip"):
+                continue
+            artifact_id = name[:-4]
+            try:
+                stat = os.stat(os.path.join(self.root, name))
+                with open(self._meta_path(artifact_id), "r", encoding="utf-8") as f:
+                    created_at = json.load(f)["created_at"]
+            except (OSError, ValueError, KeyError):
+                created_at = 0
+                stat = None
+            entries.append((artifact_id, stat.st_mtime if stat else 0, stat.st_size if stat else 0, created_at))
+        return entries
+
+    def _remove(self, artifact_id: str):
+        for path in (self._data_path(artifact_id), self._meta_path(artifact_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _evict(self, reserve: int = 0):
+        now = time.time()
+        for name in os.listdir(self.root):
+            # Leftovers from writers that died mid-write.
+            if name.endswith(".partial"):
+                path = os.path.join(self.root, name)
+                try:
+                    if now - os.path.getmtime(path) > self.ttl:
+                        os.remove(path)
+                except OSError:
+                    pass
+
+        live = []
+        for artifact_id, accessed_at, size, created_at in self._entries():
+            if now - created_at > self.ttl:
+                self._remove(artifact_id)
+            else:
+                live.append((accessed_at, artifact_id, size))
+
+        total = sum(size for _, _, size in live) + reserve
+        for _, artifact_id, size in sorted(live):
+            if total <= self.quota_bytes:
+                break
+            self._remove(artifact_id)
+            total -= size
+
+    def cleanup(self):
+        with self._lock:
+            self._evict()
+
+
+artifact_store = ArtifactStore()
@@ -0,0 +1,103 @@
+import os
+import re
+import tempfile
+import xxhash
+from typing import Optional
+from app.utils.workspace import workspace_manager
+
+# Large per-file payloads (parsed source, commented files) are kept out of the
+# graph state: they are written once into the job's workspace, addressed by
+# content hash, and the state carries only "blob:<workspace id>/<digest>"
+# handles. The handle names the workspace, so it can be read from any process
+# on the host, including the parse workers.
+BLOB_REF_PATTERN = re.compile(r"^blob:([0-9a-f]{32})/([0-9a-f]{32})$")
+
+
+def text_digest(text: str) -> str:
+    return xxhash.xxh3_128_hexdigest(text.encode("utf-8"))
+
+
+class BlobStore:
+    def __init__(self, workspace_id: str, reserve: bool = True):
+        self.workspace_id = workspace_id
+        self.reserve = reserve
+        self.root = os.path.join(workspace_manager.path(workspace_id), "blobs")
+
+    def put(self, text: str) -> str:
+        """
+        Stores text and returns its handle. Identical text is stored once. With
+        reserve set, the bytes count against the workspace quota when the
+        workspace belongs to this process, and only for the call that actually
+        creates the blob.
+        """
+        digest = text_digest(text)
+        path = os.path.join(self.root, digest)
+        if not os.path.exists(path):
+            data = text.encode("utf-8")
+            workspace = workspace_manager.get(self.workspace_id) if self.reserve else None
+            if workspace is not None:
+                workspace.reserve(len(data))
+            os.makedirs(self.root, exist_ok=True)
+            # Every writer gets its own temporary file. Linking it into place
+            # fails if another thread or process stored the same text first,
+            # which tells the losers to give their reservation back.
+            created = False
+            fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.link(tmp_path, path)
+                created = True
+            except FileExistsError:
+                pass
+            finally:
+                os.unlink(tmp_path)
+                if not created and workspace is not None:
+                    workspace.unreserve(len(data))
+        return f"blob:{self.workspace_id}/{digest}"
+
+
+def _parse_ref(ref: str) -> tuple[str, str]:
+    match = BLOB_REF_PATTERN.match(ref or "")
+    if not match:
+        raise ValueError(f"Invalid blob handle: {ref!r}")
+    return match.group(1), match.group(2)
+
+
+def get_blob(ref: str) -> str:
+    workspace_id, digest = _parse_ref(ref)
+    with open(os.path.join(workspace_manager.path(workspace_id), "blobs", digest), "rb") as f:
+        return f.read().decode("utf-8")
+
+
+def blob_digest(ref: str) -> str:
+    return _parse_ref(ref)[1]
+
+
+def store_text(workspace_id: Optional[str], text: str) -> str:
+    """
+    Stores text in the job's blob store and returns its handle; without a
+    workspace the text itself is kept.
+    """
+    return BlobStore(workspace_id).put(text) if workspace_id else text
+
+
+def load_text(value: str) -> str:
+    # The inverse of store_text.
+    return get_blob(value) if BLOB_REF_PATTERN.match(value) else value
+
+
+def load_code(file_info: dict) -> str:
+    """
+    The source of a parsed file, read from its blob. Entries built outside the
+    graph may still carry the code inline.
+    """
+    if "code_ref" in file_info:
+        return get_blob(file_info["code_ref"])
+    return file_info.get("code", "")
+
+
+def code_digest(file_info: dict) -> str:
+    if "code_ref" in file_info:
+        return blob_digest(file_info["code_ref"])
+    return text_digest(file_info.get("code", ""))
@@ -0,0 +1,68 @@
+import os
+import sqlite3
+import threading
+
+# Graph checkpoints of API jobs, saved after every step so a failed or
+# interrupted job can be resumed where it stopped. Jobs use their id as the
+# LangGraph thread id. Only a job's latest checkpoint is kept while it runs,
+# and checkpoints of completed jobs are deleted straight away.
+CHECKPOINTS_ENABLED = os.getenv("DOCGEN_CHECKPOINTS", "1") != "0"
+CHECKPOINT_PATH = os.getenv("DOCGEN_CHECKPOINT_PATH", "/tmp/docgen_cache/checkpoints.sqlite")
+
+_saver = None
+_saver_lock = threading.Lock()
+
+
+def get_checkpointer():
+    """
+    The shared SQLite checkpointer, or None when checkpoints are disabled.
+    """
+    global _saver
+    if not CHECKPOINTS_ENABLED:
+        return None
+    if _saver is None:
+        with _saver_lock:
+            if _saver is None:
+                from langgraph.checkpoint.sqlite import SqliteSaver
+                os.makedirs(os.path.dirname(CHECKPOINT_PATH) or ".", exist_ok=True)
+                conn = sqlite3.connect(CHECKPOINT_PATH, timeout=30, check_same_thread=False)
+                # Worker processes share the file.
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                _saver = SqliteSaver(conn)
+    return _saver
+
+
+def thread_config(job_id: str) -> dict:
+    return {"configurable": {"thread_id": job_id}}
+
+
+def delete_checkpoints(job_id: str):
+    saver = get_checkpointer()
+    if saver is None:
+        return
+    try:
+        saver.delete_thread(job_id)
+    except sqlite3.Error as e:
+        print(f"[Checkpoints] Could not delete checkpoints of {job_id}: {e}")
+
+
+def prune_checkpoints(job_id: str):
+    """
+    Deletes every checkpoint of the job but the latest, with their pending
+    writes. A resume only reads the latest one, and each checkpoint holds the
+    whole state, so keeping them all grows the file with every step.
+    """
+    saver = get_checkpointer()
+    if saver is None:
+        return
+    try:
+        with saver.cursor() as cur:
+            for table in ("writes", "checkpoints"):
+                cur.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = '' AND checkpoint_id < "
+                    "(SELECT MAX(checkpoint_id) FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = '')",
+                    (job_id, job_id),
+                )
+    except sqlite3.Error as e:
+        print(f"[Checkpoints] Could not prune checkpoints of {job_id}: {e}")
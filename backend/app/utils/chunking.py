@@ -0,0 +1,77 @@
+import os
+from typing import Optional
+from app.utils.tokens import count_tokens
+
+# Token budget per code chunk sent to the LLM stages. Files under the budget
+# are sent whole.
+CHUNK_TOKEN_BUDGET = int(os.getenv("DOCGEN_CHUNK_TOKENS", "3000"))
+
+
+def _split_lines(lines: list[str], max_tokens: int) -> list[str]:
+    # Last resort for a single definition larger than the budget.
+    pieces = []
+    current = []
+    current_tokens = 0
+    for line in lines:
+        line_tokens = count_tokens(line)
+        if current and current_tokens + line_tokens > max_tokens:
+            pieces.append("".join(current))
+            current = []
+            current_tokens = 0
+        current.append(line)
+        current_tokens += line_tokens
+    if current:
+        pieces.append("".join(current))
+    return pieces
+
+
+def _segments(lines: list[str], start: int, end: int, cuts: list[list[int]], max_tokens: int) -> list[str]:
+    # Cuts at the shallowest boundaries inside [start, end) first, and only
+    # descends into a segment that is still over the budget.
+    text = "".join(lines[start:end])
+    if count_tokens(text) <= max_tokens:
+        return [text]
+
+    inner = [(line, depth) for line, depth in cuts if start < line < end]
+    if not inner:
+        return _split_lines(lines[start:end], max_tokens)
+
+    shallowest = min(depth for _, depth in inner)
+    starts = [start] + [line for line, depth in inner if depth == shallowest]
+    ends = starts[1:] + [end]
+    deeper = [cut for cut in inner if cut[1] > shallowest]
+
+    segments = []
+    for seg_start, seg_end in zip(starts, ends):
+        segments.extend(_segments(lines, seg_start, seg_end, deeper, max_tokens))
+    return segments
+
+
+def split_code_into_chunks(code: str, boundaries: Optional[list] = None,
+                           max_tokens: int = CHUNK_TOKEN_BUDGET) -> list[str]:
+    """
+    Splits code into chunks of at most max_tokens, cutting only at the
+    [line, depth] boundaries parse_code records for each file and preferring
+    top-level ones. The chunks concatenate back to the original code, with no
+    overlap.
+    """
+    if count_tokens(code) <= max_tokens:
+        return [code]
+
+    lines = code.splitlines(keepends=True)
+    segments = _segments(lines, 0, len(lines), boundaries or [], max_tokens)
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for segment in segments:
+        segment_tokens = count_tokens(segment)
+        if current and current_tokens + segment_tokens > max_tokens:
+            chunks.append("".join(current))
+            current = []
+            current_tokens = 0
+        current.append(segment)
+        current_tokens += segment_tokens
+    if current:
+        chunks.append("".join(current))
+    return chunks
@@ -0,0 +1,176 @@
+import re
+import json
+from typing import Optional
+
+# Insert-only comment patches: the model returns where to add comments instead
+# of echoing the whole file back, and the comments are rendered and inserted
+# locally, so the original lines are never rewritten.
+
+DEFINITION_PATTERN = re.compile(r"^\s*(async\s+def|def|class)\s")
+PYTHON_STRING_PREFIX = re.compile(r"^[rRbBuUfF]{0,2}(\"|')")
+
+
+def get_comment_syntax(lang: str) -> dict:
+    lang = lang.lower()
+    if lang in ["py", "python"]:
+        return {"start": "\"\"\"", "end": "\"\"\""}
+    elif lang in ["js", "ts", "java", "c", "cpp"]:
+        return {"start": "/**", "end": "*/"}
+    elif lang in ["go"]:
+        return {"start": "//", "end": ""}
+    elif lang in ["rb", "swift"]:
+        return {"start": "///", "end": ""}
+    elif lang in ["css"]:
+        return {"start": "/*", "end": "*/"}
+    elif lang in ["html", "htm"]:
+        return {"start": "<!--", "end": "-->"}
+    else:
+        return {"start": "//", "end": ""}
+
+
+def number_lines(chunk: str, first_line: int) -> str:
+    return "".join(
+        f"{first_line + offset:>5}| {line}"
+        for offset, line in enumerate(chunk.splitlines(keepends=True))
+    )
+
+
+def parse_insertions(response: str) -> list[dict]:
+    """
+    Reads the JSON array of {"line", "symbol", "comment"} objects from a model
+    response, ignoring anything around it. Malformed entries are dropped.
+    """
+    text = re.sub(r"<think>.*?</think>", "", response, flags=re.DOTALL)
+    start, end = text.find("["), text.rfind("]")
+    if start == -1 or end <= start:
+        return []
+    try:
+        items = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return []
+    if not isinstance(items, list):
+        return []
+
+    insertions = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        line = item.get("line")
+        comment = item.get("comment")
+        if not isinstance(line, int) or isinstance(line, bool) or not isinstance(comment, str) or not comment.strip():
+            continue
+        symbol = item.get("symbol")
+        insertions.append({
+            "line": line,
+            "symbol": symbol.strip() if isinstance(symbol, str) else "",
+            "comment": comment.strip(),
+        })
+    return insertions
+
+
+def resolve_anchor(lines: list[str], insertion: dict, first_line: int, last_line: int) -> Optional[int]:
+    """
+    Returns the 0-based line index the comment belongs above, or None when the
+    anchor falls outside [first_line, last_line] (1-based) or the symbol can't
+    be found on or near it.
+    """
+    line = insertion["line"]
+    if not first_line <= line <= last_line or not lines[line - 1].strip():
+        return None
+    symbol = insertion["symbol"]
+    if not symbol or symbol in lines[line - 1]:
+        return line - 1
+    for distance in (1, 2, 3):
+        for candidate in (line - distance, line + distance):
+            if first_line <= candidate <= last_line and symbol in lines[candidate - 1]:
+                return candidate - 1
+    return None
+
+
+def _indent(line: str) -> str:
+    return line[:len(line) - len(line.lstrip())]
+
+
+def _next_code_line(lines: list[str], index: int) -> Optional[str]:
+    for line in lines[index + 1:]:
+        if line.strip():
+            return line
+    return None
+
+
+def render_comment(lines: list[str], index: int, text: str, lang: str) -> Optional[tuple[int, list[str]]]:
+    """
+    Renders a comment for the line at index in the file's comment syntax.
+    Returns (insert_before_index, comment_lines), or None when the text can't be
+    placed safely.
+    """
+    syntax = get_comment_syntax(lang)
+    anchor = lines[index]
+    indent = _indent(anchor)
+    newline = "\r\n" if anchor.endswith("\r\n") else "\n"
+    text_lines = [line.rstrip() for line in text.splitlines() if line.strip()]
+    if not text_lines:
+        return None
+
+    start, end = syntax["start"], syntax["end"]
+    if end and any(end in line for line in text_lines):
+        return None
+
+    if start == '"""':
+        # Python gets a docstring on definitions and line comments elsewhere.
+        header = anchor.rstrip()
+        if DEFINITION_PATTERN.match(anchor) and header.endswith(":") and not any("\\" in line or '"' in line for line in text_lines):
+            body = _next_code_line(lines, index)
+            if body is not None and PYTHON_STRING_PREFIX.match(body.strip()):
+                return None
+            body_indent = _indent(body) if body is not None and len(_indent(body)) > len(indent) else indent + "    "
+            if len(text_lines) == 1:
+                rendered = [f'{body_indent}"""{text_lines[0]}"""']
+            else:
+                rendered = [f'{body_indent}"""'] + [f"{body_indent}{line}" for line in text_lines] + [f'{body_indent}"""']
+            return index + 1, [line + newline for line in rendered]
+        return index, [f"{indent}# {line}{newline}" for line in text_lines]
+
+    if not end:
+        return index, [f"{indent}{start} {line}{newline}" for line in text_lines]
+    if start == "<!--" and any("--" in line for line in text_lines):
+        return None
+    if start == "/**" and len(text_lines) > 1:
+        rendered = [f"{indent}/**"] + [f"{indent} * {line}" for line in text_lines] + [f"{indent} */"]
+        return index, [line + newline for line in rendered]
+    return index, [f"{indent}{start} {line} {end}{newline}" for line in text_lines]
+
+
+def apply_insertions(code: str, placed: list[tuple[int, list[str]]]) -> tuple[str, list[tuple[int, int, int]]]:
+    """
+    Inserts rendered comments, given as (insert_before_index, comment_lines),
+    into code without touching any existing line. Returns the new code and, for
+    each insert position, the 0-based (position, first, last) line range its
+    comments occupy in the new code.
+    """
+    lines = code.splitlines(keepends=True)
+    if lines and not lines[-1].endswith("\n"):
+        # A comment inserted after the last line needs a line break before it.
+        lines[-1] += "\n"
+        trailing_newline_added = True
+    else:
+        trailing_newline_added = False
+
+    by_position = {}
+    for position, comment_lines in placed:
+        by_position.setdefault(position, []).extend(comment_lines)
+
+    output = []
+    ranges = []
+    for index in range(len(lines) + 1):
+        if index in by_position:
+            first = len(output)
+            output.extend(by_position[index])
+            ranges.append((index, first, len(output) - 1))
+        if index < len(lines):
+            output.append(lines[index])
+
+    result = "".join(output)
+    if trailing_newline_added and result.endswith("\n") and len(lines) not in by_position:
+        result = result[:-1]
+    return result, ranges
@@ -0,0 +1,53 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Max number of in-flight LLM requests per provider. Tune through env vars to
+# match the quota of the account being used.
+PROVIDER_CONCURRENCY = {
+    "mistralai": int(os.getenv("MISTRAL_MAX_CONCURRENCY", "4")),
+    "groq": int(os.getenv("GROQ_MAX_CONCURRENCY", "2")),
+}
+
+# Number of files processed at the same time by the summarize/comment stage.
+FILE_CONCURRENCY = int(os.getenv("DOCGEN_FILE_CONCURRENCY", "8"))
+
+_provider_slots = {
+    provider: threading.BoundedSemaphore(max(1, width))
+    for provider, width in PROVIDER_CONCURRENCY.items()
+}
+
+
+def provider_slot(provider: str) -> threading.BoundedSemaphore:
+    if provider not in _provider_slots:
+        _provider_slots[provider] = threading.BoundedSemaphore(max(1, PROVIDER_CONCURRENCY.get(provider, 1)))
+    return _provider_slots[provider]
+
+
+def map_ordered(fn, items, max_workers: int, on_result=None) -> list:
+    """
+    Runs fn over items on a bounded thread pool and returns the results in the
+    same order as items, so merging them gives the same output as a serial loop.
+    on_result(index, result) is called from the calling thread as each item
+    finishes, in completion order.
+    """
+    items = list(items)
+    if not items:
+        return []
+    if max_workers <= 1 or len(items) == 1:
+        results = []
+        for index, item in enumerate(items):
+            results.append(fn(item))
+            if on_result:
+                on_result(index, results[-1])
+        return results
+
+    results = [None] * len(items)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        futures = {executor.submit(fn, item): index for index, item in enumerate(items)}
+        for future in as_completed(futures):
+            index = futures[future]
+            results[index] = future.result()
+            if on_result:
+                on_result(index, results[index])
+    return results
@@ -1,37 +1,182 @@
 import os
-import base64
+import uuid
+import shutil
 import zipfile
 import requests
-import io
-
-def clone_github_repo(repo_url: str, repo_id: str, branch: str = "main") -> str:
-    temp_dir = f"/tmp/ClonedRepos/{repo_id}"
-    os.makedirs(temp_dir, exist_ok=True)
-    zip_url = repo_url.rstrip("/") + f"/archive/refs/heads/{branch}.zip"
-    zip_path = os.path.join(temp_dir, "repo.zip")
-    response = requests.get(zip_url)
-    response.raise_for_status()
-    with open(zip_path, "wb") as f:
-        f.write(response.content)
+import xxhash
+from typing import Optional
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from app.utils import archive_cache
+from app.utils.workspace import Workspace
+
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+HTTP_TIMEOUT = (10, 120)
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+MAX_DOWNLOAD_BYTES = int(os.getenv("DOCGEN_MAX_DOWNLOAD_BYTES", str(1024 * 1024 * 1024)))
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv("DOCGEN_MAX_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+# Limits on uncompressed source read out of an uploaded archive.
+MAX_MEMBER_BYTES = int(os.getenv("DOCGEN_MAX_MEMBER_BYTES", str(2 * 1024 * 1024)))
+MAX_ARCHIVE_SOURCE_BYTES = int(os.getenv("DOCGEN_MAX_ARCHIVE_SOURCE_BYTES", str(256 * 1024 * 1024)))
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504], allowed_methods=["GET", "HEAD"])
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    token = os.getenv("GITHUB_TOKEN")
+    if token:
+        session.headers["Authorization"] = f"Bearer {token}"
+    return session
+
+http_session = _build_session()
+
+def _repo_parts(repo_url: str):
+    parsed = urlparse(repo_url.rstrip("/"))
+    path = parsed.path.strip("/")
+    if path.endswith(".git"):
+        path = path[:-4]
+    owner, _, repo = path.partition("/")
+    return parsed, owner, repo
+
+def resolve_commit(repo_url: str, branch: str) -> Optional[str]:
+    """
+    Resolves a branch to its head commit through the GitHub API. The request is
+    conditional on the last ETag we saw, so an unchanged branch costs a 304.
+    """
+    parsed, owner, repo = _repo_parts(repo_url)
+    if parsed.netloc not in ("github.com", "www.github.com") and "GITHUB_API_URL" not in os.environ:
+        return None
+
+    ref_key = f"commit:{owner}/{repo}@{branch}"
+    known = archive_cache.load_ref(ref_key)
+    headers = {"Accept": "application/vnd.github.sha"}
+    if known.get("etag"):
+        headers["If-None-Match"] = known["etag"]
+
+    try:
+        response = http_session.get(
+            f"{GITHUB_API_URL}/repos/{owner}/{repo}/commits/{branch}", headers=headers, timeout=HTTP_TIMEOUT
+        )
+    except requests.RequestException as e:
+        print(f"[GitHub] Could not resolve {owner}/{repo}@{branch}: {e}")
+        return known.get("commit")
+
+    if response.status_code == 304:
+        return known.get("commit")
+    if response.status_code != 200:
+        print(f"[GitHub] Commit lookup for {owner}/{repo}@{branch} returned {response.status_code}")
+        return None
+
+    commit = response.text.strip()
+    archive_cache.save_ref(ref_key, {"etag": response.headers.get("ETag"), "commit": commit})
+    return commit
+
+def _download_archive(zip_url: str, dest_path: str, etag: Optional[str] = None) -> Optional[requests.Response]:
+    headers = {"If-None-Match": etag} if etag else {}
+    with http_session.get(zip_url, headers=headers, stream=True, timeout=HTTP_TIMEOUT) as response:
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        size = 0
+        with open(dest_path, "wb") as f:
+            for block in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                size += len(block)
+                if size > MAX_DOWNLOAD_BYTES:
+                    raise ValueError(f"Repository archive exceeds the {MAX_DOWNLOAD_BYTES} byte limit")
+                f.write(block)
+        return response
+
+def _extract_archive(zip_path: str, dest_dir: str) -> str:
     with zipfile.ZipFile(zip_path, "r") as zip_ref:
-        zip_ref.extractall(temp_dir)
-    extracted_folder_name = os.listdir(temp_dir)
-    extracted_folder_name = [name for name in extracted_folder_name if os.path.isdir(os.path.join(temp_dir, name)) and name != "__MACOSX"]
+        zip_ref.extractall(dest_dir)
+    os.remove(zip_path)
+    extracted_folder_name = os.listdir(dest_dir)
+    extracted_folder_name = [name for name in extracted_folder_name if os.path.isdir(os.path.join(dest_dir, name)) and name != "__MACOSX"]
     if extracted_folder_name:
-        extracted_path = os.path.join(temp_dir, extracted_folder_name[0])
-        return extracted_path
+        return extracted_folder_name[0]
+    return "."
+
+def clone_github_repo(repo_url: str, branch: str = "main") -> str:
+    repo_url = repo_url.rstrip("/")
+    commit = resolve_commit(repo_url, branch)
+    ref_key = f"archive:{repo_url.lower()}@{branch}"
+
+    if commit:
+        key = xxhash.xxh3_64_hexdigest(f"{repo_url.lower()}@{commit}")
+        cached = archive_cache.lookup(key)
+        if cached:
+            print(f"[Archive Cache] Hit for {repo_url}@{commit[:12]}")
+            return cached
+        zip_url = f"{repo_url}/archive/{commit}.zip"
     else:
-        return temp_dir
+        zip_url = f"{repo_url}/archive/refs/heads/{branch}.zip"
+
+    # One download per repo/ref at a time; later callers find the cached entry.
+    with archive_cache.lock(xxhash.xxh3_64_hexdigest(ref_key)):
+        if commit and archive_cache.lookup(key):
+            return archive_cache.lookup(key)
+
+        # Without a resolved commit, fall back to a conditional download against
+        # the ETag of the archive we already hold for this branch.
+        known = archive_cache.load_ref(ref_key)
+        etag = None
+        if not commit and known.get("key") and archive_cache.lookup(known["key"]):
+            etag = known.get("etag")
+
+        staged = archive_cache.staging_dir(xxhash.xxh3_64_hexdigest(zip_url))
+        zip_path = os.path.join(staged, "repo.zip")
+        try:
+            response = _download_archive(zip_url, zip_path, etag=etag)
+            if response is None:
+                print(f"[Archive Cache] {repo_url}@{branch} not modified")
+                shutil.rmtree(staged, ignore_errors=True)
+                return archive_cache.lookup(known["key"])
+
+            if not commit:
+                etag = response.headers.get("ETag")
+                key = xxhash.xxh3_64_hexdigest(f"{repo_url.lower()}@{branch}@{etag or uuid.uuid4()}")
+            root = _extract_archive(zip_path, staged)
+        except Exception:
+            shutil.rmtree(staged, ignore_errors=True)
+            raise
+
+        path = archive_cache.commit(key, staged, root)
+        archive_cache.save_ref(ref_key, {"etag": None if commit else etag, "key": key, "commit": commit})
+        return path
 
-def extract_zip_file(base64_data: str, dest_dir: str) -> str:
-    base_temp_dir = f"/tmp/ClonedRepos/{dest_dir}"
-    os.makedirs(base_temp_dir, exist_ok=True)
-    zip_data = base64.b64decode(base64_data)
-    zip_path = os.path.join(base_temp_dir, "code.zip")
+def save_upload(fileobj, workspace: Workspace, max_bytes: int = MAX_UPLOAD_BYTES) -> tuple[str, str]:
+    """
+    Copies an uploaded archive into the job's workspace in fixed-size chunks,
+    aborting as soon as it grows past max_bytes or the workspace quota. The
+    graph reads source members straight from the saved archive, so it is never
+    extracted or held in memory. Returns the archive path and a hash of its
+    contents.
+    """
+    zip_path = workspace.file("code.zip")
+    digest = xxhash.xxh3_128()
+    size = 0
     with open(zip_path, "wb") as f:
-        f.write(zip_data)
-    extract_path = os.path.join(base_temp_dir, "extracted")
-    os.makedirs(extract_path, exist_ok=True)
-    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extractall(extract_path)
-    return extract_path
+        while True:
+            block = fileobj.read(UPLOAD_CHUNK_BYTES)
+            if not block:
+                break
+            size += len(block)
+            try:
+                if size > max_bytes:
+                    raise ValueError(f"Upload exceeds the {max_bytes} byte limit")
+                workspace.reserve(len(block))
+            except Exception:
+                f.close()
+                os.remove(zip_path)
+                raise
+            f.write(block)
+            digest.update(block)
+    if not zipfile.is_zipfile(zip_path):
+        os.remove(zip_path)
+        raise ValueError("Uploaded file is not a valid zip archive")
+    return zip_path, digest.hexdigest()
@@ -0,0 +1,62 @@
+import os
+import json
+import sqlite3
+from contextlib import closing
+from app.utils.workspace import workspace_manager
+
+# Results of a job's per-file stage, kept in a SQLite file in the job's
+# workspace rather than in the graph state. The state is checkpointed after
+# every batch, so results carried in it were written out again with each
+# checkpoint; here a batch only adds its own rows. The file goes away with the
+# workspace, and a resumed job, which keeps its workspace, finds it again.
+RESULTS_FILE = "file_results.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_results (
+    path TEXT PRIMARY KEY,
+    summary TEXT,
+    commented TEXT,
+    treatment TEXT NOT NULL
+);
+"""
+
+
+def _connect(workspace_id: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(os.path.join(workspace_manager.path(workspace_id), RESULTS_FILE), timeout=30)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def save_results(workspace_id: str, results: dict):
+    """
+    Upserts results, {path: {"summary": (text, entry) or None, "commented":
+    blob handle or None, "treatment"}}. The rows count against the workspace
+    quota when the workspace belongs to this process.
+    """
+    if not results:
+        return
+    rows = [
+        (path, json.dumps(result["summary"]) if result.get("summary") is not None else None,
+         result.get("commented"), result["treatment"])
+        for path, result in results.items()
+    ]
+    workspace = workspace_manager.get(workspace_id)
+    if workspace is not None:
+        workspace.reserve(sum(len(path) + len(summary or "") + len(commented or "") for path, summary, commented, _ in rows))
+    with closing(_connect(workspace_id)) as conn, conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO file_results (path, summary, commented, treatment) VALUES (?, ?, ?, ?)", rows
+        )
+
+
+def load_results(workspace_id: str) -> dict:
+    """
+    Every result saved for the workspace's job, in the shape save_results takes.
+    """
+    with closing(_connect(workspace_id)) as conn:
+        rows = conn.execute("SELECT path, summary, commented, treatment FROM file_results").fetchall()
+    return {
+        path: {"summary": json.loads(summary) if summary is not None else None, "commented": commented,
+               "treatment": treatment}
+        for path, summary, commented, treatment in rows
+    }
@@ -0,0 +1,253 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Optional
+
+# Durable job queue shared by the API and every worker process on the host.
+# The API inserts jobs; workers claim them under a lease they keep renewing
+# while the job runs. A job whose lease runs out (its worker died) is handed to
+# the next worker that asks. Progress events and results are stored alongside,
+# so any API process can serve them.
+QUEUE_PATH = os.getenv("DOCGEN_QUEUE_PATH", "/tmp/docgen_cache/jobs.sqlite")
+LEASE_SECONDS = float(os.getenv("DOCGEN_JOB_LEASE_SECONDS", "60"))
+# Claims of one job before it is failed instead of handed out again.
+MAX_ATTEMPTS = int(os.getenv("DOCGEN_JOB_MAX_ATTEMPTS", "3"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    workspace_id TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    resumable INTEGER NOT NULL DEFAULT 0,
+    dedupe_key TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+# Columns added since the table was first released, for queue files created before.
+MIGRATIONS = {
+    "dedupe_key": "ALTER TABLE jobs ADD COLUMN dedupe_key TEXT",
+}
+INDEXES = """
+CREATE INDEX IF NOT EXISTS jobs_dedupe_key ON jobs(dedupe_key, status);
+"""
+
+FINISHED = ("completed", "failed")
+
+
+class JobQueue:
+    def __init__(self, path: str = QUEUE_PATH, lease_seconds: float = LEASE_SECONDS, max_attempts: int = MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._setup_lock = threading.Lock()
+        self._is_setup = False
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread; SQLite serializes the writers.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._setup_lock:
+                if not self._is_setup:
+                    conn.executescript(SCHEMA)
+                    columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+                    for column, statement in MIGRATIONS.items():
+                        if column not in columns:
+                            conn.execute(statement)
+                    conn.executescript(INDEXES)
+                    self._is_setup = True
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self) -> "_Transaction":
+        return _Transaction(self._connection())
+
+    def enqueue(self, job_id: str, payload: str, workspace_id: Optional[str] = None,
+                dedupe_key: Optional[str] = None, memo_seconds: float = 0.0) -> sqlite3.Row:
+        """
+        Adds a job and returns its row. If dedupe_key matches a queued or
+        running job, or one that completed within memo_seconds, that job's row
+        is returned instead and nothing is added.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            if dedupe_key is not None:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE dedupe_key = ? AND (status IN ('queued', 'running') "
+                    "OR (status = 'completed' AND finished_at >= ?)) ORDER BY created_at DESC LIMIT 1",
+                    (dedupe_key, now - memo_seconds),
+                ).fetchone()
+                if row is not None:
+                    return row
+            conn.execute(
+                "INSERT INTO jobs (id, status, payload, workspace_id, created_at, dedupe_key) "
+                "VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, payload, workspace_id, now, dedupe_key),
+            )
+            return conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def claim(self, worker_id: str) -> Optional[sqlite3.Row]:
+        """
+        Leases the oldest queued job, or a running one whose lease expired, to
+        worker_id. Jobs that already used up their attempts are failed instead.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            while True:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' OR (status = 'running' AND lease_expires < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    return None
+                if row["status"] == "running" and row["attempts"] >= self.max_attempts:
+                    # Most likely the job itself takes its workers down. It stays
+                    # resumable by hand, since its checkpoints are still there.
+                    error = f"Job was abandoned by {row['attempts']} workers"
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', finished_at = ?, lease_owner = NULL, lease_expires = NULL, "
+                        "error = ?, resumable = 1 WHERE id = ?",
+                        (now, error, row["id"]),
+                    )
+                    self._publish(conn, row["id"], {"type": "job", "status": "failed", "error": error, "resumable": True})
+                    continue
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = COALESCE(started_at, ?), lease_owner = ?, "
+                    "lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                    (now, worker_id, now + self.lease_seconds, row["id"]),
+                )
+                return conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+
+    def renew(self, job_id: str, worker_id: str) -> bool:
+        """
+        Extends worker_id's lease on job_id. False means the lease was lost and
+        another worker may have the job now.
+        """
+        cursor = self._connection().execute(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND status = 'running' AND lease_owner = ?",
+            (time.time() + self.lease_seconds, job_id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def finish(self, job_id: str, worker_id: str, status: str, result: dict = None, error: str = None,
+               resumable: bool = False) -> bool:
+        """
+        Records the outcome of a job worker_id still holds the lease on, and
+        publishes its final event in the same transaction. False means the
+        lease was lost and nothing was recorded.
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, lease_owner = NULL, lease_expires = NULL, "
+                "result = ?, error = ?, resumable = ? WHERE id = ? AND status = 'running' AND lease_owner = ?",
+                (status, time.time(), json.dumps(result) if result is not None else None, error, int(resumable),
+                 job_id, worker_id),
+            )
+            if cursor.rowcount != 1:
+                return False
+            self._publish(conn, job_id, {"type": "job", "status": status, "error": error, "resumable": resumable})
+        return True
+
+    def requeue(self, job_id: str) -> bool:
+        """
+        Puts a failed, resumable job back in the queue.
+        """
+        cursor = self._connection().execute(
+            "UPDATE jobs SET status = 'queued', finished_at = NULL, error = NULL, result = NULL, resumable = 0, "
+            "attempts = 0 WHERE id = ? AND status = 'failed' AND resumable = 1",
+            (job_id,),
+        )
+        return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[sqlite3.Row]:
+        return self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def publish(self, job_id: str, event: dict) -> dict:
+        with self._transaction() as conn:
+            return self._publish(conn, job_id, event)
+
+    def _publish(self, conn: sqlite3.Connection, job_id: str, event: dict) -> dict:
+        seq = conn.execute("SELECT COALESCE(MAX(seq) + 1, 0) FROM job_events WHERE job_id = ?", (job_id,)).fetchone()[0]
+        event = {"seq": seq, "time": time.time(), **event}
+        conn.execute("INSERT INTO job_events (job_id, seq, payload) VALUES (?, ?, ?)", (job_id, seq, json.dumps(event)))
+        return event
+
+    def events(self, job_id: str, cursor: int = 0) -> list:
+        rows = self._connection().execute(
+            "SELECT payload FROM job_events WHERE job_id = ? AND seq >= ? ORDER BY seq", (job_id, cursor)
+        ).fetchall()
+        return [json.loads(row["payload"]) for row in rows]
+
+    def pinned_workspaces(self) -> set:
+        """
+        Workspaces that jobs still need: queued, running, or waiting to be resumed.
+        """
+        rows = self._connection().execute(
+            "SELECT workspace_id FROM jobs WHERE workspace_id IS NOT NULL "
+            "AND (status IN ('queued', 'running') OR resumable = 1)"
+        ).fetchall()
+        return {row["workspace_id"] for row in rows}
+
+    def prune(self, ttl_seconds: float) -> list:
+        """
+        Deletes jobs that finished more than ttl_seconds ago, with their events.
+        Returns the deleted rows.
+        """
+        cutoff = time.time() - ttl_seconds
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, workspace_id, resumable FROM jobs WHERE status IN ('completed', 'failed') "
+                "AND finished_at < ?",
+                (cutoff,),
+            ).fetchall()
+            for row in rows:
+                conn.execute("DELETE FROM job_events WHERE job_id = ?", (row["id"],))
+                conn.execute("DELETE FROM jobs WHERE id = ?", (row["id"],))
+        return rows
+
+    def depth(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+
+class _Transaction:
+    """
+    BEGIN IMMEDIATE ... COMMIT around a block, so a read followed by a write
+    can't interleave with another process doing the same.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+job_queue = JobQueue()
@@ -0,0 +1,363 @@
+import os
+import json
+import time
+import uuid
+import socket
+import xxhash
+import threading
+from typing import Optional
+from urllib.parse import urlparse
+from app.utils.metrics import JOBS, JOBS_RUNNING, JOBS_COALESCED
+from app.utils.workspace import workspace_manager
+from app.utils.file_ops import resolve_commit
+from app.utils.checkpoints import get_checkpointer, thread_config, delete_checkpoints, prune_checkpoints
+from app.utils.job_queue import job_queue, JobQueue, FINISHED
+
+# The API only puts jobs in the shared queue (app.utils.job_queue); workers,
+# started with `python -m app.worker` on any number of processes, run them.
+# DOCGEN_EMBEDDED_WORKERS jobs also run inside the API process itself, so a
+# single process still works on its own; set it to 0 for an API-only process.
+# Finished jobs are kept for JOB_TTL_SECONDS for status polling.
+MAX_CONCURRENT_JOBS = int(os.getenv("DOCGEN_MAX_JOBS", "4"))
+EMBEDDED_WORKERS = int(os.getenv("DOCGEN_EMBEDDED_WORKERS", str(MAX_CONCURRENT_JOBS)))
+JOB_TTL_SECONDS = int(os.getenv("DOCGEN_JOB_TTL", "3600"))
+# How often idle workers look for jobs and waiting clients for events.
+POLL_SECONDS = float(os.getenv("DOCGEN_JOB_POLL_SECONDS", "0.25"))
+# Identical submissions (see job_key) share the job already queued or running,
+# or the result of one that completed within RESULT_MEMO_SECONDS.
+COALESCE_JOBS = os.getenv("DOCGEN_COALESCE_JOBS", "1") != "0"
+RESULT_MEMO_SECONDS = float(os.getenv("DOCGEN_RESULT_MEMO_SECONDS", "120"))
+
+RESULT_KEYS = ["readme", "summaries", "modified_files", "visuals", "folder_tree", "input_type", "downgraded"]
+
+# The graph (and with it LangGraph and the LLM clients) is built by the first
+# job a process runs, so API-only processes never load it.
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_graph():
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                from app.graph.graph import build_graph
+                _graph = build_graph(checkpointer=get_checkpointer())
+    return _graph
+
+
+def job_key(state) -> Optional[str]:
+    """
+    Identifies submissions that would produce the same result: the same
+    repository commit (or branch, when the commit can't be resolved) or the
+    same uploaded archive, with the same preferences and budget.
+    """
+    if state.input_type == "github" and isinstance(state.input_data, str):
+        parsed = urlparse(state.input_data.strip().rstrip("/").lower())
+        host = parsed.netloc.removeprefix("www.")
+        path = parsed.path.strip("/").removesuffix(".git")
+        branch = state.branch or "main"
+        # Served from the ref cache with a conditional request; a new push
+        # makes a new job.
+        commit = resolve_commit(f"https://{host}/{path}", branch) or ""
+        source = f"github:{host}/{path}@{branch}:{commit}"
+    elif state.input_type == "zip" and state.input_digest:
+        source = f"zip:{state.input_digest}"
+    else:
+        return None
+    options = {
+        "preferences": state.preferences.model_dump() if state.preferences else None,
+        "budget": state.budget.model_dump() if state.budget else None,
+    }
+    return xxhash.xxh3_128_hexdigest(f"{source}\0{json.dumps(options, sort_keys=True)}")
+
+
+class JobNotResumable(Exception):
+    pass
+
+
+class Job:
+    """
+    A job as last read from the queue.
+    """
+
+    def __init__(self, row, queue: JobQueue):
+        self.id = row["id"]
+        self.status = row["status"]
+        self.created_at = row["created_at"]
+        self.finished_at = row["finished_at"]
+        self.result = json.loads(row["result"]) if row["result"] else None
+        self.error = row["error"]
+        # Set when the job failed with its progress checkpointed.
+        self.resumable = bool(row["resumable"])
+        self.workspace_id = row["workspace_id"]
+        self._queue = queue
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED
+
+    def progress(self) -> dict:
+        events = self._queue.events(self.id)
+        nodes = [e["node"] for e in events if e["type"] == "node"]
+        # Failed files report an error instead of counts.
+        files = [e for e in events if e["type"] == "file" and "done" in e]
+        return {
+            "completed_nodes": nodes,
+            "files_done": files[-1]["done"] if files else 0,
+            "files_total": files[-1]["total"] if files else None,
+        }
+
+    def to_dict(self, include_result: bool = True) -> dict:
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "progress": self.progress(),
+            "error": self.error,
+            "resumable": self.resumable,
+        }
+        if include_result and self.status == "completed":
+            data["result"] = self.result
+        return data
+
+
+class JobManager:
+    def __init__(self, queue: JobQueue = job_queue, embedded_workers: int = EMBEDDED_WORKERS):
+        self.queue = queue
+        self.embedded_workers = embedded_workers
+        self._worker = None
+        self._lock = threading.Lock()
+        # Queued jobs' workspaces are refreshed by nobody until a worker claims them.
+        workspace_manager.add_pin_source(queue.pinned_workspaces)
+
+    def submit(self, state) -> Job:
+        """
+        Queues a job for state, or returns the identical job already queued,
+        running or just completed when coalescing is on.
+        """
+        self._prune()
+        job_id = str(uuid.uuid4())
+        key = job_key(state) if COALESCE_JOBS else None
+        # Allocated here rather than left to fetch_code, so whichever worker
+        # runs the job can release it. Detached, its upload stays charged to
+        # the host's workspace allowance until a worker adopts it.
+        if state.workspace_id is None:
+            state.workspace_id = workspace_manager.create().id
+        workspace_manager.detach(state.workspace_id)
+        row = self.queue.enqueue(job_id, state.model_dump_json(), state.workspace_id, key, RESULT_MEMO_SECONDS)
+        if row["id"] != job_id:
+            # Nobody will claim this submission, so its workspace goes now.
+            workspace_manager.release(state.workspace_id)
+            JOBS_COALESCED.labels(source="memo" if row["status"] == "completed" else "in_flight").inc()
+            return Job(row, self.queue)
+        self._start_embedded_worker()
+        return Job(row, self.queue)
+
+    def resume(self, job_id: str) -> Optional[Job]:
+        """
+        Queues a failed or interrupted job again; the worker that claims it
+        continues from the job's last checkpoint. Returns None for unknown jobs.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if not job.done:
+            raise JobNotResumable("Job is still running")
+        if job.status == "completed":
+            raise JobNotResumable("Job already completed")
+        if not job.resumable:
+            raise JobNotResumable("Job has no saved progress")
+        if job.workspace_id and not os.path.isdir(workspace_manager.path(job.workspace_id)):
+            raise JobNotResumable("Job workspace no longer exists")
+        if not self.queue.requeue(job_id):
+            raise JobNotResumable("Job is no longer resumable")
+        self._start_embedded_worker()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        row = self.queue.get(job_id)
+        return Job(row, self.queue) if row is not None else None
+
+    def wait_for_events(self, job_id: str, cursor: int, timeout: float) -> tuple[list, bool]:
+        """
+        Blocks until there are events past cursor, the job is finished, or the
+        timeout expires. Returns the new events and whether the job is finished,
+        in which case they are its last.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            # Read before the events: a job's final event is written together
+            # with its status.
+            row = self.queue.get(job_id)
+            done = row is None or row["status"] in FINISHED
+            events = self.queue.events(job_id, cursor)
+            if events or done or time.monotonic() >= deadline:
+                return events, done
+            time.sleep(POLL_SECONDS)
+
+    def _start_embedded_worker(self):
+        if self.embedded_workers <= 0:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = Worker(self.embedded_workers, self.queue)
+                self._worker.start()
+
+    def _prune(self):
+        for row in self.queue.prune(JOB_TTL_SECONDS):
+            if row["resumable"]:
+                workspace_manager.release(row["workspace_id"])
+                delete_checkpoints(row["id"])
+
+
+class Worker:
+    """
+    Claims jobs from the queue and runs them, up to concurrency at a time.
+    While a job runs its lease is renewed every third of the lease time; if the
+    process dies the lease runs out and another worker takes the job over,
+    resuming from its last checkpoint.
+    """
+
+    def __init__(self, concurrency: int = MAX_CONCURRENT_JOBS, queue: JobQueue = job_queue):
+        self.id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.concurrency = concurrency
+        self.queue = queue
+        self.running = set()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for n in range(self.concurrency):
+            thread = threading.Thread(target=self._claim_forever, name=f"docgen-job-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat_forever, name="docgen-job-heartbeat", daemon=True)
+        heartbeat.start()
+        print(f"[Worker {self.id}] Running up to {self.concurrency} jobs")
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Stops claiming jobs and waits for the running ones to finish.
+        """
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _claim_forever(self):
+        while not self._stopping.is_set():
+            try:
+                row = self.queue.claim(self.id)
+            except Exception as e:
+                print(f"[Worker {self.id}] Could not claim a job: {e}")
+                row = None
+            if row is None:
+                self._stopping.wait(POLL_SECONDS)
+                continue
+            with self._lock:
+                self.running.add(row["id"])
+            try:
+                self._run(row)
+            except Exception as e:
+                print(f"[Job {row['id']}] Failed: {e}")
+            finally:
+                with self._lock:
+                    self.running.discard(row["id"])
+
+    def _heartbeat_forever(self):
+        # Outlives stop(), since running jobs still need their leases.
+        while True:
+            time.sleep(self.queue.lease_seconds / 3)
+            with self._lock:
+                running = list(self.running)
+            for job_id in running:
+                try:
+                    if not self.queue.renew(job_id, self.id):
+                        print(f"[Job {job_id}] Lease lost; its result will be discarded")
+                except Exception as e:
+                    print(f"[Job {job_id}] Could not renew the lease: {e}")
+
+    def _graph_input(self, row, snapshot):
+        """
+        What to stream into the graph: the job's state for a fresh job, or
+        None / a resume command to continue from the job's checkpoint.
+        """
+        from app.models.state import DocGenState
+
+        if snapshot and snapshot.values and snapshot.next:
+            # A job paused on failed files is resumed through its interrupt;
+            # one whose worker crashed re-runs the step that did not finish.
+            if any(task.interrupts for task in snapshot.tasks):
+                from langgraph.types import Command
+                return Command(resume=True)
+            return None
+        return DocGenState.model_validate_json(row["payload"])
+
+    def _run(self, row) -> dict:
+        job_id = row["id"]
+        workspace_id = row["workspace_id"]
+        self.queue.publish(job_id, {"type": "job", "status": "running", "attempt": row["attempts"]})
+        JOBS_RUNNING.inc()
+        checkpointed = False
+        try:
+            graph = get_graph()
+            checkpointed = graph.checkpointer is not None
+            config = thread_config(job_id) if checkpointed else None
+            if workspace_id and workspace_manager.adopt(workspace_id) is None:
+                self._finish(job_id, workspace_id, "failed", error="Job workspace no longer exists")
+                return {}
+            snapshot = graph.get_state(config) if checkpointed else None
+            if snapshot and snapshot.values and not snapshot.next:
+                # The previous worker got through the whole graph but died
+                # before recording the result.
+                result = {key: snapshot.values.get(key) for key in RESULT_KEYS}
+            else:
+                result = self._stream(job_id, graph, self._graph_input(row, snapshot), config)
+        except Exception as e:
+            # With a checkpoint to resume from, the workspace holding the job's
+            # blobs is kept until the job is resumed or expires.
+            if self._finish(job_id, workspace_id, "failed", error=str(e), resumable=checkpointed):
+                if checkpointed:
+                    workspace_manager.detach(workspace_id)
+                else:
+                    workspace_manager.release(workspace_id)
+            raise
+        finally:
+            JOBS_RUNNING.dec()
+        if self._finish(job_id, workspace_id, "completed", result=result):
+            workspace_manager.release(workspace_id)
+            delete_checkpoints(job_id)
+        return result
+
+    def _stream(self, job_id: str, graph, graph_input, config) -> dict:
+        result = {}
+        interrupted = None
+        for mode, chunk in graph.stream(graph_input, config, stream_mode=["updates", "custom"]):
+            if mode == "custom":
+                self.queue.publish(job_id, chunk)
+                continue
+            for node_name, update in chunk.items():
+                if node_name == "__interrupt__":
+                    interrupted = update[0].value if update else {}
+                    continue
+                self.queue.publish(job_id, {"type": "node", "node": node_name, "status": "completed"})
+                if node_name == "output" and isinstance(update, dict):
+                    result = {key: update.get(key) for key in RESULT_KEYS}
+            prune_checkpoints(job_id)
+        if interrupted is not None:
+            raise RuntimeError(interrupted.get("message", "Job was interrupted"))
+        return result
+
+    def _finish(self, job_id: str, workspace_id: Optional[str], status: str, **outcome) -> bool:
+        if not self.queue.finish(job_id, self.id, status, **outcome):
+            # Another worker took the job over and owns the workspace now.
+            print(f"[Job {job_id}] Lease lost before the job finished; discarding its outcome")
+            workspace_manager.detach(workspace_id)
+            return False
+        JOBS.labels(status).inc()
+        return True
+
+
+job_manager = JobManager()
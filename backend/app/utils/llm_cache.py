@@ -0,0 +1,185 @@
+import os
+import sqlite3
+import threading
+import time
+import xxhash
+from cachetools import LRUCache
+from app.utils.metrics import LLM_CACHE_LOOKUPS
+
+# Two-tier cache for LLM responses: an in-process LRU in front of a SQLite file
+# that is shared by every worker on the host. Entries are addressed by a hash of
+# everything that influences the completion (model, temperature, system message,
+# prompt), so identical chunks of a re-run repo never reach the provider.
+CACHE_ENABLED = os.getenv("DOCGEN_LLM_CACHE", "1") != "0"
+CACHE_PATH = os.getenv("DOCGEN_LLM_CACHE_PATH", "/tmp/docgen_cache/llm_cache.sqlite")
+CACHE_TTL_SECONDS = int(os.getenv("DOCGEN_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_MAX_BYTES = int(os.getenv("DOCGEN_LLM_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+CACHE_MEMORY_ITEMS = int(os.getenv("DOCGEN_LLM_CACHE_MEMORY_ITEMS", "2048"))
+
+
+def make_key(model: str, temperature: float, system: str, prompt: str) -> str:
+    h = xxhash.xxh3_128()
+    for part in (model, repr(float(temperature)), system or "", prompt):
+        encoded = part.encode("utf-8")
+        # Length-prefix every field so ("ab", "c") and ("a", "bc") differ.
+        h.update(len(encoded).to_bytes(8, "little"))
+        h.update(encoded)
+    return h.hexdigest()
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache(accessed_at);
+CREATE INDEX IF NOT EXISTS llm_cache_created ON llm_cache(created_at);
+-- Running total of llm_cache.size, kept by triggers so every process sees it
+-- without scanning the table.
+CREATE TABLE IF NOT EXISTS llm_cache_size (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL);
+INSERT OR IGNORE INTO llm_cache_size (id, total) SELECT 0, COALESCE(SUM(size), 0) FROM llm_cache;
+CREATE TRIGGER IF NOT EXISTS llm_cache_size_insert AFTER INSERT ON llm_cache
+    BEGIN UPDATE llm_cache_size SET total = total + new.size WHERE id = 0; END;
+CREATE TRIGGER IF NOT EXISTS llm_cache_size_delete AFTER DELETE ON llm_cache
+    BEGIN UPDATE llm_cache_size SET total = total - old.size WHERE id = 0; END;
+CREATE TRIGGER IF NOT EXISTS llm_cache_size_update AFTER UPDATE OF size ON llm_cache
+    BEGIN UPDATE llm_cache_size SET total = total + new.size - old.size WHERE id = 0; END;
+"""
+
+# Expired rows are swept every EVICT_EVERY writes of a process; LRU eviction
+# runs as soon as the shared total passes the quota.
+EVICT_EVERY = int(os.getenv("DOCGEN_LLM_CACHE_EVICT_EVERY", "256"))
+
+
+class LLMResponseCache:
+    def __init__(self, path: str = CACHE_PATH, ttl: int = CACHE_TTL_SECONDS,
+                 max_bytes: int = CACHE_MAX_BYTES, memory_items: int = CACHE_MEMORY_ITEMS,
+                 evict_every: int = EVICT_EVERY):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.evict_every = max(1, evict_every)
+        self.memory = LRUCache(maxsize=max(1, memory_items))
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        # Guards the memory tier and the stats only; disk I/O happens outside
+        # it on per-thread connections.
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._setup_lock = threading.Lock()
+        self._is_setup = False
+        self._writes_since_sweep = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._setup_lock:
+                if not self._is_setup:
+                    conn.executescript(SCHEMA)
+                    self._is_setup = True
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if now - created_at <= self.ttl:
+                    self.stats["memory_hits"] += 1
+                    LLM_CACHE_LOOKUPS.labels("memory_hit").inc()
+                    return value
+                self.memory.pop(key, None)
+
+        try:
+            conn = self._connection()
+            row = conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            print(f"[LLM Cache] Disk lookup failed: {e}")
+            row = None
+
+        with self._lock:
+            if row is None:
+                self.stats["misses"] += 1
+                LLM_CACHE_LOOKUPS.labels("miss").inc()
+                return None
+            self.stats["disk_hits"] += 1
+            LLM_CACHE_LOOKUPS.labels("disk_hit").inc()
+            self.memory[key] = (row[0], row[1])
+        return row[0]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self.memory[key] = (value, now)
+            self.stats["writes"] += 1
+            self._writes_since_sweep += 1
+            sweep = self._writes_since_sweep >= self.evict_every
+            if sweep:
+                self._writes_since_sweep = 0
+        try:
+            conn = self._connection()
+            # An upsert rather than INSERT OR REPLACE, so the size triggers fire.
+            conn.execute(
+                "INSERT INTO llm_cache (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                "created_at = excluded.created_at, accessed_at = excluded.accessed_at",
+                (key, value, len(value.encode("utf-8")), now, now),
+            )
+            self._evict(conn, now, sweep)
+        except sqlite3.Error as e:
+            print(f"[LLM Cache] Disk write failed: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float, sweep: bool):
+        evicted = 0
+        if sweep:
+            evicted += max(conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,)).rowcount, 0)
+        total = conn.execute("SELECT total FROM llm_cache_size WHERE id = 0").fetchone()[0]
+        if total > self.max_bytes:
+            # Drop least recently used rows until we are back under 90% of the quota.
+            target = total - int(self.max_bytes * 0.9)
+            freed = 0
+            stale_keys = []
+            for key, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY accessed_at ASC"):
+                stale_keys.append((key,))
+                freed += size
+                if freed >= target:
+                    break
+            conn.executemany("DELETE FROM llm_cache WHERE key = ?", stale_keys)
+            evicted += len(stale_keys)
+        if evicted:
+            with self._lock:
+                self.stats["evictions"] += evicted
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
+
+
+llm_cache = LLMResponseCache()
+
+
+def cached_llm_call(model: str, temperature: float, system: str, prompt: str, compute) -> str:
+    if not CACHE_ENABLED:
+        return compute()
+
+    key = make_key(model, temperature, system, prompt)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = compute()
+    llm_cache.set(key, result)
+    return result
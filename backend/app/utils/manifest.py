@@ -0,0 +1,207 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import xxhash
+from typing import Iterable, Optional
+from app.models.state import DocGenState
+from app.utils.blob_store import code_digest
+
+# Per repo/branch record of what the last run produced, so a re-run only sends
+# changed or added files back through the LLM stages. Records are rows keyed by
+# (repo key, file path) in a SQLite file shared by every worker on the host, so
+# each batch writes only its own files and concurrent jobs on the same repo
+# don't overwrite each other. Commented files are stored once per content hash.
+MANIFEST_PATH = os.getenv("DOCGEN_MANIFEST_PATH", "/tmp/docgen_cache/manifests.sqlite")
+
+# Bump when prompts or the stored layout change so old records are ignored.
+MANIFEST_VERSION = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS manifest_files (
+    key TEXT NOT NULL,
+    path TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    summary TEXT,
+    commented TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (key, path)
+);
+CREATE INDEX IF NOT EXISTS manifest_files_commented ON manifest_files(commented);
+CREATE TABLE IF NOT EXISTS manifest_texts (
+    digest TEXT PRIMARY KEY,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS manifest_readmes (
+    key TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    readme_hash TEXT NOT NULL,
+    readme TEXT NOT NULL
+);
+"""
+
+_local = threading.local()
+_setup_lock = threading.Lock()
+_is_setup = False
+
+
+def _connection() -> sqlite3.Connection:
+    global _is_setup
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(MANIFEST_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(MANIFEST_PATH, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with _setup_lock:
+            if not _is_setup:
+                conn.executescript(SCHEMA)
+                _is_setup = True
+        _local.conn = conn
+    return conn
+
+
+def manifest_key(state: DocGenState) -> Optional[str]:
+    # fetch_code moves the URL to repo_url and drops input_data.
+    repo_url = state.repo_url or state.input_data
+    if state.input_type != "github" or not isinstance(repo_url, str):
+        return None
+    repo_url = repo_url.strip().rstrip("/").lower()
+    if repo_url.endswith(".git"):
+        repo_url = repo_url[:-4]
+    branch = state.branch or "main"
+    return xxhash.xxh3_64_hexdigest(f"{repo_url}@{branch}")
+
+
+def file_hash(file_info: dict) -> str:
+    h = xxhash.xxh3_128()
+    h.update(file_info.get("type", "").encode("utf-8"))
+    h.update(b"\0")
+    # The blob handle already carries a hash of the code, so it isn't re-read.
+    h.update(code_digest(file_info).encode("utf-8"))
+    return h.hexdigest()
+
+
+def content_hash(parts: list[str]) -> str:
+    h = xxhash.xxh3_128()
+    for part in parts:
+        encoded = part.encode("utf-8")
+        h.update(len(encoded).to_bytes(8, "little"))
+        h.update(encoded)
+    return h.hexdigest()
+
+
+def load_records(key: Optional[str], paths: Optional[Iterable[str]] = None) -> dict:
+    """
+    The stored records of key, all of them or only those of paths, as
+    {path: {"hash", "summary", "commented"}}. "commented" is the digest of
+    the commented file; see load_commented.
+    """
+    if not key:
+        return {}
+    query = "SELECT path, hash, summary, commented FROM manifest_files WHERE key = ? AND version = ?"
+    params = [key, MANIFEST_VERSION]
+    if paths is not None:
+        paths = list(paths)
+        if not paths:
+            return {}
+        query += f" AND path IN ({', '.join('?' * len(paths))})"
+        params += paths
+    try:
+        rows = _connection().execute(query, params).fetchall()
+    except sqlite3.Error as e:
+        print(f"[Manifest] Ignoring unreadable manifest: {e}")
+        return {}
+    records = {}
+    for path, hash_, summary, commented in rows:
+        record = {"hash": hash_}
+        if summary is not None:
+            record["summary"] = json.loads(summary)
+        if commented is not None:
+            record["commented"] = commented
+        records[path] = record
+    return records
+
+
+def load_commented(digest: str) -> Optional[str]:
+    row = _connection().execute("SELECT text FROM manifest_texts WHERE digest = ?", (digest,)).fetchone()
+    return row[0] if row else None
+
+
+def save_records(key: Optional[str], records: dict, texts: dict = None):
+    """
+    Upserts records ({path: {"hash", "summary"?, "commented"?}}) together
+    with the commented texts they reference ({digest: text}).
+    """
+    if not key or not records:
+        return
+    now = time.time()
+    conn = _connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(
+            "INSERT OR IGNORE INTO manifest_texts (digest, text) VALUES (?, ?)", list((texts or {}).items())
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO manifest_files (key, path, version, hash, summary, commented, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (key, path, MANIFEST_VERSION, record["hash"],
+                 json.dumps(record["summary"]) if record.get("summary") is not None else None,
+                 record.get("commented"), now)
+                for path, record in records.items()
+            ],
+        )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def prune_records(key: Optional[str], keep: Iterable[str], before: float):
+    """
+    Drops records of files that no longer exist, and commented texts nothing
+    refers to any more. Only records written before `before` (the start of
+    this job) are candidates, so entries a concurrent job just wrote stay.
+    """
+    if not key:
+        return
+    keep = set(keep)
+    conn = _connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        stale = [
+            (key, path) for (path,) in conn.execute(
+                "SELECT path FROM manifest_files WHERE key = ? AND updated_at < ?", (key, before)
+            )
+            if path not in keep
+        ]
+        conn.executemany("DELETE FROM manifest_files WHERE key = ? AND path = ?", stale)
+        conn.execute(
+            "DELETE FROM manifest_texts WHERE NOT EXISTS "
+            "(SELECT 1 FROM manifest_files WHERE manifest_files.commented = manifest_texts.digest)"
+        )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def load_readme(key: Optional[str]) -> tuple[Optional[str], Optional[str]]:
+    if not key:
+        return None, None
+    row = _connection().execute(
+        "SELECT readme_hash, readme FROM manifest_readmes WHERE key = ? AND version = ?", (key, MANIFEST_VERSION)
+    ).fetchone()
+    return (row[0], row[1]) if row else (None, None)
+
+
+def save_readme(key: Optional[str], readme_hash: str, readme: str):
+    if not key:
+        return
+    _connection().execute(
+        "INSERT OR REPLACE INTO manifest_readmes (key, version, readme_hash, readme) VALUES (?, ?, ?, ?)",
+        (key, MANIFEST_VERSION, readme_hash, readme),
+    )
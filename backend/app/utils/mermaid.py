@@ -0,0 +1,94 @@
+import os
+import xxhash
+
+# Diagrams bigger than this stop rendering in most Mermaid viewers, so large
+# directories are collapsed into summary nodes.
+MAX_CHILDREN = int(os.getenv("DOCGEN_MERMAID_MAX_CHILDREN", "25"))
+MAX_DEPTH = int(os.getenv("DOCGEN_MERMAID_MAX_DEPTH", "6"))
+# Mermaid refuses to render more than 500 edges by default.
+MAX_NODES = int(os.getenv("DOCGEN_MERMAID_MAX_NODES", "400"))
+
+ROOT_ID = "root"
+
+
+def node_id(path: str) -> str:
+    # Derived from the path alone, so ids stay stable as files are added or removed.
+    return "n" + xxhash.xxh3_64_hexdigest(path)
+
+
+def escape_label(label: str) -> str:
+    # Labels are always quoted, which keeps keywords like `end` or `graph`
+    # and characters like brackets from being parsed as Mermaid syntax.
+    return (
+        label.replace("&", "#amp;")
+        .replace('"', "#quot;")
+        .replace("<", "#lt;")
+        .replace(">", "#gt;")
+    )
+
+
+def _build_tree(file_paths) -> dict:
+    tree = {}
+    for file_path in file_paths:
+        node = tree
+        parts = [part for part in file_path.replace("\\", "/").split("/") if part]
+        for folder in parts[:-1]:
+            node = node.setdefault(folder + "/", {})
+        if parts:
+            node.setdefault(parts[-1], None)
+    return tree
+
+
+def _count_files(subtree) -> int:
+    if subtree is None:
+        return 1
+    return sum(_count_files(child) for child in subtree.values())
+
+
+def _files_label(count: int) -> str:
+    return f"{count} file" if count == 1 else f"{count} files"
+
+
+def build_folder_diagram(file_paths, max_children: int = MAX_CHILDREN, max_depth: int = MAX_DEPTH,
+                         max_nodes: int = MAX_NODES) -> str:
+    tree = _build_tree(file_paths)
+    # Shrink the depth first, then the fan-out, until the diagram fits the budget.
+    while True:
+        lines = _render(tree, max_children, max_depth)
+        if len(lines) - 2 <= max_nodes or (max_depth <= 1 and max_children <= 2):
+            return "\n".join(lines)
+        if max_depth > 1:
+            max_depth -= 1
+        else:
+            max_children = max(2, max_children // 2)
+
+
+def _render(tree: dict, max_children: int, max_depth: int) -> list:
+    lines = ["graph TD", f'    {ROOT_ID}["Project_Root"]']
+
+    def emit(parent_id: str, parent_path: str, subtree: dict, depth: int):
+        # Folders first, then files, each alphabetically.
+        names = sorted(subtree, key=lambda name: (subtree[name] is None, name.lower(), name))
+        shown = names if len(names) <= max_children else names[:max(1, max_children - 1)]
+
+        for name in shown:
+            path = parent_path + name
+            child = subtree[name]
+            child_id = node_id(path)
+            if child is not None and depth >= max_depth:
+                label = f"{name} ({_files_label(_count_files(child))})"
+                lines.append(f'    {parent_id} --> {child_id}["{escape_label(label)}"]')
+                continue
+            lines.append(f'    {parent_id} --> {child_id}["{escape_label(name)}"]')
+            if child:
+                emit(child_id, path, child, depth + 1)
+
+        hidden = names[len(shown):]
+        if hidden:
+            hidden_files = sum(_count_files(subtree[name]) for name in hidden)
+            label = f"... {len(hidden)} more items ({_files_label(hidden_files)})"
+            more_id = node_id(parent_path + "\0more")
+            lines.append(f'    {parent_id} --> {more_id}["{escape_label(label)}"]')
+
+    emit(ROOT_ID, "", tree, 1)
+    return lines
@@ -0,0 +1,67 @@
+import os
+import time
+from functools import wraps
+from prometheus_client import Counter, Histogram, Gauge, CONTENT_TYPE_LATEST, generate_latest
+
+# Raw LLM responses and generated documents are only printed when this is set;
+# they can be megabytes per job.
+LOG_PAYLOADS = os.getenv("DOCGEN_LOG_PAYLOADS", "0") == "1"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+NODE_DURATION = Histogram(
+    "docgen_node_duration_seconds", "Wall time of each graph node", ["node"], buckets=DURATION_BUCKETS,
+)
+NODE_ERRORS = Counter("docgen_node_errors_total", "Graph nodes that raised", ["node"])
+
+LLM_REQUEST_DURATION = Histogram(
+    "docgen_llm_request_duration_seconds", "Latency of individual LLM requests, including failed ones",
+    ["provider", "model", "outcome"], buckets=DURATION_BUCKETS,
+)
+LLM_TOKENS = Counter("docgen_llm_tokens_total", "Tokens sent to and received from LLMs", ["provider", "model", "kind"])
+LLM_RETRIES = Counter("docgen_llm_retries_total", "LLM requests retried", ["provider", "model", "reason"])
+LLM_RATE_LIMITED = Counter("docgen_llm_rate_limited_total", "LLM requests rejected with a 429", ["provider", "model"])
+LLM_CACHE_LOOKUPS = Counter("docgen_llm_cache_lookups_total", "LLM response cache lookups", ["result"])
+
+FILES_PARSED = Counter("docgen_files_parsed_total", "Source files parsed", ["language"])
+BYTES_PARSED = Counter("docgen_bytes_parsed_total", "Bytes of source code parsed", ["language"])
+
+JOBS = Counter("docgen_jobs_total", "Finished jobs", ["status"])
+JOBS_RUNNING = Gauge("docgen_jobs_running", "Jobs currently running")
+JOBS_COALESCED = Counter(
+    "docgen_jobs_coalesced_total", "Submissions answered by an identical existing job", ["source"],
+)
+
+WORKSPACE_BYTES = Gauge("docgen_workspace_bytes", "Bytes charged to job workspaces on the host")
+WORKSPACES_ACTIVE = Gauge("docgen_workspaces_active", "Job workspaces currently allocated")
+WORKSPACES_REMOVED = Counter("docgen_workspaces_removed_total", "Job workspaces deleted", ["reason"])
+
+
+def timed_node(name: str, node):
+    @wraps(node)
+    def run(state):
+        start = time.perf_counter()
+        try:
+            return node(state)
+        except Exception:
+            NODE_ERRORS.labels(node=name).inc()
+            raise
+        finally:
+            NODE_DURATION.labels(node=name).observe(time.perf_counter() - start)
+    return run
+
+
+def record_parsed_files(parsed: dict):
+    for file_info in parsed.values():
+        language = file_info.get("type", "unknown")
+        FILES_PARSED.labels(language=language).inc()
+        BYTES_PARSED.labels(language=language).inc(file_info.get("size", 0))
+
+
+def log_payload(label: str, payload: str):
+    if LOG_PAYLOADS:
+        print(f"{label}:\n{payload}\n{'-' * 50}")
+
+
+def render_metrics() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
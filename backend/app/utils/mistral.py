@@ -1,54 +1,93 @@
-from langchain.chat_models import init_chat_model
 from langchain_core.output_parsers import StrOutputParser
 from dotenv import load_dotenv
+from app.utils.concurrency import provider_slot
+from app.utils.llm_cache import cached_llm_call
+from app.utils.rate_limiter import call_with_rate_limit, estimate_tokens, is_rate_limit_error
+from app.utils.metrics import LLM_REQUEST_DURATION, LLM_TOKENS
+from app.utils.tokens import count_tokens
+import time
 import os
+import threading
 
 dotenv_path = os.path.join(os.path.dirname(__file__), ".env")
 load_dotenv(dotenv_path)
 
-llm_readme = init_chat_model(
-    model="qwen-qwq-32b",
-    model_provider="groq",
-    temperature=0.1,
-    reasoning_format="parsed"
-)
-
-llm_summary = init_chat_model(
-    model="codestral-2405",
-    model_provider="mistralai",
-    temperature=0.3,
-)
-
-llm_commenting = init_chat_model(
-    model="codestral-2501",
-    model_provider="mistralai",
-    temperature=0.3
-)
+README_MODEL = {"model": "qwen-qwq-32b", "model_provider": "groq", "temperature": 0.1}
+SUMMARY_MODEL = {"model": "codestral-2405", "model_provider": "mistralai", "temperature": 0.3}
+COMMENTING_MODEL = {"model": "codestral-2501", "model_provider": "mistralai", "temperature": 0.3}
+
+MODEL_SETTINGS = {
+    "readme": (README_MODEL, {"reasoning_format": "parsed"}),
+    "summary": (SUMMARY_MODEL, {}),
+    "commenting": (COMMENTING_MODEL, {}),
+}
+
+# Chat models are created on first use rather than at import, which keeps
+# provider SDK imports and client setup off the cold-start path.
+_llms = {}
+_llms_lock = threading.Lock()
+
+def get_llm(name: str):
+    llm = _llms.get(name)
+    if llm is None:
+        with _llms_lock:
+            llm = _llms.get(name)
+            if llm is None:
+                from langchain.chat_models import init_chat_model
+                config, extra = MODEL_SETTINGS[name]
+                # Client-side retries are disabled so 429s reach the shared rate limiter.
+                llm = _llms[name] = init_chat_model(**config, **extra, max_retries=0)
+    return llm
+
+def set_llm(name: str, llm):
+    # Used by the offline benchmarks to swap in a simulated model.
+    with _llms_lock:
+        _llms[name] = llm
 
 parser = StrOutputParser()
 
+def invoke_cached(llm, config: dict, system: str, prompt: str) -> str:
+    messages = [("system", system), ("user", prompt)] if system else [("user", prompt)]
+    provider, model = config["model_provider"], config["model"]
+
+    def request():
+        with provider_slot(provider):
+            start = time.perf_counter()
+            try:
+                message = llm.invoke(messages)
+            except Exception as e:
+                outcome = "rate_limited" if is_rate_limit_error(e) else "error"
+                LLM_REQUEST_DURATION.labels(provider, model, outcome).observe(time.perf_counter() - start)
+                raise
+            LLM_REQUEST_DURATION.labels(provider, model, "success").observe(time.perf_counter() - start)
+        text = parser.invoke(message)
+        # Providers report usage on the message; count locally when they don't.
+        usage = getattr(message, "usage_metadata", None) or {}
+        LLM_TOKENS.labels(provider, model, "prompt").inc(usage.get("input_tokens") or count_tokens(system + prompt))
+        LLM_TOKENS.labels(provider, model, "completion").inc(usage.get("output_tokens") or count_tokens(text))
+        return text
+
+    def compute():
+        return call_with_rate_limit(
+            config["model_provider"], config["model"], request, estimate_tokens(system + prompt)
+        )
+
+    return cached_llm_call(config["model"], config["temperature"], system, prompt, compute)
+
 def get_llm_response_summary(prompt: str, language: str) -> str:
-    messages = [
-        ("system", 
+    system = (
         f"You are a highly skilled senior {language} software engineer. "
-        f"Always write precise, technical, and concise output without adding explanations or extra commentary."),
-        ("user", prompt)
-    ]
-    chain = llm_summary | StrOutputParser()
-    return chain.invoke(messages)
+        f"Always write precise, technical, and concise output without adding explanations or extra commentary."
+    )
+    return invoke_cached(get_llm("summary"), SUMMARY_MODEL, system, prompt)
 
 def get_llm_response_readme(prompt: str) -> str:
-    messages = [
-        ("system", 
+    system = (
         "You are a technical writer and documentation specialist. "
         "You create clean, professional, and well-structured Markdown documentation. "
-        "Always be concise, precise, and avoid adding any extra commentary or text."),
-        ("user", prompt)
-    ]
-    chain = llm_readme | StrOutputParser()
-    return chain.invoke(messages)
+        "Always be concise, precise, and avoid adding any extra commentary or text."
+    )
+    return invoke_cached(get_llm("readme"), README_MODEL, system, prompt)
 
 def get_llm_response_commenting(prompt: str) -> str:
-    messages = [("user", prompt)]
-    chain = llm_commenting | StrOutputParser()
-    return chain.invoke(messages)
+    return invoke_cached(get_llm("commenting"), COMMENTING_MODEL, "", prompt)
@@ -0,0 +1,13 @@
+from langgraph.config import get_stream_writer
+
+
+def emit_progress(event: dict):
+    """
+    Publishes a progress event on the graph's "custom" stream. Outside a graph
+    run, or when the caller is not streaming, the event is dropped.
+    """
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        return
+    writer(event)
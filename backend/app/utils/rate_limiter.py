@@ -0,0 +1,198 @@
+import os
+import re
+import time
+import random
+import threading
+import httpx
+from app.utils.metrics import LLM_RATE_LIMITED, LLM_RETRIES
+
+# Process-wide request/token budgets per provider. Every LLM call site goes
+# through call_with_rate_limit, so concurrent jobs share one view of the quota
+# instead of each backing off on its own.
+PROVIDER_LIMITS = {
+    "mistralai": {
+        "rpm": float(os.getenv("MISTRAL_RPM", "60")),
+        "tpm": float(os.getenv("MISTRAL_TPM", "500000")),
+    },
+    "groq": {
+        "rpm": float(os.getenv("GROQ_RPM", "30")),
+        "tpm": float(os.getenv("GROQ_TPM", "6000")),
+    },
+}
+
+# Seconds of traffic a bucket may hold, i.e. how bursty we allow callers to be.
+BURST_SECONDS = float(os.getenv("DOCGEN_RATE_BURST_SECONDS", "5"))
+MAX_RETRIES = int(os.getenv("DOCGEN_LLM_MAX_RETRIES", "6"))
+
+# AIMD tuning: halve the rate on every 429, then creep back up on successes.
+MIN_SCALE = 0.1
+DECREASE_FACTOR = 0.5
+INCREASE_STEP = 0.05
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.capacity = max(1.0, per_minute / 60.0 * BURST_SECONDS)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float, scale: float):
+        rate = self.per_minute / 60.0 * scale
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, scale: float) -> float:
+        # Requests larger than the bucket only need a full bucket and run into
+        # debt, which later callers pay back.
+        needed = min(amount, self.capacity) - self.tokens
+        if needed <= 0:
+            return 0.0
+        return needed / (self.per_minute / 60.0 * scale)
+
+    def consume(self, amount: float):
+        self.tokens -= amount
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, rpm: float, tpm: float):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.scale = 1.0
+        self.paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self, tokens: int):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self.requests.refill(now, self.scale)
+                self.tokens.refill(now, self.scale)
+                wait = max(
+                    self.paused_until - now,
+                    self.requests.wait_time(1, self.scale),
+                    self.tokens.wait_time(tokens, self.scale),
+                )
+                if wait <= 0:
+                    self.requests.consume(1)
+                    self.tokens.consume(tokens)
+                    return
+                self._cond.wait(wait)
+
+    def record_tokens(self, tokens: int):
+        with self._cond:
+            self.tokens.consume(tokens)
+
+    def on_success(self):
+        with self._cond:
+            self.scale = min(1.0, self.scale + INCREASE_STEP)
+
+    def on_rate_limited(self, retry_after: float):
+        with self._cond:
+            now = time.monotonic()
+            self.scale = max(MIN_SCALE, self.scale * DECREASE_FACTOR)
+            self.paused_until = max(self.paused_until, now + retry_after)
+            # Empty the buckets so waiters resume at the reduced rate instead of
+            # bursting the moment the pause ends.
+            self.requests.tokens = min(self.requests.tokens, 0.0)
+            self.tokens.tokens = min(self.tokens.tokens, 0.0)
+            self._cond.notify_all()
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str, model: str) -> AdaptiveRateLimiter:
+    with _limiters_lock:
+        key = (provider, model)
+        if key not in _limiters:
+            limits = PROVIDER_LIMITS.get(provider, {"rpm": 60.0, "tpm": 100000.0})
+            _limiters[key] = AdaptiveRateLimiter(limits["rpm"], limits["tpm"])
+        return _limiters[key]
+
+
+def _status_code(error: Exception):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+    return status
+
+
+# Fallback for clients that only report the status in the message, e.g. Groq's
+# "Error code: 429 - {...}" or Mistral's "API error occurred: Status 429". A
+# bare "429" is not enough: it shows up in token counts, ids and offsets.
+RATE_LIMIT_MESSAGE = re.compile(
+    r"\b(?:status(?:[ _]code)?|error[ _]code|http(?:/[\d.]+)?|code)\W{0,3}429\b"
+    r"|\b429\W{0,3}too many requests\b"
+    r"|\brate[ _]limit(?:ed|[ _]exceeded)\b",
+    re.IGNORECASE,
+)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    status = _status_code(error)
+    if isinstance(status, int):
+        # The client told us the status; don't second-guess it from the text.
+        return status == 429
+    return RATE_LIMIT_MESSAGE.search(str(error)) is not None
+
+
+def is_transient_error(error: Exception) -> bool:
+    status = _status_code(error)
+    if isinstance(status, int) and status >= 500:
+        return True
+    if isinstance(error, (httpx.TransportError, TimeoutError, ConnectionError)):
+        return True
+    name = type(error).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+def retry_after_seconds(error: Exception, attempt: int) -> float:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+    # Groq puts the hint in the message: "Please try again in 7.66s".
+    match = re.search(r"try again in (?:(\d+)m)?([\d.]+)s", str(error))
+    if match:
+        return int(match.group(1) or 0) * 60 + float(match.group(2))
+    return min(60.0, 2.0 * (2 ** attempt)) + random.uniform(0, 1)
+
+
+def call_with_rate_limit(provider: str, model: str, request, prompt_tokens: int,
+                         max_retries: int = MAX_RETRIES) -> str:
+    limiter = get_limiter(provider, model)
+    for attempt in range(max_retries):
+        limiter.acquire(prompt_tokens)
+        try:
+            result = request()
+        except Exception as e:
+            if is_rate_limit_error(e):
+                wait = retry_after_seconds(e, attempt)
+                print(f"[Rate Limit] {provider}/{model} throttled, pausing {wait:.1f}s (Attempt {attempt+1}/{max_retries})")
+                LLM_RATE_LIMITED.labels(provider, model).inc()
+                LLM_RETRIES.labels(provider, model, "rate_limited").inc()
+                limiter.on_rate_limited(wait)
+                continue
+            if is_transient_error(e) and attempt < max_retries - 1:
+                wait = min(30.0, 2.0 * (2 ** attempt)) + random.uniform(0, 1)
+                print(f"[Retry] {provider}/{model} transient error: {e}. Retrying in {wait:.1f}s...")
+                LLM_RETRIES.labels(provider, model, "transient").inc()
+                time.sleep(wait)
+                continue
+            raise
+        limiter.on_success()
+        if isinstance(result, str):
+            limiter.record_tokens(estimate_tokens(result))
+        return result
+    raise RuntimeError(f"LLM call to {provider}/{model} failed after {max_retries} attempts.")
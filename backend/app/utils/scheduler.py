@@ -0,0 +1,148 @@
+import os
+import re
+from collections import Counter
+from typing import Optional
+from app.models.state import DocGenBudget
+from app.utils.tokens import count_tokens
+from app.utils.blob_store import load_code
+
+# Server-side caps applied to every job; a request can only lower them.
+# 0 means no cap.
+MAX_JOB_TOKENS = int(os.getenv("DOCGEN_MAX_JOB_TOKENS", "0"))
+MAX_JOB_SECONDS = float(os.getenv("DOCGEN_MAX_JOB_SECONDS", "0"))
+
+# Rough per-request costs on top of the code itself: the instructions sent with
+# every prompt, and the reply.
+PROMPT_OVERHEAD_TOKENS = 250
+SUMMARY_OUTPUT_TOKENS = 200
+SIGNATURE_OUTPUT_TOKENS = 80
+
+ENTRY_POINT_NAMES = {
+    "main", "app", "server", "index", "manage", "wsgi", "asgi", "cli", "__main__",
+}
+ROUTE_PATTERN = re.compile(r"(^|/)(routes?|router|api|views?|controllers?|endpoints?|handlers?|urls)(/|\.|_|$)", re.I)
+IMPORT_LINE = re.compile(r"^\s*(import|from|#include|require|use|package)\b|require\(|import\(", re.M)
+WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+FULL = "full"
+SIGNATURE = "signature"
+SKIPPED = "skipped"
+
+
+def effective_budget(budget: Optional[DocGenBudget]) -> DocGenBudget:
+    max_tokens = budget.max_tokens if budget and budget.max_tokens and budget.max_tokens > 0 else None
+    max_seconds = budget.max_seconds if budget and budget.max_seconds and budget.max_seconds > 0 else None
+    if MAX_JOB_TOKENS:
+        max_tokens = min(max_tokens or MAX_JOB_TOKENS, MAX_JOB_TOKENS)
+    if MAX_JOB_SECONDS:
+        max_seconds = min(max_seconds or MAX_JOB_SECONDS, MAX_JOB_SECONDS)
+    return DocGenBudget(max_tokens=max_tokens, max_seconds=max_seconds)
+
+
+def _stem(file_path: str) -> str:
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+
+def signature_lines(file_info: dict, code: Optional[str] = None) -> list[str]:
+    """
+    The definition lines of a file: the boundary lines parse_code recorded that
+    name one of the file's symbols.
+    """
+    symbols = [name for name in file_info.get("contains", []) if isinstance(name, str) and name]
+    if not symbols:
+        return []
+    lines = (load_code(file_info) if code is None else code).splitlines()
+    signatures = []
+    for line_number, _ in file_info.get("boundaries") or []:
+        if line_number < len(lines):
+            line = lines[line_number].rstrip()
+            if any(name in line for name in symbols):
+                signatures.append(line)
+    return signatures
+
+
+def fan_in(repo_data: dict) -> Counter:
+    """
+    Counts, for each file, how many other files mention its module name on an
+    import/include line.
+    """
+    stems = Counter(_stem(file_path) for file_path in repo_data)
+    referenced = Counter()
+    for file_path, file_info in repo_data.items():
+        words = set()
+        code = load_code(file_info)
+        for match in IMPORT_LINE.finditer(code):
+            line_end = code.find("\n", match.start())
+            words.update(WORD.findall(code[match.start():line_end if line_end != -1 else None]))
+        words.discard(_stem(file_path))
+        for word in words:
+            if word in stems:
+                referenced[word] += 1
+    return Counter({file_path: referenced[_stem(file_path)] for file_path in repo_data})
+
+
+def importance(file_path: str, file_info: dict, references: int) -> float:
+    score = 0.0
+    if _stem(file_path).lower() in ENTRY_POINT_NAMES:
+        score += 10
+    if ROUTE_PATTERN.search(file_path.replace("\\", "/")):
+        score += 6
+    score += min(len(file_info.get("contains", [])), 20) * 0.5
+    score += min(references, 20) * 1.5
+    # Files nested deep in the tree are usually less central.
+    score -= file_path.replace("\\", "/").count("/") * 0.25
+    return score
+
+
+def estimate_costs(file_info: dict, comment: bool) -> tuple[int, int]:
+    """
+    Estimated tokens for the full treatment (summary, plus inline comments if
+    requested) and for a signature-only summary of a file.
+    """
+    code = load_code(file_info)
+    code_tokens = count_tokens(code)
+    full = code_tokens + PROMPT_OVERHEAD_TOKENS + SUMMARY_OUTPUT_TOKENS
+    if comment:
+        # Patch-mode comments send the code again and get back a short list.
+        full += code_tokens + PROMPT_OVERHEAD_TOKENS + code_tokens // 10
+    signatures = signature_lines(file_info, code)
+    signature = (count_tokens("\n".join(signatures)) + PROMPT_OVERHEAD_TOKENS + SIGNATURE_OUTPUT_TOKENS
+                 if signatures else 0)
+    return full, signature
+
+
+def plan_treatments(repo_data: dict, file_paths: list[str], budget: DocGenBudget,
+                    comment: bool) -> tuple[list[str], dict[str, str]]:
+    """
+    Ranks file_paths by importance and assigns each the full treatment, a
+    signature-only summary, or nothing, so the estimated total stays within
+    budget.max_tokens. Returns the ranked paths and their treatments.
+    """
+    references = fan_in(repo_data)
+    ranked = sorted(
+        file_paths,
+        key=lambda file_path: (-importance(file_path, repo_data[file_path], references[file_path]), file_path),
+    )
+    if not budget.max_tokens:
+        return ranked, {file_path: FULL for file_path in ranked}
+
+    costs = {file_path: estimate_costs(repo_data[file_path], comment) for file_path in ranked}
+    remaining = budget.max_tokens
+    treatments = {}
+    # The most important files get the full treatment while it fits; the rest
+    # get signature summaries from what is left, also in rank order.
+    for file_path in ranked:
+        full = costs[file_path][0]
+        if full <= remaining:
+            treatments[file_path] = FULL
+            remaining -= full
+    for file_path in ranked:
+        if file_path in treatments:
+            continue
+        signature = costs[file_path][1]
+        if signature and signature <= remaining:
+            treatments[file_path] = SIGNATURE
+            remaining -= signature
+        else:
+            treatments[file_path] = SKIPPED
+    return ranked, treatments
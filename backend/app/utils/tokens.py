@@ -0,0 +1,48 @@
+import os
+import threading
+
+# Tokenizer used to size prompts. By default we estimate ~4 characters per
+# token, which needs nothing from the network. DOCGEN_TOKENIZER switches to
+# exact counts: a local tokenizer.json path, or a Hugging Face hub id (fetched
+# from the hub on first use, so only set one where that is acceptable). Counts
+# are close enough across BPE vocabularies for budgeting. If the tokenizer
+# cannot be loaded we fall back to the estimate.
+TOKENIZER_NAME = os.getenv("DOCGEN_TOKENIZER", "").strip()
+
+_tokenizer = None
+_tokenizer_loaded = False
+_lock = threading.Lock()
+
+
+def _load_tokenizer():
+    global _tokenizer, _tokenizer_loaded
+    with _lock:
+        if _tokenizer_loaded:
+            return _tokenizer
+        if not TOKENIZER_NAME:
+            print("[Tokens] Counting tokens as characters / 4 (set DOCGEN_TOKENIZER for exact counts)")
+            _tokenizer = None
+        else:
+            try:
+                from tokenizers import Tokenizer
+                if os.path.isfile(TOKENIZER_NAME):
+                    _tokenizer = Tokenizer.from_file(TOKENIZER_NAME)
+                    print(f"[Tokens] Counting tokens with {TOKENIZER_NAME}")
+                else:
+                    print(f"[Tokens] Fetching tokenizer {TOKENIZER_NAME} from the Hugging Face hub")
+                    _tokenizer = Tokenizer.from_pretrained(TOKENIZER_NAME)
+                    print(f"[Tokens] Counting tokens with hub tokenizer {TOKENIZER_NAME}")
+            except Exception as e:
+                print(f"[Tokens] Tokenizer {TOKENIZER_NAME} unavailable, counting tokens as characters / 4: {e}")
+                _tokenizer = None
+        _tokenizer_loaded = True
+        return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    tokenizer = _tokenizer if _tokenizer_loaded else _load_tokenizer()
+    if tokenizer is None:
+        return max(1, len(text) // 4)
+    return len(tokenizer.encode(text, add_special_tokens=False).ids)
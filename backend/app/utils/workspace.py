@@ -0,0 +1,314 @@
+import os
+import re
+import time
+import uuid
+import shutil
+import sqlite3
+import threading
+from typing import Callable, Iterable, Optional
+from app.utils.metrics import WORKSPACE_BYTES, WORKSPACES_ACTIVE, WORKSPACES_REMOVED
+
+# Per-job scratch directories (uploaded archives and anything else a job writes
+# for itself) live under WORKSPACE_DIR, one uuid-named directory per job. Each
+# job may write up to WORKSPACE_QUOTA_BYTES and all workspaces on the host
+# together up to WORKSPACE_TOTAL_BYTES. The bytes charged to each workspace are
+# kept in a SQLite ledger next to them, shared by the API and worker processes,
+# so a queued job's upload stays charged while no process holds it. A workspace
+# is removed when its job finishes; the background collector removes the ones
+# left behind by crashed processes, recognised by an mtime nobody has refreshed
+# for WORKSPACE_ORPHAN_SECONDS.
+WORKSPACE_DIR = os.getenv("DOCGEN_WORKSPACE_DIR", "/tmp/docgen_workspaces")
+WORKSPACE_QUOTA_BYTES = int(os.getenv("DOCGEN_WORKSPACE_QUOTA_BYTES", str(512 * 1024 * 1024)))
+WORKSPACE_TOTAL_BYTES = int(os.getenv("DOCGEN_WORKSPACE_TOTAL_BYTES", str(4 * 1024 * 1024 * 1024)))
+WORKSPACE_ORPHAN_SECONDS = int(os.getenv("DOCGEN_WORKSPACE_ORPHAN_SECONDS", "3600"))
+WORKSPACE_GC_INTERVAL = int(os.getenv("DOCGEN_WORKSPACE_GC_INTERVAL", "300"))
+
+WORKSPACE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+USAGE_FILE = "usage.sqlite"
+
+USAGE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS workspace_usage (
+    id TEXT PRIMARY KEY,
+    bytes INTEGER NOT NULL
+);
+"""
+
+
+class WorkspaceFull(Exception):
+    """
+    Raised when the host-wide workspace allowance is used up; the job should be
+    retried later rather than rejected.
+    """
+
+
+class Workspace:
+    def __init__(self, manager: "WorkspaceManager", workspace_id: str, quota: int):
+        self.manager = manager
+        self.id = workspace_id
+        self.path = os.path.join(manager.root, workspace_id)
+        self.quota = quota
+        self.used = 0
+
+    def file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def reserve(self, size: int):
+        """
+        Accounts for size more bytes about to be written. Raises ValueError past
+        the job's quota and WorkspaceFull past the host-wide allowance.
+        """
+        self.manager._reserve(self, size)
+
+    def unreserve(self, size: int):
+        """
+        Gives back part of an earlier reservation that was not written after all.
+        """
+        self.manager._unreserve(self, size)
+
+    def settle(self, reserved: int, actual: int):
+        """
+        Turns an up-front reservation of reserved bytes into the actual size,
+        once it is known.
+        """
+        if actual > reserved:
+            self.reserve(actual - reserved)
+        elif reserved > actual:
+            self.unreserve(reserved - actual)
+
+    def release(self):
+        self.manager.release(self.id)
+
+
+class WorkspaceManager:
+    def __init__(self, root: str = WORKSPACE_DIR, quota_bytes: int = WORKSPACE_QUOTA_BYTES,
+                 total_bytes: int = WORKSPACE_TOTAL_BYTES, orphan_seconds: int = WORKSPACE_ORPHAN_SECONDS):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.total_bytes = total_bytes
+        self.orphan_seconds = orphan_seconds
+        self.workspaces = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._collector = None
+        self._pin_sources = []
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(self.root, exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.root, USAGE_FILE), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(USAGE_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @property
+    def used(self) -> int:
+        """
+        Bytes charged to every workspace on the host, held by a process or not.
+        """
+        return self._connection().execute("SELECT COALESCE(SUM(bytes), 0) FROM workspace_usage").fetchone()[0]
+
+    def _set_usage(self, workspace_id: str, size: int):
+        conn = self._connection()
+        conn.execute("INSERT OR REPLACE INTO workspace_usage (id, bytes) VALUES (?, ?)", (workspace_id, size))
+        WORKSPACE_BYTES.set(self.used)
+
+    def _drop_usage(self, workspace_id: str):
+        self._connection().execute("DELETE FROM workspace_usage WHERE id = ?", (workspace_id,))
+        WORKSPACE_BYTES.set(self.used)
+
+    def create(self, quota: Optional[int] = None) -> Workspace:
+        os.makedirs(self.root, exist_ok=True)
+        while True:
+            workspace = Workspace(self, uuid.uuid4().hex, min(quota or self.quota_bytes, self.quota_bytes))
+            try:
+                # mkdir fails rather than reuse a directory some other process owns.
+                os.mkdir(workspace.path)
+                break
+            except FileExistsError:
+                continue
+        with self._lock:
+            self.workspaces[workspace.id] = workspace
+            WORKSPACES_ACTIVE.set(len(self.workspaces))
+        self.start_collector()
+        return workspace
+
+    def adopt(self, workspace_id: str) -> Optional[Workspace]:
+        """
+        Takes over an existing workspace, typically one a crashed process left
+        behind for a job that is being resumed. Returns None if it is gone.
+        """
+        existing = self.get(workspace_id)
+        if existing is not None:
+            return existing
+        path = self.path(workspace_id)
+        if not os.path.isdir(path):
+            return None
+        workspace = Workspace(self, workspace_id, self.quota_bytes)
+        size = 0
+        for dirpath, _, filenames in os.walk(path):
+            for name in filenames:
+                try:
+                    size += os.path.getsize(os.path.join(dirpath, name))
+                except OSError:
+                    pass
+        os.utime(path)
+        with self._lock:
+            self.workspaces[workspace_id] = workspace
+            # Already on disk, so it is counted even past the quota, and in
+            # place of whatever was charged to it before.
+            workspace.used = size
+            self._set_usage(workspace_id, size)
+            WORKSPACES_ACTIVE.set(len(self.workspaces))
+        self.start_collector()
+        return workspace
+
+    def path(self, workspace_id: str) -> str:
+        # Ids come back from state and blob handles; anything else could escape the root.
+        if not WORKSPACE_ID_PATTERN.match(workspace_id or ""):
+            raise ValueError(f"Invalid workspace id: {workspace_id!r}")
+        return os.path.join(self.root, workspace_id)
+
+    def get(self, workspace_id: Optional[str]) -> Optional[Workspace]:
+        with self._lock:
+            return self.workspaces.get(workspace_id)
+
+    def _reserve(self, workspace: Workspace, size: int):
+        with self._lock:
+            if workspace.used + size > workspace.quota:
+                raise ValueError(f"Job workspace exceeds its {workspace.quota} byte quota")
+            conn = self._connection()
+            # The check and the charge are one transaction, so two processes
+            # can't both take the last of the allowance.
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                used = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM workspace_usage").fetchone()[0]
+                if used + size > self.total_bytes:
+                    raise WorkspaceFull("No workspace space left on this host; try again later")
+                conn.execute(
+                    "INSERT INTO workspace_usage (id, bytes) VALUES (?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET bytes = bytes + excluded.bytes",
+                    (workspace.id, size),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            workspace.used += size
+            WORKSPACE_BYTES.set(used + size)
+
+    def _unreserve(self, workspace: Workspace, size: int):
+        with self._lock:
+            size = min(size, workspace.used)
+            workspace.used -= size
+            self._connection().execute(
+                "UPDATE workspace_usage SET bytes = MAX(bytes - ?, 0) WHERE id = ?", (size, workspace.id)
+            )
+            WORKSPACE_BYTES.set(self.used)
+
+    def release(self, workspace_id: Optional[str]):
+        """
+        Deletes a workspace, whether this process holds it or another process
+        left it on disk.
+        """
+        if workspace_id is None:
+            return
+        with self._lock:
+            workspace = self.workspaces.pop(workspace_id, None)
+            if workspace is not None:
+                WORKSPACES_ACTIVE.set(len(self.workspaces))
+        path = workspace.path if workspace is not None else self.path(workspace_id)
+        if workspace is not None or os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+            WORKSPACES_REMOVED.labels(reason="released").inc()
+        self._drop_usage(workspace_id)
+
+    def detach(self, workspace_id: Optional[str]):
+        """
+        Stops tracking a workspace without deleting it, when another process
+        (a queue worker) takes it over. Its bytes stay charged until whoever
+        adopts it next re-counts them, or it is released.
+        """
+        with self._lock:
+            workspace = self.workspaces.pop(workspace_id, None)
+            if workspace is None:
+                return
+            WORKSPACES_ACTIVE.set(len(self.workspaces))
+
+    def add_pin_source(self, source: Callable[[], Iterable[str]]):
+        """
+        Registers a callable returning workspace ids that must survive orphan
+        collection even though no process refreshes them, such as those of
+        queued jobs.
+        """
+        self._pin_sources.append(source)
+
+    def _pinned(self) -> set:
+        pinned = set()
+        for source in self._pin_sources:
+            try:
+                pinned.update(source())
+            except Exception as e:
+                print(f"[Workspace] Could not read pinned workspaces: {e}")
+                # Without the list, nothing can safely be called orphaned.
+                return None
+        return pinned
+
+    def collect_orphans(self) -> int:
+        """
+        Refreshes the mtime of this process's live workspaces, so collectors in
+        other processes leave them alone, and removes directories nobody has
+        refreshed within orphan_seconds.
+        """
+        with self._lock:
+            live = set(self.workspaces)
+        pinned = self._pinned()
+        if pinned is None or not os.path.isdir(self.root):
+            return 0
+        now = time.time()
+        removed = 0
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith(USAGE_FILE):
+                continue
+            try:
+                if name in live:
+                    os.utime(path)
+                elif name in pinned:
+                    continue
+                elif now - os.path.getmtime(path) > self.orphan_seconds:
+                    shutil.rmtree(path) if os.path.isdir(path) else os.remove(path)
+                    removed += 1
+            except OSError:
+                continue
+        # Charges of workspaces that are gone, whoever removed them. A
+        # workspace's directory exists before anything is charged to it.
+        for (workspace_id,) in self._connection().execute("SELECT id FROM workspace_usage").fetchall():
+            if not os.path.isdir(os.path.join(self.root, workspace_id)):
+                self._drop_usage(workspace_id)
+        if removed:
+            WORKSPACES_REMOVED.labels(reason="orphaned").inc(removed)
+            print(f"[Workspace] Removed {removed} orphaned workspaces")
+        return removed
+
+    def start_collector(self, interval: int = WORKSPACE_GC_INTERVAL):
+        with self._lock:
+            if self._collector is not None or interval <= 0:
+                return
+            self._collector = threading.Thread(
+                target=self._collect_forever, args=(interval,), name="docgen-workspace-gc", daemon=True
+            )
+            self._collector.start()
+
+    def _collect_forever(self, interval: int):
+        while True:
+            try:
+                self.collect_orphans()
+            except Exception as e:
+                print(f"[Workspace] Orphan collection failed: {e}")
+            time.sleep(interval)
+
+
+workspace_manager = WorkspaceManager()
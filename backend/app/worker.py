@@ -0,0 +1,41 @@
+"""
+Runs documentation jobs from the shared job queue. Start as many of these as
+the host (or hosts sharing the queue and workspace directories) can take:
+
+    python -m app.worker --concurrency 4
+    python -m app.worker --concurrency 8 --metrics-port 9100
+
+Stop it with Ctrl-C or SIGTERM; running jobs are finished first.
+"""
+import signal
+import argparse
+import threading
+from app.utils.jobs import Worker, MAX_CONCURRENT_JOBS
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENT_JOBS, help="Jobs run at the same time")
+    parser.add_argument("--metrics-port", type=int, default=0, help="Serve Prometheus metrics on this port (0: off)")
+    return parser.parse_args()
+
+
+def main(args):
+    if args.metrics_port:
+        from prometheus_client import start_http_server
+        start_http_server(args.metrics_port)
+
+    worker = Worker(args.concurrency)
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    worker.start()
+    try:
+        stopped.wait()
+    except KeyboardInterrupt:
+        pass
+    print(f"[Worker {worker.id}] Stopping after the running jobs")
+    worker.stop()
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,153 @@
+"""
+Measures parse throughput (files/sec) of extract_names_and_clean against the
+previous two-parse implementation on a multi-language corpus.
+
+    python -m benchmarks.bench_parse                 # synthetic corpus
+    python -m benchmarks.bench_parse --path ../repo  # real checkout
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tree_sitter import Parser
+from app.graph.nodes.parse_code import (
+    EXCLUDED_FOLDERS, detect_language, extract_names_and_clean, load_language,
+)
+
+SYNTHETIC_TEMPLATES = {
+    "python": ("# module comment {i}\n", "def func_{i}(a, b):\n    # add values\n    return a + b  # inline\n\n"
+               "class Model{i}:\n    \"\"\"Docstring.\"\"\"\n    def run(self):\n        pass\n\n"),
+    "javascript": ("// file {i}\n", "/* block */\nfunction handler{i}(req, res) {{\n  // respond\n  return res.send({i});\n}}\n\n"
+                   "class Service{i} {{\n  call() {{ return 1; }} // inline\n}}\n\n"),
+    "java": ("// file {i}\n", "/** Javadoc */\npublic class Widget{i} {{\n  // field\n  private int x;\n"
+             "  public int get() {{ return x; }} /* trailing */\n}}\n\n"),
+    "go": ("// package doc {i}\n", "// Handler does things\nfunc Handler{i}(x int) int {{\n\treturn x * 2 // double\n}}\n\n"
+           "type Item{i} struct {{\n\tName string // name\n}}\n\n"),
+    "cpp": ("// unit {i}\n", "/* helper */\nint helper{i}(int v) {{ return v + 1; }} // inc\n\n"
+            "struct Point{i} {{ int x; int y; }};\nclass Shape{i} {{ public: void draw(); }};\n\n"),
+}
+
+EXTENSIONS = {"python": ".py", "javascript": ".js", "java": ".java", "go": ".go", "cpp": ".cpp"}
+
+
+def legacy_extract_names_and_clean(source_code: str, lang_key: str):
+    language = load_language(lang_key)
+    if language is None:
+        return [], source_code
+
+    parser = Parser(language)
+    tree = parser.parse(bytes(source_code, "utf-8"))
+    comment_ranges = []
+
+    def collect_comments(node):
+        if "comment" in node.type:
+            comment_ranges.append((node.start_byte, node.end_byte))
+        for child in node.children:
+            collect_comments(child)
+
+    collect_comments(tree.root_node)
+    code_bytes = bytearray(source_code, "utf-8")
+    for start, end in sorted(comment_ranges, reverse=True):
+        del code_bytes[start:end]
+
+    cleaned_code = code_bytes.decode("utf-8")
+    tree = parser.parse(bytes(cleaned_code, "utf-8"))
+    cursor = tree.root_node.walk()
+    visited = set()
+    found_names = []
+    while True:
+        node = cursor.node
+        if node.id in visited:
+            if cursor.goto_next_sibling():
+                continue
+            if not cursor.goto_parent():
+                break
+            continue
+        visited.add(node.id)
+        if node.type in [
+            "function_definition", "function_declaration", "method_definition", "method_declaration",
+            "class_definition", "class_declaration", "class_specifier", "struct_specifier", "type_declaration"
+        ]:
+            name_node = node.child_by_field_name("name")
+            if name_node:
+                found_names.append(cleaned_code[name_node.start_byte:name_node.end_byte].strip())
+        if cursor.goto_first_child():
+            continue
+        if cursor.goto_next_sibling():
+            continue
+        while not cursor.goto_next_sibling():
+            if not cursor.goto_parent():
+                break
+    return found_names, cleaned_code
+
+
+def synthetic_corpus(files_per_language: int, blocks_per_file: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    corpus = []
+    for lang, (header, block) in SYNTHETIC_TEMPLATES.items():
+        for n in range(files_per_language):
+            count = max(1, int(blocks_per_file * rng.uniform(0.5, 1.5)))
+            source = header.format(i=n) + "".join(block.format(i=f"{n}_{b}") for b in range(count))
+            corpus.append((f"{lang}/file_{n}{EXTENSIONS[lang]}", lang, source))
+    return corpus
+
+
+def folder_corpus(path: str) -> list:
+    corpus = []
+    for root, dirs, files in os.walk(path):
+        dirs[:] = [d for d in dirs if d not in EXCLUDED_FOLDERS]
+        for file in files:
+            lang = detect_language(file)
+            if not lang:
+                continue
+            try:
+                with open(os.path.join(root, file), "r", encoding="utf-8") as f:
+                    corpus.append((os.path.join(root, file), lang, f.read()))
+            except (OSError, UnicodeDecodeError):
+                continue
+    return corpus
+
+
+def run(fn, corpus, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _, lang, source in corpus:
+            fn(source, lang)
+        best = min(best, time.perf_counter() - start)
+    return len(corpus) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", help="Benchmark a source tree instead of the synthetic corpus")
+    parser.add_argument("--files", type=int, default=200, help="Synthetic files per language")
+    parser.add_argument("--blocks", type=int, default=40, help="Average code blocks per synthetic file")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = folder_corpus(args.path) if args.path else synthetic_corpus(args.files, args.blocks)
+    if not corpus:
+        sys.exit("No parseable source files found.")
+    total_bytes = sum(len(source) for _, _, source in corpus)
+
+    mismatches = [name for name, lang, source in corpus
+                  if legacy_extract_names_and_clean(source, lang) != extract_names_and_clean(source, lang)]
+
+    before = run(legacy_extract_names_and_clean, corpus, args.repeat)
+    after = run(extract_names_and_clean, corpus, args.repeat)
+
+    print(f"corpus: {len(corpus)} files, {total_bytes / 1e6:.1f} MB")
+    print(f"before: {before:8.1f} files/sec")
+    print(f"after:  {after:8.1f} files/sec  ({after / before:.2f}x)")
+    print(f"output mismatches vs legacy: {len(mismatches)}")
+    for name in mismatches[:10]:
+        print(f"  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Runs the compiled documentation graph end to end against a simulated LLM
+provider, so pipeline throughput can be measured offline and compared with a
+saved baseline.
+
+    python -m benchmarks.bench_pipeline                        # fixtures + synthetic repos
+    python -m benchmarks.bench_pipeline --latency-ms 50 --error-rate 0.05
+    python -m benchmarks.bench_pipeline --save-baseline        # record benchmarks/baseline_pipeline.json
+    python -m benchmarks.bench_pipeline --compare              # fail on regressions vs the baseline
+
+Each repo is run with a fresh job (no LLM cache, no manifest). The report has
+files/sec, wall time per graph node, and LLM calls, 429s and tokens per
+provider.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The pipeline must not touch real providers, the shared cache or manifests.
+os.environ.setdefault("MISTRAL_API_KEY", "benchmark")
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ["DOCGEN_LLM_CACHE"] = "0"
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline_pipeline.json")
+
+SYNTHETIC_SIZES = {"synthetic_small": 10, "synthetic_medium": 40, "synthetic_large": 120}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repos", nargs="*", help="Fixture or synthetic repo names to run (default: all)")
+    parser.add_argument("--comments", action="store_true", help="Also run the inline comment stage")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Median simulated request latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.4, help="Lognormal spread of the latency")
+    parser.add_argument("--output-tps", type=float, default=400.0, help="Simulated output tokens per second")
+    parser.add_argument("--mistral-tpm", type=float, default=0.0, help="Simulated Mistral tokens/minute limit (0: none)")
+    parser.add_argument("--groq-tpm", type=float, default=0.0, help="Simulated Groq tokens/minute limit (0: none)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 429")
+    parser.add_argument("--rpm", type=float, default=6000.0, help="Requests/minute the client-side limiter allows")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="Compare with the baseline and exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative drop in files/sec, or rise in calls/tokens, before --compare fails")
+    return parser.parse_args()
+
+
+ARGS = parse_args() if __name__ == "__main__" else None
+if ARGS:
+    # The client-side limiter reads these at import time.
+    os.environ.setdefault("MISTRAL_RPM", str(ARGS.rpm))
+    os.environ.setdefault("GROQ_RPM", str(ARGS.rpm))
+    os.environ.setdefault("MISTRAL_TPM", str(ARGS.mistral_tpm or 10_000_000))
+    os.environ.setdefault("GROQ_TPM", str(ARGS.groq_tpm or 10_000_000))
+
+import app.utils.mistral as mistral
+from app.graph.graph import build_graph
+from app.models.state import DocGenState, DocGenPreferences
+from app.utils.workspace import workspace_manager
+from benchmarks.bench_parse import SYNTHETIC_TEMPLATES, EXTENSIONS
+from benchmarks.fake_llm import FakeProvider, FakeChatModel
+
+
+def install_fake_models(args) -> dict:
+    common = dict(latency_ms=args.latency_ms, latency_sigma=args.latency_sigma,
+                  output_tps=args.output_tps, error_rate=args.error_rate)
+    providers = {
+        "mistralai": FakeProvider("mistralai", tpm=args.mistral_tpm, seed=args.seed, **common),
+        "groq": FakeProvider("groq", tpm=args.groq_tpm, seed=args.seed + 1, **common),
+    }
+    for name, (config, _) in mistral.MODEL_SETTINGS.items():
+        mistral.set_llm(name, FakeChatModel(provider=providers[config["model_provider"]]))
+    return providers
+
+
+def write_synthetic_repo(root: str, files: int, seed: int):
+    languages = sorted(SYNTHETIC_TEMPLATES)
+    for n in range(files):
+        lang = languages[n % len(languages)]
+        header, block = SYNTHETIC_TEMPLATES[lang]
+        blocks = 2 + (n * 7 + seed) % 12
+        source = header.format(i=n) + "".join(block.format(i=f"{n}_{b}") for b in range(blocks))
+        path = os.path.join(root, f"pkg{n % 6}", f"module_{n}{EXTENSIONS[lang]}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(source)
+
+
+def benchmark_repos(args, workdir: str) -> dict:
+    repos = {}
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if os.path.isdir(os.path.join(FIXTURES_DIR, name)):
+            repos[name] = os.path.join(FIXTURES_DIR, name)
+    for name, files in SYNTHETIC_SIZES.items():
+        path = os.path.join(workdir, name)
+        write_synthetic_repo(path, files, args.seed)
+        repos[name] = path
+    if args.repos:
+        unknown = set(args.repos) - set(repos)
+        if unknown:
+            sys.exit(f"Unknown repos: {', '.join(sorted(unknown))}")
+        repos = {name: path for name, path in repos.items() if name in args.repos}
+    return repos
+
+
+def run_job(graph, repo_path: str, comments: bool, providers: dict) -> dict:
+    for provider in providers.values():
+        provider.reset_stats()
+    state = DocGenState(
+        input_type="upload",
+        input_data={"repo_path": repo_path},
+        preferences=DocGenPreferences(
+            add_inline_comments=comments, generate_summary=True, generate_readme=True, visualize_structure=True
+        ),
+    )
+
+    node_seconds = {}
+    files = 0
+    workspace_id = None
+    start = last = time.perf_counter()
+    for update in graph.stream(state, stream_mode="updates"):
+        now = time.perf_counter()
+        for node, values in update.items():
+            # Each node is charged the gap since the previous update. That is
+            # its wall time for the sequential stages; visualize_code runs
+            # beside plan_files and only shows its own share.
+            node_seconds[node] = round(node_seconds.get(node, 0.0) + now - last, 4)
+            if node == "fetch_code" and values:
+                workspace_id = values.get("workspace_id")
+            if node == "parse_code" and values:
+                files = len((values.get("parsed_data") or {}).get("repo_path", {}))
+        last = now
+    wall = time.perf_counter() - start
+    # The job runner normally does this.
+    workspace_manager.release(workspace_id)
+
+    return {
+        "files": files,
+        "wall_seconds": round(wall, 3),
+        "files_per_second": round(files / wall, 2) if wall else 0.0,
+        "node_seconds": node_seconds,
+        "llm": {name: provider.stats() for name, provider in providers.items()},
+    }
+
+
+def print_report(results: dict):
+    for name, result in results.items():
+        llm = result["llm"]
+        calls = sum(stats["calls"] for stats in llm.values())
+        limited = sum(stats["rate_limited"] for stats in llm.values())
+        tokens = sum(stats["prompt_tokens"] + stats["output_tokens"] for stats in llm.values())
+        print(f"{name}: {result['files']} files in {result['wall_seconds']:.2f}s "
+              f"({result['files_per_second']:.2f} files/sec), {calls} LLM calls ({limited} x 429), {tokens} tokens")
+        for node, seconds in result["node_seconds"].items():
+            print(f"    {node:<24} {seconds:8.3f}s")
+        for provider, stats in llm.items():
+            print(f"    {provider:<24} calls={stats['calls']} 429s={stats['rate_limited']} "
+                  f"prompt={stats['prompt_tokens']} output={stats['output_tokens']}")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        if result["files_per_second"] < before["files_per_second"] * (1 - tolerance):
+            regressions.append(f"{name}: {before['files_per_second']} -> {result['files_per_second']} files/sec")
+        for provider, stats in result["llm"].items():
+            previous = before["llm"].get(provider, {})
+            for key in ("calls", "prompt_tokens", "output_tokens"):
+                # Injected 429s add retried calls, so calls are compared net of them.
+                now_value = stats[key] - (stats["rate_limited"] if key == "calls" else 0)
+                old_value = previous.get(key, 0) - (previous.get("rate_limited", 0) if key == "calls" else 0)
+                if old_value and now_value > old_value * (1 + tolerance):
+                    regressions.append(f"{name}: {provider} {key} {old_value} -> {now_value}")
+    return regressions
+
+
+def main(args):
+    providers = install_fake_models(args)
+    graph = build_graph()
+    workdir = tempfile.mkdtemp(prefix="docgen_bench_")
+    try:
+        results = {}
+        for name, path in benchmark_repos(args, workdir).items():
+            results[name] = run_job(graph, path, args.comments, providers)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print()
+    print_report(results)
+
+    settings = {key: value for key, value in vars(args).items()
+                if key not in ("repos", "save_baseline", "compare", "tolerance")}
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "results": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline written to {BASELINE_PATH}")
+
+    if args.compare:
+        if not os.path.exists(BASELINE_PATH):
+            sys.exit("No baseline to compare with; run with --save-baseline first.")
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("settings") != settings:
+            print("\nWarning: baseline was recorded with different settings:", baseline.get("settings"))
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions against the baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main(ARGS)
@@ -0,0 +1,121 @@
+"""
+Measures cold start: how long a fresh interpreter takes to import the API
+module, and to answer its first request, plus the slowest imports on the way.
+
+    python -m benchmarks.bench_startup                   # median of 5 fresh processes
+    python -m benchmarks.bench_startup --save-baseline   # record benchmarks/baseline_startup.json
+    python -m benchmarks.bench_startup --compare         # fail on regressions vs the baseline
+
+Every run is a new subprocess, so nothing is shared with this one.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline_startup.json")
+
+# Runs in the child: import the app, then serve one request in-process.
+PROBE = """
+import time, json
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+client_ready = time.perf_counter()
+TestClient(app.main.app).get("/")
+served = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - start,
+    "first_request_seconds": (imported - start) + (served - client_ready),
+}))
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes to start")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="Compare with the baseline and exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative rise in startup time before --compare fails")
+    return parser.parse_args()
+
+
+def child_env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("MISTRAL_API_KEY", "benchmark")
+    env.setdefault("GROQ_API_KEY", "benchmark")
+    env["PYTHONPATH"] = BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def run_probe() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=child_env(),
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(top: int) -> list[tuple[str, float]]:
+    """
+    Cumulative import time per module from -X importtime, slowest first.
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=BACKEND_DIR, env=child_env(),
+        capture_output=True, text=True, check=True,
+    ).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(cumulative) / 1e6))
+    return sorted(modules, key=lambda item: -item[1])[:top]
+
+
+def main(args):
+    samples = [run_probe() for _ in range(args.runs)]
+    results = {
+        key: round(statistics.median(sample[key] for sample in samples), 4)
+        for key in ("import_seconds", "first_request_seconds")
+    }
+
+    print(f"import app.main:   {results['import_seconds']:.3f}s (median of {args.runs})")
+    print(f"first request:     {results['first_request_seconds']:.3f}s")
+    print("\nSlowest imports (cumulative):")
+    for name, seconds in slowest_imports(args.top):
+        print(f"    {name:<48} {seconds:8.3f}s")
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"runs": args.runs, "results": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline written to {BASELINE_PATH}")
+
+    if args.compare:
+        if not os.path.exists(BASELINE_PATH):
+            sys.exit("No baseline to compare with; run with --save-baseline first.")
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+        regressions = [
+            f"{key}: {baseline[key]}s -> {value}s"
+            for key, value in results.items()
+            if baseline.get(key) and value > baseline[key] * (1 + args.tolerance)
+        ]
+        if regressions:
+            print("\nRegressions against the baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main(parse_args())
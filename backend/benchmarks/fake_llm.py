@@ -0,0 +1,140 @@
+"""
+A local stand-in for the Groq/Mistral chat models, for benchmarking the
+pipeline without keys or network access. Replies are shaped after the prompts
+the pipeline sends (bullet summaries, packed-file sections, JSON comment
+patches, echoed code, Markdown) so every parser downstream is exercised.
+"""
+import re
+import json
+import math
+import time
+import random
+import threading
+from typing import Any, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.utils.tokens import count_tokens
+
+DEFINITION_LINE = re.compile(r"^\s*(\d+)\| .*?\b(def|class|function|func|fun|interface|struct)\s+([A-Za-z_]\w*)", re.M)
+PACKED_FILE = re.compile(r"^### File: (?!<)(.+)$", re.M)
+SYMBOL = re.compile(r"\b(?:def|class|function|func|fun|interface|struct)\s+([A-Za-z_]\w*)")
+
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"429 Too Many Requests: rate limit reached, please try again in {retry_after:.2f}s")
+        self.retry_after = retry_after
+
+
+class FakeProvider:
+    """
+    Shared limits and counters for one simulated provider. Latency is
+    lognormal around latency_ms, plus output tokens at output_tps. Requests
+    beyond tpm, or picked at random with probability error_rate, fail with a
+    429 the way the real APIs do.
+    """
+
+    def __init__(self, name: str, latency_ms: float = 300.0, latency_sigma: float = 0.4,
+                 output_tps: float = 400.0, tpm: float = 0.0, error_rate: float = 0.0, seed: int = 7):
+        self.name = name
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.output_tps = output_tps
+        self.tpm = tpm
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = tpm / 60.0 * 10 if tpm else 0.0
+        self._updated = time.monotonic()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.calls = 0
+            self.rate_limited = 0
+            self.prompt_tokens = 0
+            self.output_tokens = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "rate_limited": self.rate_limited,
+                "prompt_tokens": self.prompt_tokens,
+                "output_tokens": self.output_tokens,
+            }
+
+    def _admit(self, tokens: int) -> Optional[float]:
+        # Returns how long to wait if the request is rejected, None if admitted.
+        with self._lock:
+            self.calls += 1
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.rate_limited += 1
+                return 0.2
+            if self.tpm:
+                rate = self.tpm / 60.0
+                now = time.monotonic()
+                self._tokens = min(rate * 10, self._tokens + (now - self._updated) * rate)
+                self._updated = now
+                if tokens > self._tokens:
+                    self.rate_limited += 1
+                    return (tokens - self._tokens) / rate
+                self._tokens -= tokens
+            return None
+
+    def complete(self, prompt: str) -> str:
+        prompt_tokens = count_tokens(prompt)
+        retry_after = self._admit(prompt_tokens)
+        if retry_after is not None:
+            raise FakeRateLimitError(retry_after)
+
+        reply = fake_reply(prompt)
+        output_tokens = count_tokens(reply)
+        with self._lock:
+            latency = self._random.lognormvariate(math.log(self.latency_ms / 1000.0), self.latency_sigma)
+            self.prompt_tokens += prompt_tokens
+            self.output_tokens += output_tokens
+        time.sleep(latency + output_tokens / self.output_tps)
+        return reply
+
+
+def _code_section(prompt: str, marker: str) -> str:
+    return prompt.split(marker, 1)[1] if marker in prompt else ""
+
+
+def fake_reply(prompt: str) -> str:
+    if "Return ONLY a JSON array" in prompt:
+        numbered = _code_section(prompt, "### Code:\n")
+        return json.dumps([
+            {"line": int(line), "symbol": name, "comment": f"Implements {name}."}
+            for line, _, name in DEFINITION_LINE.findall(numbered)
+        ])
+    if "Return ONLY the fully modified" in prompt:
+        return _code_section(prompt, "### Code:\n")
+    packed = PACKED_FILE.findall(prompt)
+    if packed:
+        return "\n\n".join(f"### File: {path}\n- {path.rsplit('/', 1)[-1]}: Provides part of the application." for path in packed)
+    if "### Signatures:" in prompt or "### Code:" in prompt:
+        code = _code_section(prompt, "### Signatures:\n") or _code_section(prompt, "### Code:\n")
+        symbols = SYMBOL.findall(code)[:5] or ["module"]
+        return "\n".join(f"- {name}: Handles {name} and its related logic." for name in symbols)
+    # README prompts: partial summaries, merges and the final document.
+    return "# Project\n\n## Overview\nA generated overview of the project.\n\n## Code Summary\n- Files and their roles.\n"
+
+
+class FakeChatModel(BaseChatModel):
+    provider: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-docgen"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        prompt = "\n\n".join(str(message.content) for message in messages)
+        reply = self.provider.complete(prompt)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=reply))])
@@ -0,0 +1,15 @@
+from flask import Flask
+from app.db import init_db
+from app.routes.users import users_bp
+from app.routes.orders import orders_bp
+
+
+def create_app(config=None):
+    app = Flask(__name__)
+    app.config.from_mapping(DATABASE_URL="sqlite:///app.db", PAGE_SIZE=20)
+    if config:
+        app.config.update(config)
+    init_db(app)
+    app.register_blueprint(users_bp, url_prefix="/users")
+    app.register_blueprint(orders_bp, url_prefix="/orders")
+    return app
@@ -0,0 +1,42 @@
+import sqlite3
+from contextlib import contextmanager
+
+_database_url = None
+
+
+def init_db(app):
+    global _database_url
+    _database_url = app.config["DATABASE_URL"].replace("sqlite:///", "")
+    with connection() as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, name TEXT, email TEXT UNIQUE)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS orders (id INTEGER PRIMARY KEY, user_id INTEGER, total REAL, status TEXT)"
+        )
+
+
+@contextmanager
+def connection():
+    conn = sqlite3.connect(_database_url)
+    conn.row_factory = sqlite3.Row
+    try:
+        yield conn
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def fetch_all(query, params=()):
+    with connection() as conn:
+        return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+
+def fetch_one(query, params=()):
+    with connection() as conn:
+        row = conn.execute(query, params).fetchone()
+        return dict(row) if row else None
+
+
+def execute(query, params=()):
+    with connection() as conn:
+        cursor = conn.execute(query, params)
+        return cursor.lastrowid
@@ -0,0 +1,47 @@
+from dataclasses import dataclass, asdict
+from app.db import fetch_all, fetch_one, execute
+
+STATUSES = ("pending", "paid", "shipped", "cancelled")
+TRANSITIONS = {
+    "pending": {"paid", "cancelled"},
+    "paid": {"shipped", "cancelled"},
+    "shipped": set(),
+    "cancelled": set(),
+}
+
+
+@dataclass
+class Order:
+    id: int
+    user_id: int
+    total: float
+    status: str
+
+    def to_dict(self):
+        return asdict(self)
+
+    def can_move_to(self, status):
+        return status in TRANSITIONS.get(self.status, set())
+
+
+def orders_for_user(user_id):
+    return [Order(**row) for row in fetch_all("SELECT * FROM orders WHERE user_id = ?", (user_id,))]
+
+
+def get_order(order_id):
+    row = fetch_one("SELECT * FROM orders WHERE id = ?", (order_id,))
+    return Order(**row) if row else None
+
+
+def place_order(user_id, items):
+    total = round(sum(item["price"] * item.get("quantity", 1) for item in items), 2)
+    order_id = execute("INSERT INTO orders (user_id, total, status) VALUES (?, ?, 'pending')", (user_id, total))
+    return Order(id=order_id, user_id=user_id, total=total, status="pending")
+
+
+def update_status(order, status):
+    if not order.can_move_to(status):
+        raise ValueError(f"cannot move order from {order.status} to {status}")
+    execute("UPDATE orders SET status = ? WHERE id = ?", (status, order.id))
+    order.status = status
+    return order
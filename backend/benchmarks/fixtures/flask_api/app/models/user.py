@@ -0,0 +1,39 @@
+import re
+from dataclasses import dataclass, asdict
+from app.db import fetch_all, fetch_one, execute
+
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[a-z]{2,}$", re.I)
+
+
+@dataclass
+class User:
+    id: int
+    name: str
+    email: str
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def validate_user(payload):
+    errors = {}
+    if not payload.get("name"):
+        errors["name"] = "required"
+    if not EMAIL_PATTERN.match(payload.get("email", "")):
+        errors["email"] = "invalid"
+    return errors
+
+
+def list_users(page, page_size):
+    rows = fetch_all("SELECT * FROM users ORDER BY id LIMIT ? OFFSET ?", (page_size, page * page_size))
+    return [User(**row) for row in rows]
+
+
+def get_user(user_id):
+    row = fetch_one("SELECT * FROM users WHERE id = ?", (user_id,))
+    return User(**row) if row else None
+
+
+def create_user(name, email):
+    user_id = execute("INSERT INTO users (name, email) VALUES (?, ?)", (name, email))
+    return User(id=user_id, name=name, email=email)
@@ -0,0 +1,35 @@
+from flask import Blueprint, jsonify, request
+from app.models.order import get_order, place_order, update_status
+from app.models.user import get_user
+
+orders_bp = Blueprint("orders", __name__)
+
+
+@orders_bp.post("/")
+def create():
+    payload = request.get_json(force=True)
+    if get_user(payload.get("user_id")) is None:
+        return jsonify({"error": "unknown user"}), 400
+    if not payload.get("items"):
+        return jsonify({"error": "an order needs at least one item"}), 400
+    return jsonify(place_order(payload["user_id"], payload["items"]).to_dict()), 201
+
+
+@orders_bp.get("/<int:order_id>")
+def show(order_id):
+    order = get_order(order_id)
+    if order is None:
+        return jsonify({"error": "not found"}), 404
+    return jsonify(order.to_dict())
+
+
+@orders_bp.post("/<int:order_id>/status")
+def change_status(order_id):
+    order = get_order(order_id)
+    if order is None:
+        return jsonify({"error": "not found"}), 404
+    try:
+        update_status(order, request.get_json(force=True).get("status"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify(order.to_dict())
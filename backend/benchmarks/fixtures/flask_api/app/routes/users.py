@@ -0,0 +1,34 @@
+from flask import Blueprint, jsonify, request, current_app
+from app.models.user import list_users, get_user, create_user, validate_user
+from app.models.order import orders_for_user
+
+users_bp = Blueprint("users", __name__)
+
+
+@users_bp.get("/")
+def index():
+    page = int(request.args.get("page", 0))
+    users = list_users(page, current_app.config["PAGE_SIZE"])
+    return jsonify([user.to_dict() for user in users])
+
+
+@users_bp.get("/<int:user_id>")
+def show(user_id):
+    user = get_user(user_id)
+    if user is None:
+        return jsonify({"error": "not found"}), 404
+    return jsonify(user.to_dict())
+
+
+@users_bp.post("/")
+def create():
+    payload = request.get_json(force=True)
+    errors = validate_user(payload)
+    if errors:
+        return jsonify({"errors": errors}), 422
+    return jsonify(create_user(payload["name"], payload["email"]).to_dict()), 201
+
+
+@users_bp.get("/<int:user_id>/orders")
+def user_orders(user_id):
+    return jsonify([order.to_dict() for order in orders_for_user(user_id)])
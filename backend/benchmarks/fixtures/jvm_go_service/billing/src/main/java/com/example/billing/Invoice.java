@@ -0,0 +1,59 @@
+package com.example.billing;
+
+import java.math.BigDecimal;
+import java.time.LocalDate;
+import java.util.ArrayList;
+import java.util.List;
+
+public class Invoice {
+    public enum Status { DRAFT, ISSUED, PAID, VOID }
+
+    private final String id;
+    private final String customerId;
+    private final List<LineItem> items = new ArrayList<>();
+    private Status status = Status.DRAFT;
+    private LocalDate dueDate;
+
+    public Invoice(String id, String customerId, LocalDate dueDate) {
+        this.id = id;
+        this.customerId = customerId;
+        this.dueDate = dueDate;
+    }
+
+    public void addItem(String description, int quantity, BigDecimal unitPrice) {
+        if (status != Status.DRAFT) {
+            throw new IllegalStateException("Only draft invoices can be edited");
+        }
+        items.add(new LineItem(description, quantity, unitPrice));
+    }
+
+    public BigDecimal total() {
+        return items.stream()
+            .map(item -> item.unitPrice().multiply(BigDecimal.valueOf(item.quantity())))
+            .reduce(BigDecimal.ZERO, BigDecimal::add);
+    }
+
+    public void issue() {
+        if (items.isEmpty()) {
+            throw new IllegalStateException("Cannot issue an empty invoice");
+        }
+        status = Status.ISSUED;
+    }
+
+    public void markPaid() {
+        if (status != Status.ISSUED) {
+            throw new IllegalStateException("Only issued invoices can be paid");
+        }
+        status = Status.PAID;
+    }
+
+    public boolean isOverdue(LocalDate today) {
+        return status == Status.ISSUED && today.isAfter(dueDate);
+    }
+
+    public String getId() { return id; }
+    public String getCustomerId() { return customerId; }
+    public Status getStatus() { return status; }
+
+    public record LineItem(String description, int quantity, BigDecimal unitPrice) {}
+}
@@ -0,0 +1,44 @@
+package com.example.billing;
+
+import java.time.LocalDate;
+import java.util.List;
+import java.util.Map;
+import java.util.Optional;
+import java.util.UUID;
+import java.util.concurrent.ConcurrentHashMap;
+import java.util.stream.Collectors;
+
+public class InvoiceService {
+    private final Map<String, Invoice> invoices = new ConcurrentHashMap<>();
+    private final Notifier notifier;
+
+    public InvoiceService(Notifier notifier) {
+        this.notifier = notifier;
+    }
+
+    public Invoice create(String customerId, int netDays) {
+        Invoice invoice = new Invoice(UUID.randomUUID().toString(), customerId, LocalDate.now().plusDays(netDays));
+        invoices.put(invoice.getId(), invoice);
+        return invoice;
+    }
+
+    public Optional<Invoice> find(String id) {
+        return Optional.ofNullable(invoices.get(id));
+    }
+
+    public void issue(String id) {
+        Invoice invoice = find(id).orElseThrow();
+        invoice.issue();
+        notifier.send(invoice.getCustomerId(), "Invoice " + id + " issued for " + invoice.total());
+    }
+
+    public List<Invoice> overdue(LocalDate today) {
+        return invoices.values().stream()
+            .filter(invoice -> invoice.isOverdue(today))
+            .collect(Collectors.toList());
+    }
+
+    public interface Notifier {
+        void send(String customerId, String message);
+    }
+}
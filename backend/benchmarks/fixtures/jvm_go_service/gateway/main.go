@@ -0,0 +1,49 @@
+package main
+
+import (
+	"encoding/json"
+	"log"
+	"net/http"
+	"os"
+	"time"
+)
+
+type Config struct {
+	Addr       string
+	BillingURL string
+	NotifyURL  string
+}
+
+func loadConfig() Config {
+	return Config{
+		Addr:       getenv("GATEWAY_ADDR", ":8080"),
+		BillingURL: getenv("BILLING_URL", "http://billing:8081"),
+		NotifyURL:  getenv("NOTIFY_URL", "http://notify:8082"),
+	}
+}
+
+func getenv(key, fallback string) string {
+	if value := os.Getenv(key); value != "" {
+		return value
+	}
+	return fallback
+}
+
+func main() {
+	cfg := loadConfig()
+	mux := http.NewServeMux()
+	mux.HandleFunc("/healthz", func(w http.ResponseWriter, r *http.Request) {
+		json.NewEncoder(w).Encode(map[string]string{"status": "ok"})
+	})
+	mux.Handle("/invoices/", NewProxy(cfg.BillingURL))
+	mux.Handle("/notifications/", NewProxy(cfg.NotifyURL))
+
+	server := &http.Server{
+		Addr:         cfg.Addr,
+		Handler:      Logging(mux),
+		ReadTimeout:  10 * time.Second,
+		WriteTimeout: 30 * time.Second,
+	}
+	log.Printf("gateway listening on %s", cfg.Addr)
+	log.Fatal(server.ListenAndServe())
+}
@@ -0,0 +1,41 @@
+package main
+
+import (
+	"log"
+	"net/http"
+	"net/http/httputil"
+	"net/url"
+	"time"
+)
+
+func NewProxy(target string) http.Handler {
+	parsed, err := url.Parse(target)
+	if err != nil {
+		log.Fatalf("invalid upstream %q: %v", target, err)
+	}
+	proxy := httputil.NewSingleHostReverseProxy(parsed)
+	proxy.ErrorHandler = func(w http.ResponseWriter, r *http.Request, err error) {
+		log.Printf("upstream %s failed: %v", target, err)
+		http.Error(w, "upstream unavailable", http.StatusBadGateway)
+	}
+	return proxy
+}
+
+type statusRecorder struct {
+	http.ResponseWriter
+	status int
+}
+
+func (r *statusRecorder) WriteHeader(status int) {
+	r.status = status
+	r.ResponseWriter.WriteHeader(status)
+}
+
+func Logging(next http.Handler) http.Handler {
+	return http.HandlerFunc(func(w http.ResponseWriter, r *http.Request) {
+		start := time.Now()
+		recorder := &statusRecorder{ResponseWriter: w, status: http.StatusOK}
+		next.ServeHTTP(recorder, r)
+		log.Printf("%s %s %d %s", r.Method, r.URL.Path, recorder.status, time.Since(start))
+	})
+}
@@ -0,0 +1,39 @@
+package com.example.notify
+
+import java.util.concurrent.Executors
+import java.util.concurrent.TimeUnit
+
+data class Notification(val customerId: String, val channel: String, val message: String)
+
+interface Channel {
+    val name: String
+    fun deliver(notification: Notification): Boolean
+}
+
+class EmailChannel(private val sender: String) : Channel {
+    override val name = "email"
+    override fun deliver(notification: Notification): Boolean {
+        println("[$sender] -> ${notification.customerId}: ${notification.message}")
+        return true
+    }
+}
+
+class Dispatcher(private val channels: Map<String, Channel>, private val maxAttempts: Int = 3) {
+    private val executor = Executors.newFixedThreadPool(4)
+
+    fun dispatch(notification: Notification) {
+        val channel = channels[notification.channel] ?: error("Unknown channel ${notification.channel}")
+        executor.submit {
+            var attempt = 0
+            while (attempt < maxAttempts && !channel.deliver(notification)) {
+                attempt++
+                Thread.sleep(200L * attempt)
+            }
+        }
+    }
+
+    fun shutdown() {
+        executor.shutdown()
+        executor.awaitTermination(5, TimeUnit.SECONDS)
+    }
+}
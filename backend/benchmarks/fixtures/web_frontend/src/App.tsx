@@ -0,0 +1,57 @@
+import { useEffect, useState } from "react";
+import TodoList from "./components/TodoList";
+import { Todo, fetchTodos, addTodo, toggleTodo, removeTodo } from "./api/todos";
+
+type Filter = "all" | "open" | "done";
+
+export default function App() {
+  const [todos, setTodos] = useState<Todo[]>([]);
+  const [filter, setFilter] = useState<Filter>("all");
+  const [draft, setDraft] = useState("");
+  const [error, setError] = useState<string | null>(null);
+
+  useEffect(() => {
+    fetchTodos().then(setTodos).catch((e) => setError(e.message));
+  }, []);
+
+  const visible = todos.filter((todo) =>
+    filter === "all" ? true : filter === "done" ? todo.done : !todo.done
+  );
+
+  async function submit(event: React.FormEvent) {
+    event.preventDefault();
+    if (!draft.trim()) return;
+    const created = await addTodo(draft.trim());
+    setTodos([...todos, created]);
+    setDraft("");
+  }
+
+  async function toggle(id: number) {
+    const updated = await toggleTodo(id);
+    setTodos(todos.map((todo) => (todo.id === id ? updated : todo)));
+  }
+
+  async function remove(id: number) {
+    await removeTodo(id);
+    setTodos(todos.filter((todo) => todo.id !== id));
+  }
+
+  return (
+    <main className="board">
+      <h1>Todo Board</h1>
+      {error && <p className="error">{error}</p>}
+      <form onSubmit={submit}>
+        <input value={draft} onChange={(e) => setDraft(e.target.value)} placeholder="What needs doing?" />
+        <button type="submit">Add</button>
+      </form>
+      <nav>
+        {(["all", "open", "done"] as Filter[]).map((name) => (
+          <button key={name} className={name === filter ? "active" : ""} onClick={() => setFilter(name)}>
+            {name}
+          </button>
+        ))}
+      </nav>
+      <TodoList todos={visible} onToggle={toggle} onRemove={remove} />
+    </main>
+  );
+}
@@ -0,0 +1,35 @@
+export interface ClientOptions {
+  baseUrl: string;
+  timeoutMs: number;
+}
+
+let options: ClientOptions = { baseUrl: "/api", timeoutMs: 10000 };
+
+export function configureClient(overrides: Partial<ClientOptions>) {
+  options = { ...options, ...overrides };
+}
+
+export class ApiError extends Error {
+  constructor(public status: number, message: string) {
+    super(message);
+  }
+}
+
+export async function request<T>(method: string, path: string, body?: unknown): Promise<T> {
+  const controller = new AbortController();
+  const timer = setTimeout(() => controller.abort(), options.timeoutMs);
+  try {
+    const response = await fetch(options.baseUrl + path, {
+      method,
+      headers: body ? { "Content-Type": "application/json" } : undefined,
+      body: body ? JSON.stringify(body) : undefined,
+      signal: controller.signal,
+    });
+    if (!response.ok) {
+      throw new ApiError(response.status, await response.text());
+    }
+    return response.status === 204 ? (undefined as T) : await response.json();
+  } finally {
+    clearTimeout(timer);
+  }
+}
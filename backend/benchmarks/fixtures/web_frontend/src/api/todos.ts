@@ -0,0 +1,24 @@
+import { request } from "./client";
+
+export interface Todo {
+  id: number;
+  title: string;
+  done: boolean;
+  createdAt: string;
+}
+
+export function fetchTodos(): Promise<Todo[]> {
+  return request<Todo[]>("GET", "/todos");
+}
+
+export function addTodo(title: string): Promise<Todo> {
+  return request<Todo>("POST", "/todos", { title });
+}
+
+export function toggleTodo(id: number): Promise<Todo> {
+  return request<Todo>("POST", `/todos/${id}/toggle`);
+}
+
+export function removeTodo(id: number): Promise<void> {
+  return request<void>("DELETE", `/todos/${id}`);
+}
@@ -0,0 +1,27 @@
+import { Todo } from "../api/todos";
+
+interface TodoItemProps {
+  todo: Todo;
+  onToggle: (id: number) => void;
+  onRemove: (id: number) => void;
+}
+
+function formatAge(createdAt: string): string {
+  const minutes = Math.floor((Date.now() - new Date(createdAt).getTime()) / 60000);
+  if (minutes < 60) return `${minutes}m`;
+  if (minutes < 24 * 60) return `${Math.floor(minutes / 60)}h`;
+  return `${Math.floor(minutes / (24 * 60))}d`;
+}
+
+export default function TodoItem({ todo, onToggle, onRemove }: TodoItemProps) {
+  return (
+    <li className={todo.done ? "todo done" : "todo"}>
+      <input type="checkbox" checked={todo.done} onChange={() => onToggle(todo.id)} />
+      <span className="title">{todo.title}</span>
+      <span className="age">{formatAge(todo.createdAt)}</span>
+      <button className="remove" onClick={() => onRemove(todo.id)} aria-label="Remove">
+        ×
+      </button>
+    </li>
+  );
+}
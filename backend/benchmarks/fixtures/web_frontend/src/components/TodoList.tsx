@@ -0,0 +1,21 @@
+import TodoItem from "./TodoItem";
+import { Todo } from "../api/todos";
+
+interface TodoListProps {
+  todos: Todo[];
+  onToggle: (id: number) => void;
+  onRemove: (id: number) => void;
+}
+
+export default function TodoList({ todos, onToggle, onRemove }: TodoListProps) {
+  if (todos.length === 0) {
+    return <p className="empty">Nothing here yet.</p>;
+  }
+  return (
+    <ul className="todo-list">
+      {todos.map((todo) => (
+        <TodoItem key={todo.id} todo={todo} onToggle={onToggle} onRemove={onRemove} />
+      ))}
+    </ul>
+  );
+}
@@ -0,0 +1,8 @@
+import { createRoot } from "react-dom/client";
+import App from "./App";
+import { configureClient } from "./api/client";
+
+configureClient({ baseUrl: window.location.origin + "/api", timeoutMs: 8000 });
+
+const root = createRoot(document.getElementById("root"));
+root.render(<App />);
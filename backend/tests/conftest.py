@@ -0,0 +1,45 @@
+import os
+import sys
+import shutil
+import tempfile
+import pytest
+
+# Every store defaults to a path under /tmp shared with real runs; point them
+# at a scratch directory before any app module reads its settings.
+_SCRATCH = tempfile.mkdtemp(prefix="docgen_tests_")
+for name, relative in {
+    "DOCGEN_ARCHIVE_CACHE_DIR": "archives",
+    "DOCGEN_ARTIFACT_DIR": "artifacts",
+    "DOCGEN_CHECKPOINT_PATH": "checkpoints.sqlite",
+    "DOCGEN_LLM_CACHE_PATH": "llm_cache.sqlite",
+    "DOCGEN_MANIFEST_PATH": "manifests.sqlite",
+    "DOCGEN_QUEUE_PATH": "jobs.sqlite",
+    "DOCGEN_WORKSPACE_DIR": "workspaces",
+}.items():
+    os.environ[name] = os.path.join(_SCRATCH, relative)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_SCRATCH, ignore_errors=True)
+
+
+@pytest.fixture
+def github(monkeypatch, tmp_path):
+    from app.utils import archive_cache, file_ops
+    from tests.github_standin import GitHubStandIn
+    standin = GitHubStandIn()
+    monkeypatch.setenv("GITHUB_API_URL", standin.url)
+    monkeypatch.setattr(file_ops, "GITHUB_API_URL", standin.url)
+    monkeypatch.setattr(archive_cache, "ARCHIVE_CACHE_DIR", str(tmp_path / "archives"))
+    yield standin
+    standin.close()
+
+
+@pytest.fixture
+def workspace():
+    from app.utils.workspace import workspace_manager
+    created = workspace_manager.create()
+    yield created
+    workspace_manager.release(created.id)
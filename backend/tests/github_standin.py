@@ -0,0 +1,73 @@
+import io
+import time
+import zipfile
+import threading
+import http.server
+
+
+def make_zip(files: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, text in files.items():
+            archive.writestr(name, text)
+    return buffer.getvalue()
+
+
+class GitHubStandIn:
+    """
+    Serves the two GitHub endpoints clone_github_repo talks to: the commit
+    lookup of the REST API and the archive download, both honouring
+    If-None-Match. Counts what it served.
+    """
+
+    def __init__(self):
+        self.commit = "a" * 40
+        self.commit_status = 200
+        self.archive = make_zip({"repo-main/main.py": "def run():\n    pass\n"})
+        self.archive_delay = 0.0
+        self.counts = {"api": 0, "archive": 0, "not_modified": 0}
+        self._lock = threading.Lock()
+        standin = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.startswith("/repos/"):
+                    standin._count("api")
+                    if standin.commit_status != 200:
+                        return self._reply(standin.commit_status)
+                    return self._conditional(f'"{standin.commit}"', standin.commit.encode())
+                if self.path.endswith(".zip"):
+                    standin._count("archive")
+                    time.sleep(standin.archive_delay)
+                    return self._conditional(f'"zip-{len(standin.archive)}"', standin.archive)
+                self._reply(404)
+
+            def _conditional(self, etag: str, body: bytes):
+                if self.headers.get("If-None-Match") == etag:
+                    standin._count("not_modified")
+                    return self._reply(304)
+                self._reply(200, body, {"ETag": etag})
+
+            def _reply(self, status: int, body: bytes = b"", headers: dict = None):
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.repo_url = f"{self.url}/octo/demo"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counts[name] += 1
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,88 @@
+import io
+import json
+import zipfile
+import threading
+import pytest
+from fastapi.testclient import TestClient
+from app import main
+from app.utils import jobs
+from app.utils.job_queue import JobQueue
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # Jobs are queued but no worker runs them; the tests play the worker.
+    manager = jobs.JobManager(JobQueue(path=str(tmp_path / "jobs.sqlite")), embedded_workers=0)
+    monkeypatch.setattr(main, "job_manager", manager)
+    monkeypatch.setattr(jobs, "POLL_SECONDS", 0.01)
+    with TestClient(main.app) as client:
+        client.jobs = manager
+        yield client
+
+
+def _archive() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("repo/main.py", "def main():\n    return 1\n")
+    return buffer.getvalue()
+
+
+def _submit(client) -> str:
+    response = client.post("/jobs", data={"input_type": "zip"},
+                           files={"zip_file": ("repo.zip", _archive(), "application/zip")})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "queued" and body["events_url"] == f"/jobs/{body['job_id']}/events"
+    return body["job_id"]
+
+
+def _complete(client, job_id: str):
+    queue = client.jobs.queue
+    assert queue.claim("worker")["id"] == job_id
+    queue.publish(job_id, {"type": "node", "node": "fetch_code", "status": "completed"})
+    queue.finish(job_id, "worker", "completed", result={"readme": "# Demo"})
+
+
+def test_job_lifecycle(client):
+    job_id = _submit(client)
+    job = client.get(f"/jobs/{job_id}").json()
+    assert job["status"] == "queued" and job["progress"]["completed_nodes"] == []
+    assert client.post(f"/jobs/{job_id}/resume").status_code == 409
+
+    _complete(client, job_id)
+    job = client.get(f"/jobs/{job_id}").json()
+    assert job["status"] == "completed" and job["progress"]["completed_nodes"] == ["fetch_code"]
+    assert job["result"]["readme"] == "# Demo"
+    assert client.get("/jobs/unknown").status_code == 404
+    assert client.get("/jobs/unknown/events").status_code == 404
+
+
+def test_identical_uploads_share_a_job(client):
+    assert _submit(client) == _submit(client)
+
+
+def test_sse_stream(client):
+    job_id = _submit(client)
+    _complete(client, job_id)
+    response = client.get(f"/jobs/{job_id}/events")
+    assert response.headers["content-type"].startswith("text/event-stream")
+    messages = [message for message in response.text.split("\n\n") if message]
+    names = [message.split("\n")[0] for message in messages]
+    assert names == ["event: node", "event: job"]
+    last = json.loads(messages[-1].split("data: ", 1)[1])
+    assert last["status"] == "completed"
+
+
+def test_ndjson_stream_sends_ping_objects_while_idle(client, monkeypatch):
+    monkeypatch.setattr(main, "EVENTS_KEEPALIVE_SECONDS", 0.05)
+    job_id = _submit(client)
+    timer = threading.Timer(0.3, _complete, (client, job_id))
+    timer.start()
+    response = client.get(f"/jobs/{job_id}/events", params={"format": "ndjson"})
+    timer.join()
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    # Every line is an object, keep-alives included.
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events[0] == {"type": "ping"}
+    assert [event["type"] for event in events if event["type"] != "ping"] == ["node", "job"]
+    assert events[-1]["status"] == "completed"
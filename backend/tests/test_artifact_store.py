@@ -0,0 +1,74 @@
+import os
+import time
+import uuid
+import pytest
+from app.utils.artifact_store import ArtifactStore, ArtifactTooLarge
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ArtifactStore(root=str(tmp_path / "artifacts"), ttl=3600, quota_bytes=1000, max_bytes=600)
+
+
+def _write(store: ArtifactStore, data: bytes, filename: str = "docs.zip") -> str:
+    writer = store.writer(filename)
+    with writer as f:
+        f.write(data)
+    return writer.id
+
+
+def _stored_files(store: ArtifactStore) -> list[str]:
+    return [name for name in os.listdir(store.root) if not name.endswith(".lock")]
+
+
+def test_round_trip(store):
+    artifact_id = _write(store, b"hello")
+    meta = store.get(artifact_id)
+    assert meta["filename"] == "docs.zip" and meta["size"] == 5
+    with open(meta["path"], "rb") as f:
+        assert f.read() == b"hello"
+    assert _write(store, b"hello") != artifact_id
+    assert store.get(_write(store, b"hello"))["etag"] == meta["etag"]
+
+
+def test_unknown_and_malformed_ids(store):
+    assert store.get(str(uuid.uuid4())) is None
+    assert store.get("../../etc/passwd") is None
+
+
+def test_oversized_artifact_is_aborted(store):
+    writer = store.writer("big.zip")
+    with pytest.raises(ArtifactTooLarge):
+        with writer as f:
+            f.write(b"x" * 700)
+    assert store.get(writer.id) is None
+    assert _stored_files(store) == []
+
+
+def test_failed_write_leaves_nothing(store):
+    writer = store.writer("docs.zip")
+    with pytest.raises(RuntimeError):
+        with writer as f:
+            f.write(b"partial")
+            raise RuntimeError("boom")
+    assert not os.path.exists(writer.tmp_path)
+
+
+def test_expired_artifacts_are_gone(store):
+    artifact_id = _write(store, b"hello")
+    store.ttl = -1
+    assert store.get(artifact_id) is None
+    store.cleanup()
+    assert _stored_files(store) == []
+
+
+def test_least_recently_used_are_evicted_over_quota(store):
+    first = _write(store, b"a" * 400)
+    second = _write(store, b"b" * 400)
+    old = time.time() - 100
+    os.utime(store._data_path(second), (old, old))
+    # first was read more recently than second.
+    assert store.get(first) is not None
+    third = _write(store, b"c" * 400)
+    assert store.get(second) is None
+    assert store.get(first) is not None and store.get(third) is not None
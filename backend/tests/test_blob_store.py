@@ -0,0 +1,64 @@
+import os
+import threading
+import pytest
+from app.utils.blob_store import BlobStore, get_blob, load_text, store_text
+from app.utils.workspace import WorkspaceManager
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    from app.utils import blob_store
+    manager = WorkspaceManager(root=str(tmp_path / "workspaces"), quota_bytes=1000)
+    monkeypatch.setattr(blob_store, "workspace_manager", manager)
+    return manager
+
+
+def test_identical_text_is_stored_and_charged_once(manager):
+    workspace = manager.create()
+    handle = store_text(workspace.id, "hello")
+    assert handle == store_text(workspace.id, "hello")
+    assert load_text(handle) == "hello"
+    assert workspace.used == len("hello")
+    assert os.listdir(os.path.join(workspace.path, "blobs")) == [handle.rsplit("/", 1)[1]]
+
+
+def test_concurrent_writers_of_the_same_text(manager):
+    # Large enough that the writes overlap.
+    manager.quota_bytes = manager.total_bytes = 64 * 1024 * 1024
+    workspace = manager.create()
+    store = BlobStore(workspace.id)
+    text = "x" * (8 * 1024 * 1024)
+    start = threading.Barrier(8)
+    handles, errors = [], []
+
+    def put():
+        start.wait()
+        try:
+            handles.append(store.put(text))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=put) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == [] and len(set(handles)) == 1
+    assert workspace.used == len(text)
+    # No temporary files are left behind.
+    assert len(os.listdir(store.root)) == 1
+
+
+def test_blob_over_quota_is_not_stored(manager):
+    workspace = manager.create()
+    with pytest.raises(ValueError):
+        store_text(workspace.id, "x" * 2000)
+    assert workspace.used == 0 and manager.used == 0
+    assert not os.listdir(workspace.path)
+
+
+def test_text_without_workspace_stays_inline(manager):
+    assert store_text(None, "inline") == "inline"
+    assert load_text("inline") == "inline"
+    with pytest.raises(ValueError):
+        get_blob("blob:../../etc/passwd")
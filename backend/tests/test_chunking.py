@@ -0,0 +1,54 @@
+from app.utils.chunking import split_code_into_chunks
+from app.utils.tokens import count_tokens
+
+CODE = "".join(
+    f"def function_{i}(value):\n"
+    f"    result = value * {i}\n"
+    f"    return result + {i}\n"
+    "\n"
+    for i in range(30)
+)
+# parse_code records [line, depth] for every definition.
+BOUNDARIES = [[i * 4, 0] for i in range(30)]
+
+
+def test_small_code_is_one_chunk():
+    assert split_code_into_chunks("x = 1\n", max_tokens=100) == ["x = 1\n"]
+
+
+def test_chunks_rejoin_to_original():
+    chunks = split_code_into_chunks(CODE, BOUNDARIES, max_tokens=60)
+    assert len(chunks) > 1
+    assert "".join(chunks) == CODE
+
+
+def test_chunks_respect_budget_and_boundaries():
+    chunks = split_code_into_chunks(CODE, BOUNDARIES, max_tokens=60)
+    for chunk in chunks:
+        assert count_tokens(chunk) <= 60
+        assert chunk.startswith("def function_")
+
+
+def test_prefers_shallow_boundaries():
+    code = (
+        "class A:\n"
+        "    def one(self):\n"
+        "        return 1\n"
+        "    def two(self):\n"
+        "        return 2\n"
+        "class B:\n"
+        "    def three(self):\n"
+        "        return 3\n"
+    )
+    boundaries = [[0, 0], [1, 1], [3, 1], [5, 0], [6, 1]]
+    chunks = split_code_into_chunks(code, boundaries, max_tokens=count_tokens(code[:code.index("class B")]))
+    assert chunks == [code[:code.index("class B")], code[code.index("class B"):]]
+
+
+def test_oversized_definition_is_split_by_lines():
+    code = "".join(f"    x_{i} = {i}\n" for i in range(200))
+    chunks = split_code_into_chunks(code, [], max_tokens=50)
+    assert "".join(chunks) == code
+    # Line by line splitting budgets each line on its own.
+    for chunk in chunks:
+        assert sum(count_tokens(line) for line in chunk.splitlines(keepends=True)) <= 50
@@ -0,0 +1,88 @@
+from app.utils.comment_patch import (
+    apply_insertions, number_lines, parse_insertions, render_comment, resolve_anchor,
+)
+
+PYTHON = (
+    "import os\n"
+    "\n"
+    "def load(path):\n"
+    "    return open(path).read()\n"
+    "\n"
+    "value = load('x')\n"
+)
+
+
+def test_number_lines():
+    assert number_lines("a\nb\n", 7) == "    7| a\n    8| b\n"
+
+
+def test_parse_insertions_ignores_noise_and_bad_entries():
+    response = (
+        "<think>[not json]</think>Here you go:\n"
+        '[{"line": 3, "symbol": " load ", "comment": " Reads a file. "},'
+        ' {"line": "4", "comment": "bad line"},'
+        ' {"line": true, "comment": "bool line"},'
+        ' {"line": 5, "comment": "   "},'
+        ' "junk"]\nThanks'
+    )
+    assert parse_insertions(response) == [{"line": 3, "symbol": "load", "comment": "Reads a file."}]
+    assert parse_insertions("no json here") == []
+    assert parse_insertions("[not json]") == []
+
+
+def test_resolve_anchor():
+    lines = PYTHON.splitlines(keepends=True)
+    assert resolve_anchor(lines, {"line": 3, "symbol": "load"}, 1, 6) == 2
+    # Off by one from the model is tolerated when the symbol is nearby.
+    assert resolve_anchor(lines, {"line": 4, "symbol": "def load"}, 1, 6) == 2
+    assert resolve_anchor(lines, {"line": 2, "symbol": ""}, 1, 6) is None
+    assert resolve_anchor(lines, {"line": 9, "symbol": ""}, 1, 6) is None
+    assert resolve_anchor(lines, {"line": 3, "symbol": "missing"}, 1, 6) is None
+
+
+def test_python_definition_gets_docstring():
+    lines = PYTHON.splitlines(keepends=True)
+    position, rendered = render_comment(lines, 2, "Reads a file.", "py")
+    assert position == 3
+    assert rendered == ['    """Reads a file."""\n']
+
+
+def test_python_statement_gets_line_comment():
+    lines = PYTHON.splitlines(keepends=True)
+    assert render_comment(lines, 5, "Loads x.\nAt import time.", "py") == (5, ["# Loads x.\n", "# At import time.\n"])
+
+
+def test_existing_docstring_is_kept():
+    lines = ["def f():\n", '    """Already here."""\n', "    pass\n"]
+    assert render_comment(lines, 0, "New text", "py") is None
+
+
+def test_unsafe_text_is_refused():
+    lines = ["int main() {\n", "}\n"]
+    assert render_comment(lines, 0, "closes */ early", "c") is None
+    assert render_comment(["<div>\n"], 0, "a -- b", "html") is None
+
+
+def test_block_comment_styles():
+    lines = ["  function f() {\n", "  }\n"]
+    assert render_comment(lines, 0, "Does f.", "js") == (0, ["  /** Does f. */\n"])
+    assert render_comment(lines, 0, "Does f.\nTwice.", "js") == (
+        0, ["  /**\n", "   * Does f.\n", "   * Twice.\n", "   */\n"]
+    )
+    assert render_comment(lines, 0, "Does f.", "go") == (0, ["  // Does f.\n"])
+
+
+def test_apply_insertions_only_adds_lines():
+    code = "a = 1\nb = 2"
+    result, ranges = apply_insertions(code, [(1, ["# b\n"]), (0, ["# a\n"]), (1, ["# more b\n"])])
+    assert result == "# a\na = 1\n# b\n# more b\nb = 2"
+    assert ranges == [(0, 0, 0), (1, 2, 3)]
+    # Removing the inserted lines gives the original back.
+    kept = [line for line in result.splitlines(keepends=True) if not line.startswith("#")]
+    assert "".join(kept) == code
+
+
+def test_apply_insertions_at_end_of_file():
+    result, ranges = apply_insertions("a = 1", [(1, ["# end\n"])])
+    assert result == "a = 1\n# end\n"
+    assert ranges == [(1, 1, 1)]
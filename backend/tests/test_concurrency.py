@@ -0,0 +1,40 @@
+import time
+import threading
+from app.utils import concurrency
+from app.utils.concurrency import map_ordered, provider_slot
+
+
+def test_results_keep_input_order():
+    # Later items finish first.
+    def slow(n):
+        time.sleep((5 - n) * 0.01)
+        return n * n
+
+    finished = []
+    results = map_ordered(slow, range(5), 5, on_result=lambda index, result: finished.append(index))
+    assert results == [0, 1, 4, 9, 16]
+    assert sorted(finished) == [0, 1, 2, 3, 4] and finished[0] == 4
+
+
+def test_single_worker_runs_serially():
+    seen = []
+    assert map_ordered(lambda n: seen.append(n) or n, [3, 1, 2], 1) == [3, 1, 2]
+    assert seen == [3, 1, 2]
+
+
+def test_provider_slot_bounds_requests(monkeypatch):
+    monkeypatch.setitem(concurrency.PROVIDER_CONCURRENCY, "test-provider", 2)
+    in_flight, peak = [0], [0]
+    lock = threading.Lock()
+
+    def request(_):
+        with provider_slot("test-provider"):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+
+    map_ordered(request, range(8), 8)
+    assert peak[0] == 2
@@ -0,0 +1,112 @@
+import io
+import os
+import threading
+import pytest
+from app.utils import archive_cache, file_ops
+from app.utils.file_ops import clone_github_repo, resolve_commit, save_upload
+from app.utils.workspace import WorkspaceManager
+from tests.github_standin import make_zip
+
+
+def test_resolve_commit_revalidates_with_etag(github):
+    assert resolve_commit(github.repo_url, "main") == github.commit
+    assert resolve_commit(github.repo_url, "main") == github.commit
+    assert github.counts == {"api": 2, "archive": 0, "not_modified": 1}
+
+
+def test_resolve_commit_sees_new_push(github):
+    resolve_commit(github.repo_url, "main")
+    github.commit = "b" * 40
+    assert resolve_commit(github.repo_url, "main") == "b" * 40
+    assert github.counts["not_modified"] == 0
+
+
+def test_clone_is_served_from_cache_until_commit_changes(github):
+    first = clone_github_repo(github.repo_url)
+    with open(os.path.join(first, "main.py"), encoding="utf-8") as f:
+        assert f.read() == "def run():\n    pass\n"
+
+    assert clone_github_repo(github.repo_url) == first
+    assert github.counts["archive"] == 1
+
+    github.commit = "c" * 40
+    github.archive = make_zip({"repo-main/main.py": "def run():\n    return 2\n"})
+    second = clone_github_repo(github.repo_url)
+    assert second != first
+    assert github.counts["archive"] == 2
+    with open(os.path.join(second, "main.py"), encoding="utf-8") as f:
+        assert f.read() == "def run():\n    return 2\n"
+
+
+def test_branch_archive_revalidates_without_commit(github):
+    # Without the commit API the branch archive is fetched conditionally.
+    github.commit_status = 404
+    first = clone_github_repo(github.repo_url)
+    assert clone_github_repo(github.repo_url) == first
+    assert github.counts["archive"] == 2
+    assert github.counts["not_modified"] == 1
+
+
+def test_oversized_archive_is_aborted(github, monkeypatch):
+    monkeypatch.setattr(file_ops, "MAX_DOWNLOAD_BYTES", 16)
+    with pytest.raises(ValueError, match="byte limit"):
+        clone_github_repo(github.repo_url)
+    staging = os.path.join(archive_cache.ARCHIVE_CACHE_DIR, "staging")
+    assert not os.listdir(staging)
+    assert not os.path.isdir(os.path.join(archive_cache.ARCHIVE_CACHE_DIR, "entries"))
+
+
+def test_concurrent_clones_download_once(github):
+    github.archive_delay = 0.3
+    paths, errors = [], []
+
+    def clone():
+        try:
+            paths.append(clone_github_repo(github.repo_url))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=clone) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(set(paths)) == 1 and len(paths) == 4
+    assert github.counts["archive"] == 1
+
+
+@pytest.fixture
+def small_workspace(tmp_path):
+    manager = WorkspaceManager(root=str(tmp_path / "workspaces"), quota_bytes=10_000, total_bytes=10_000)
+    return manager.create()
+
+
+def test_upload_is_saved_in_chunks(small_workspace, monkeypatch):
+    monkeypatch.setattr(file_ops, "UPLOAD_CHUNK_BYTES", 64)
+    data = make_zip({"main.py": "x = 1\n" * 50})
+    path, digest = save_upload(io.BytesIO(data), small_workspace)
+    with open(path, "rb") as f:
+        assert f.read() == data
+    assert digest == save_upload(io.BytesIO(data), small_workspace)[1]
+    assert small_workspace.used == 2 * len(data)
+
+
+def test_oversized_upload_is_aborted(small_workspace):
+    data = make_zip({"main.py": "x = 1\n" * 50})
+    with pytest.raises(ValueError, match="byte limit"):
+        save_upload(io.BytesIO(data), small_workspace, max_bytes=len(data) - 1)
+    assert not os.path.exists(small_workspace.file("code.zip"))
+
+
+def test_upload_over_workspace_quota_is_aborted(small_workspace):
+    with pytest.raises(ValueError, match="quota"):
+        save_upload(io.BytesIO(b"x" * 20_000), small_workspace)
+    assert not os.path.exists(small_workspace.file("code.zip"))
+
+
+def test_upload_that_is_not_a_zip_is_rejected(small_workspace):
+    with pytest.raises(ValueError, match="not a valid zip"):
+        save_upload(io.BytesIO(b"plain text"), small_workspace)
+    assert not os.path.exists(small_workspace.file("code.zip"))
@@ -0,0 +1,69 @@
+import re
+import pytest
+from app.graph.nodes import generate_readme
+from app.graph.nodes.generate_readme import chunk_summaries, reduce_code_summaries
+
+
+def _sections(count: int, size: int = 400) -> list[str]:
+    return [f"S{i}:" + "x" * size for i in range(count)]
+
+
+def _merged_parts(prompt: str) -> str:
+    return re.search(r"\n---\n(.*)\n---\n", prompt, re.DOTALL).group(1)
+
+
+@pytest.fixture
+def merges(monkeypatch):
+    prompts = []
+
+    def shorten(prompt):
+        # Keeps the names of the merged sections and halves the rest.
+        prompts.append(prompt)
+        parts = _merged_parts(prompt)
+        names = "+".join(re.findall(r"(?:^|\n\n)([^:\n]+):", parts))
+        return f"{names}:" + "x" * (len(parts) // 4)
+
+    monkeypatch.setattr(generate_readme, "get_llm_response_readme", shorten)
+    return prompts
+
+
+def test_chunks_never_split_a_summary():
+    assert chunk_summaries(["aaa", "bbb", "cc"], max_chars=6) == ["aaa\n\nbbb", "cc"]
+    assert chunk_summaries(["a" * 10, "b"], max_chars=6) == ["a" * 10, "b"]
+
+
+def test_sections_within_budget_are_not_merged(merges, monkeypatch):
+    monkeypatch.setattr(generate_readme, "README_SUMMARY_TOKEN_BUDGET", 10_000)
+    assert reduce_code_summaries(_sections(4)) == "\n\n".join(_sections(4))
+    assert merges == []
+
+
+def test_reduce_merges_level_by_level_in_order(merges, monkeypatch):
+    monkeypatch.setattr(generate_readme, "README_SUMMARY_TOKEN_BUDGET", 150)
+    monkeypatch.setattr(generate_readme, "PARTIAL_CHUNK_CHARS", 900)
+    merged = reduce_code_summaries(_sections(8))
+    # Pairs first; the halved pairs then fit one chunk: 8 -> 4 -> 1.
+    assert len(merges) == 4 + 1
+    assert merged.startswith("S0+S1+S2+S3+S4+S5+S6+S7:")
+
+
+def test_reduce_pairs_sections_that_fill_a_chunk(merges, monkeypatch):
+    monkeypatch.setattr(generate_readme, "README_SUMMARY_TOKEN_BUDGET", 150)
+    monkeypatch.setattr(generate_readme, "PARTIAL_CHUNK_CHARS", 100)
+    reduce_code_summaries(_sections(4))
+    assert _merged_parts(merges[0]) == "\n\n".join(_sections(4)[:2])
+
+
+def test_over_budget_after_the_last_level_is_truncated(monkeypatch):
+    prompts = []
+    # A merge that doesn't shorten anything.
+    monkeypatch.setattr(generate_readme, "get_llm_response_readme",
+                        lambda prompt: prompts.append(prompt) or _merged_parts(prompt))
+    monkeypatch.setattr(generate_readme, "README_SUMMARY_TOKEN_BUDGET", 100)
+    monkeypatch.setattr(generate_readme, "PARTIAL_CHUNK_CHARS", 900)
+    monkeypatch.setattr(generate_readme, "MAX_REDUCE_LEVELS", 2)
+    merged = reduce_code_summaries(_sections(8))
+    # 8 -> 4 -> 2, then the levels run out.
+    assert len(prompts) == 4 + 2
+    assert len(merged) == 100 * 4
+    assert merged.startswith("S0:")
@@ -0,0 +1,72 @@
+import pytest
+from app.graph import graph
+from app.graph.graph import build_graph, decide_branches
+from app.graph.nodes import generate_readme
+from app.models.state import DocGenPreferences, DocGenState
+
+
+def _preferences(**enabled) -> DocGenPreferences:
+    options = {"add_inline_comments": False, "generate_summary": False, "generate_readme": False,
+               "visualize_structure": False}
+    return DocGenPreferences(**{**options, **enabled})
+
+
+def test_branches_follow_preferences():
+    def branches(**enabled):
+        return decide_branches(DocGenState(input_type="upload", input_data=None, preferences=_preferences(**enabled)))
+
+    assert branches() == ["output"]
+    assert branches(visualize_structure=True) == ["visualize_code"]
+    assert branches(generate_readme=True) == ["plan_files"]
+    assert branches(generate_summary=True, visualize_structure=True) == ["plan_files", "visualize_code"]
+
+
+@pytest.fixture
+def run(tmp_path, monkeypatch):
+    folder = tmp_path / "repo"
+    (folder / "pkg").mkdir(parents=True)
+    (folder / "main.py").write_text("def main():\n    return 1\n")
+    (folder / "pkg" / "util.py").write_text("def helper():\n    return 2\n")
+    calls = []
+
+    def summarize_file(file_path, file_info):
+        calls.append("summary")
+        return f"About {file_path}", {"file": file_path, "summary": f"About {file_path}"}
+
+    monkeypatch.setattr(graph, "summarize_file", summarize_file)
+    monkeypatch.setattr(graph, "summarize_small_files", lambda file_paths, repo_data: {})
+    monkeypatch.setattr(generate_readme, "get_llm_response_readme", lambda prompt: calls.append("readme") or "# Readme")
+
+    def run(**enabled):
+        state = DocGenState(input_type="upload", input_data={"repo_path": str(folder)},
+                            preferences=_preferences(**enabled))
+        nodes = []
+        final = None
+        for update in build_graph().stream(state, stream_mode="updates"):
+            nodes.extend(update)
+            final = update.get("output", final)
+        return nodes, final, calls
+
+    return run
+
+
+def test_visualization_alone_skips_the_llm_stages(run):
+    nodes, final, calls = run(visualize_structure=True)
+    assert nodes == ["fetch_code", "parse_code", "visualize_code", "output"]
+    assert calls == []
+    assert "folder_structure_mermaid" in final["visuals"]
+
+
+def test_summaries_without_readme_skip_the_readme(run):
+    nodes, final, calls = run(generate_summary=True)
+    assert "generate_readme" not in nodes and "visualize_code" not in nodes
+    assert calls == ["summary", "summary"]
+    assert sorted(final["summaries"]) == ["main.py", "pkg/util.py"]
+
+
+def test_everything_runs_side_by_side(run):
+    nodes, final, calls = run(generate_summary=True, generate_readme=True, visualize_structure=True)
+    # The diagram is drawn in the same step as the plan, before the README.
+    assert nodes.index("visualize_code") < nodes.index("generate_readme")
+    assert nodes[-1] == "output"
+    assert final["readme"] == "# Readme" and final["visuals"]
@@ -0,0 +1,110 @@
+import time
+import threading
+import pytest
+from app.utils.job_queue import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(path=str(tmp_path / "jobs.sqlite"), lease_seconds=60, max_attempts=2)
+
+
+def _expire(queue: JobQueue, job_id: str):
+    queue._connection().execute("UPDATE jobs SET lease_expires = ? WHERE id = ?", (time.time() - 1, job_id))
+
+
+def test_jobs_are_claimed_in_order(queue):
+    queue.enqueue("a", "{}")
+    queue.enqueue("b", "{}")
+    assert queue.depth() == 2
+    assert queue.claim("w1")["id"] == "a"
+    assert queue.claim("w2")["id"] == "b"
+    assert queue.claim("w3") is None
+
+
+def test_lease_holder_finishes(queue):
+    queue.enqueue("a", "{}")
+    queue.claim("w1")
+    assert queue.renew("a", "w1")
+    assert not queue.renew("a", "w2")
+    assert not queue.finish("a", "w2", "completed")
+    assert queue.finish("a", "w1", "completed", result={"readme": "x"})
+    row = queue.get("a")
+    assert row["status"] == "completed" and row["lease_owner"] is None
+    assert queue.events("a")[-1]["status"] == "completed"
+
+
+def test_expired_lease_is_handed_over(queue):
+    queue.enqueue("a", "{}")
+    queue.claim("w1")
+    assert queue.claim("w2") is None
+    _expire(queue, "a")
+    row = queue.claim("w2")
+    assert row["lease_owner"] == "w2" and row["attempts"] == 2
+    # The first worker lost the job and can't record an outcome any more.
+    assert not queue.renew("a", "w1")
+    assert not queue.finish("a", "w1", "failed", error="late")
+
+
+def test_job_abandoned_too_often_fails_resumable(queue):
+    queue.enqueue("a", "{}")
+    queue.claim("w1")
+    _expire(queue, "a")
+    queue.claim("w2")
+    _expire(queue, "a")
+    assert queue.claim("w3") is None
+    row = queue.get("a")
+    assert row["status"] == "failed" and row["resumable"] == 1
+    assert queue.pinned_workspaces() == set()
+
+    assert queue.requeue("a")
+    assert queue.claim("w3")["attempts"] == 1
+
+
+def test_concurrent_claims_never_share_a_job(queue):
+    for i in range(20):
+        queue.enqueue(f"job{i}", "{}")
+    claimed = []
+
+    def claim(worker: str):
+        while (row := queue.claim(worker)) is not None:
+            claimed.append(row["id"])
+
+    threads = [threading.Thread(target=claim, args=(f"w{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == sorted(f"job{i}" for i in range(20))
+
+
+def test_identical_submissions_coalesce(queue):
+    first = queue.enqueue("a", "{}", dedupe_key="k", memo_seconds=60)
+    assert queue.enqueue("b", "{}", dedupe_key="k", memo_seconds=60)["id"] == "a"
+    assert queue.enqueue("c", "{}", dedupe_key="other", memo_seconds=60)["id"] == "c"
+    assert queue.enqueue("d", "{}")["id"] == "d"
+    assert first["id"] == "a"
+
+    queue.claim("w1")
+    assert queue.enqueue("e", "{}", dedupe_key="k", memo_seconds=60)["id"] == "a"
+    queue.finish("a", "w1", "completed", result={})
+    assert queue.enqueue("f", "{}", dedupe_key="k", memo_seconds=60)["id"] == "a"
+    # Past the memo window a new job runs.
+    assert queue.enqueue("g", "{}", dedupe_key="k", memo_seconds=0)["id"] == "g"
+
+
+def test_failed_jobs_do_not_coalesce(queue):
+    queue.enqueue("a", "{}", dedupe_key="k", memo_seconds=60)
+    queue.claim("w1")
+    queue.finish("a", "w1", "failed", error="boom")
+    assert queue.enqueue("b", "{}", dedupe_key="k", memo_seconds=60)["id"] == "b"
+
+
+def test_prune_removes_old_finished_jobs(queue):
+    queue.enqueue("a", "{}", workspace_id="ws")
+    assert queue.pinned_workspaces() == {"ws"}
+    queue.claim("w1")
+    queue.publish("a", {"type": "progress"})
+    queue.finish("a", "w1", "completed", result={})
+    assert [row["id"] for row in queue.prune(-1)] == ["a"]
+    assert queue.get("a") is None and queue.events("a") == []
@@ -0,0 +1,83 @@
+import os
+import pytest
+from app.models.state import DocGenBudget, DocGenPreferences, DocGenState
+from app.utils import jobs
+from app.utils.job_queue import JobQueue
+from app.utils.jobs import job_key
+from app.utils.workspace import WorkspaceFull, WorkspaceManager
+
+PREFERENCES = DocGenPreferences(
+    add_inline_comments=True, generate_summary=True, generate_readme=True, visualize_structure=False,
+)
+
+
+def _github(url: str, branch: str = None, **changes) -> DocGenState:
+    return DocGenState(**{"input_type": "github", "input_data": url, "branch": branch, "preferences": PREFERENCES,
+                          **changes})
+
+
+def test_equivalent_repo_urls_share_a_key(github):
+    key = job_key(_github(github.repo_url))
+    assert key == job_key(_github(github.repo_url.upper() + ".git/"))
+    assert key == job_key(_github(github.repo_url, branch="main"))
+    assert key != job_key(_github(github.repo_url, branch="dev"))
+
+
+def test_new_commit_changes_key(github):
+    key = job_key(_github(github.repo_url))
+    github.commit = "d" * 40
+    assert job_key(_github(github.repo_url)) != key
+
+
+def test_options_are_part_of_key(github):
+    key = job_key(_github(github.repo_url))
+    other = PREFERENCES.model_copy(update={"add_inline_comments": False})
+    assert job_key(_github(github.repo_url, preferences=other)) != key
+    assert job_key(_github(github.repo_url, budget=DocGenBudget(max_tokens=1000))) != key
+
+
+def test_uploads_are_keyed_by_content():
+    upload = DocGenState(input_type="zip", input_data=None, preferences=PREFERENCES, input_digest="abc")
+    assert job_key(upload) == job_key(upload.model_copy())
+    assert job_key(upload) != job_key(upload.model_copy(update={"input_digest": "def"}))
+    assert job_key(upload.model_copy(update={"input_digest": None})) is None
+
+
+def test_queued_uploads_stay_charged(tmp_path, monkeypatch):
+    manager = WorkspaceManager(root=str(tmp_path / "workspaces"), quota_bytes=1000, total_bytes=1000)
+    monkeypatch.setattr(jobs, "workspace_manager", manager)
+    job_manager = jobs.JobManager(JobQueue(path=str(tmp_path / "jobs.sqlite")), embedded_workers=0)
+
+    upload = manager.create()
+    upload.reserve(700)
+    job = job_manager.submit(DocGenState(input_type="zip", input_data=upload.file("code.zip"), preferences=PREFERENCES,
+                                         workspace_id=upload.id, input_digest="abc"))
+    # The API no longer holds the workspace, but its bytes still count.
+    assert manager.get(upload.id) is None and manager.used == 700
+    with pytest.raises(WorkspaceFull):
+        manager.create().reserve(400)
+
+    # They are given back once the worker that ran the job releases it.
+    assert job_manager.queue.claim("worker")["id"] == job.id
+    manager.adopt(upload.id)
+    manager.release(upload.id)
+    assert manager.used == 0
+
+
+def test_coalesced_submission_releases_its_workspace(tmp_path, monkeypatch):
+    manager = WorkspaceManager(root=str(tmp_path / "workspaces"))
+    monkeypatch.setattr(jobs, "workspace_manager", manager)
+    job_manager = jobs.JobManager(JobQueue(path=str(tmp_path / "jobs.sqlite")), embedded_workers=0)
+
+    def upload() -> DocGenState:
+        workspace = manager.create()
+        workspace.reserve(100)
+        return DocGenState(input_type="zip", input_data=workspace.file("code.zip"), preferences=PREFERENCES,
+                           workspace_id=workspace.id, input_digest="abc")
+
+    first = job_manager.submit(upload())
+    second_upload = upload()
+    assert job_manager.submit(second_upload).id == first.id
+    # Only the job that will run keeps its upload.
+    assert not os.path.exists(manager.path(second_upload.workspace_id))
+    assert os.path.isdir(manager.path(first.workspace_id)) and manager.used == 100
@@ -0,0 +1,86 @@
+import sqlite3
+import threading
+import pytest
+from app.utils.llm_cache import LLMResponseCache, make_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMResponseCache(path=str(tmp_path / "cache.sqlite"), max_bytes=10_000, memory_items=2, evict_every=4)
+
+
+def _stored(cache: LLMResponseCache) -> tuple[int, int, int]:
+    conn = sqlite3.connect(cache.path)
+    try:
+        total = conn.execute("SELECT total FROM llm_cache_size").fetchone()[0]
+        size, count = conn.execute("SELECT COALESCE(SUM(size), 0), COUNT(*) FROM llm_cache").fetchone()
+        return total, size, count
+    finally:
+        conn.close()
+
+
+def test_make_key_separates_fields():
+    assert make_key("m", 0.2, "ab", "c") != make_key("m", 0.2, "a", "bc")
+    assert make_key("m", 0.2, None, "p") == make_key("m", 0.2, "", "p")
+    assert make_key("m", 0.2, "", "p") != make_key("m", 0.3, "", "p")
+
+
+def test_memory_then_disk_then_miss(cache):
+    cache.set("k", "value")
+    assert cache.get("k") == "value"
+    cache.memory.clear()
+    assert cache.get("k") == "value"
+    assert cache.get("missing") is None
+    assert cache.get_stats() == {"memory_hits": 1, "disk_hits": 1, "misses": 1, "writes": 1, "evictions": 0}
+
+
+def test_shared_between_instances(cache, tmp_path):
+    cache.set("k", "value")
+    other = LLMResponseCache(path=cache.path)
+    assert other.get("k") == "value"
+
+
+def test_expired_entries_are_not_served(cache):
+    cache.set("k", "value")
+    cache.ttl = -1
+    assert cache.get("k") is None
+    cache.memory.clear()
+    assert cache.get("k") is None
+    assert _stored(cache)[2] == 0
+
+
+def test_size_total_follows_replacements(cache):
+    cache.set("k", "x" * 100)
+    cache.set("k", "y" * 300)
+    assert _stored(cache) == (300, 300, 1)
+
+
+def test_least_recently_used_are_evicted_over_quota(cache):
+    for i in range(10):
+        cache.set(f"k{i}", "z" * 1500)
+        if i >= 1:
+            # Keep k0 warm on disk.
+            cache.memory.clear()
+            cache.get("k0")
+    total, size, count = _stored(cache)
+    assert total == size <= cache.max_bytes
+    assert cache.get("k0") is not None
+    cache.memory.clear()
+    assert cache.get("k1") is None
+    assert cache.get_stats()["evictions"] > 0
+
+
+def test_concurrent_use_keeps_total_consistent(cache):
+    def work(worker: int):
+        for i in range(40):
+            cache.set(f"{worker}-{i}", "v" * 200)
+            cache.get(f"{worker}-{i}")
+
+    threads = [threading.Thread(target=work, args=(worker,)) for worker in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    total, size, _ = _stored(cache)
+    assert total == size <= cache.max_bytes
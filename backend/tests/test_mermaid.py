@@ -0,0 +1,46 @@
+from app.utils.mermaid import ROOT_ID, build_folder_diagram, escape_label, node_id
+
+
+def _edges(diagram: str) -> list[str]:
+    return [line for line in diagram.splitlines() if "-->" in line]
+
+
+def test_tree_with_folders_first():
+    diagram = build_folder_diagram(["b.py", "src/a.py", "src/lib/c.py"])
+    lines = diagram.splitlines()
+    assert lines[:2] == ["graph TD", f'    {ROOT_ID}["Project_Root"]']
+    assert lines[2] == f'    {ROOT_ID} --> {node_id("src/")}["src/"]'
+    assert f'    {node_id("src/")} --> {node_id("src/lib/")}["lib/"]' in lines
+    assert f'    {node_id("src/lib/")} --> {node_id("src/lib/c.py")}["c.py"]' in lines
+    assert lines[-1] == f'    {ROOT_ID} --> {node_id("b.py")}["b.py"]'
+
+
+def test_ids_do_not_depend_on_siblings():
+    before = build_folder_diagram(["src/a.py"])
+    after = build_folder_diagram(["src/a.py", "src/b.py", "docs/x.md"])
+    assert f'{node_id("src/a.py")}["a.py"]' in before
+    assert f'{node_id("src/a.py")}["a.py"]' in after
+
+
+def test_labels_are_escaped():
+    assert escape_label('a"b<c>&') == "a#quot;b#lt;c#gt;#amp;"
+    assert '["end#quot;.py"]' in build_folder_diagram(['end".py'])
+
+
+def test_wide_folders_are_collapsed():
+    diagram = build_folder_diagram([f"f{i:02}.py" for i in range(10)], max_children=4)
+    edges = _edges(diagram)
+    assert len(edges) == 4
+    assert edges[-1].endswith('["... 7 more items (7 files)"]')
+
+
+def test_deep_folders_are_summarized():
+    diagram = build_folder_diagram(["a/b/c/d.py", "a/b/c/e.py"], max_depth=2)
+    assert f'{node_id("a/b/")}["b/ (2 files)"]' in diagram
+    assert "d.py" not in diagram
+
+
+def test_node_budget_is_respected():
+    paths = [f"pkg{i}/mod{j}/file{k}.py" for i in range(10) for j in range(10) for k in range(10)]
+    diagram = build_folder_diagram(paths, max_nodes=50)
+    assert len(_edges(diagram)) <= 50
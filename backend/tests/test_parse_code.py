@@ -0,0 +1,176 @@
+import pytest
+from app.graph.nodes import parse_code
+from app.graph.nodes.parse_code import _parse_archive_batch, walk_archive, walk_folder
+from tests.github_standin import make_zip
+
+
+def _write(tmp_path, files: dict) -> str:
+    path = tmp_path / "code.zip"
+    path.write_bytes(make_zip(files))
+    return str(path)
+
+
+def test_archive_is_read_in_place(tmp_path):
+    archive = _write(tmp_path, {
+        "repo/main.py": "def main():\n    return 1\n",
+        "repo/README.md": "# Not source\n",
+        "repo/node_modules/dep.js": "function dep() {}\n",
+        "__MACOSX/repo/._main.py": "junk",
+        "repo/venv/bin/activate.py": "x = 1\n",
+        "repo/venv/lib/site.py": "x = 1\n",
+    })
+    structure = walk_archive(archive)
+    assert list(structure) == ["repo/main.py"]
+    assert structure["repo/main.py"]["contains"] == ["main"]
+    assert structure["repo/main.py"]["code"] == "def main():\n    return 1\n"
+
+
+def test_oversized_members_are_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr(parse_code, "MAX_MEMBER_BYTES", 100)
+    archive = _write(tmp_path, {"big.py": "x = 1\n" * 100, "small.py": "y = 2\n"})
+    assert list(walk_archive(archive)) == ["small.py"]
+
+
+def test_archive_over_source_limit_is_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(parse_code, "MAX_ARCHIVE_SOURCE_BYTES", 100)
+    archive = _write(tmp_path, {f"m{i}.py": "x = 1\n" * 5 for i in range(5)})
+    with pytest.raises(ValueError, match="byte limit"):
+        walk_archive(archive)
+
+
+def test_member_larger_than_its_header_is_rejected(tmp_path):
+    archive = _write(tmp_path, {"main.py": "x = 1\n" * 10})
+    # The batch holds members to the size their headers declared.
+    with pytest.raises(ValueError, match="larger than its header"):
+        _parse_archive_batch(archive, None, [("main.py", "python", 6)])
+
+
+SOURCES = {
+    "python": (
+        "# Module comment\n"
+        "import os  # trailing\n\n"
+        "class Greeter:\n"
+        "    \"\"\"Docstrings are code, not comments.\"\"\"\n"
+        "    # Inside the class\n"
+        "    def greet(self, name):\n"
+        "        return f\"hi {name}\"  # why\n\n"
+        "def main():\n"
+        "    def inner():\n"
+        "        pass\n"
+        "    return Greeter().greet(\"x\")\n"
+    ),
+    "javascript": (
+        "// Header\n"
+        "/* block\n   comment */\n"
+        "function add(a, b) { return a + b; } // sum\n"
+        "class Box {\n"
+        "  /** doc */\n"
+        "  open() { return 1; }\n"
+        "}\n"
+        "const x = add(1, 2);\n"
+    ),
+    "java": (
+        "// Header\n"
+        "public class App {\n"
+        "    /* field */\n"
+        "    private int count;\n"
+        "    // method\n"
+        "    public void run() { count++; }\n"
+        "}\n"
+    ),
+    "go": (
+        "package main\n\n"
+        "// Point is a point.\n"
+        "type Point struct { X int }\n\n"
+        "// Run runs.\n"
+        "func Run() int { return 1 } // done\n"
+    ),
+}
+
+
+def _two_pass(source_code: str, lang: str):
+    # The parse as it was before the single walk: strip the comments, then
+    # parse the cleaned code again for names and boundaries.
+    parser = parse_code.get_parser(lang)
+    comment_ranges = []
+
+    def collect_comments(node):
+        if "comment" in node.type:
+            comment_ranges.append((node.start_byte, node.end_byte))
+            return
+        for child in node.children:
+            collect_comments(child)
+
+    collect_comments(parser.parse(source_code.encode("utf-8")).root_node)
+    code_bytes = bytearray(source_code, "utf-8")
+    for start, end in sorted(comment_ranges, reverse=True):
+        del code_bytes[start:end]
+    cleaned = bytes(code_bytes)
+
+    names, boundaries = [], []
+
+    def collect_symbols(node, depth):
+        line = node.start_point[0]
+        if node.type in parse_code.SYMBOL_NODE_TYPES:
+            name_node = node.child_by_field_name("name")
+            if name_node:
+                names.append(cleaned[name_node.start_byte:name_node.end_byte].decode("utf-8").strip())
+            boundaries.append((line, depth))
+        elif depth == 1:
+            boundaries.append((line, 1))
+        for child in node.children:
+            collect_symbols(child, depth + 1)
+
+    collect_symbols(parser.parse(cleaned).root_node, 0)
+    merged = []
+    for line, depth in boundaries:
+        if merged and merged[-1][0] == line:
+            merged[-1][1] = min(merged[-1][1], depth)
+        else:
+            merged.append([line, depth])
+    return names, cleaned.decode("utf-8"), merged
+
+
+@pytest.mark.parametrize("lang", sorted(SOURCES))
+def test_single_walk_matches_two_pass_parse(lang):
+    if parse_code.load_language(lang) is None:
+        pytest.skip(f"No {lang} grammar installed")
+    source_code = SOURCES[lang]
+    assert parse_code.analyze_source(source_code, lang) == _two_pass(source_code, lang)
+
+
+def test_unknown_language_is_passed_through():
+    assert parse_code.analyze_source("anything", "cobol") == ([], "anything", [])
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    files = {}
+    for i in range(40):
+        lang = sorted(SOURCES)[i % len(SOURCES)]
+        extension = parse_code.LANGUAGE_EXTENSIONS[lang][0]
+        files[f"pkg{i % 3}/m{i}{extension}"] = SOURCES[lang].replace("main", f"main{i}")
+    folder = tmp_path / "repo"
+    for name, text in files.items():
+        (folder / name).parent.mkdir(parents=True, exist_ok=True)
+        (folder / name).write_text(text)
+    return str(folder), _write(tmp_path, files)
+
+
+def test_process_pool_matches_serial_parse(corpus, monkeypatch):
+    folder, archive = corpus
+    monkeypatch.setattr(parse_code, "PARSE_WORKERS", 1)
+    serial = (walk_folder(folder), walk_archive(archive))
+    monkeypatch.setattr(parse_code, "PARSE_WORKERS", 2)
+    monkeypatch.setattr(parse_code, "PARALLEL_PARSE_MIN_FILES", 1)
+    monkeypatch.setattr(parse_code, "_parse_pool", None)
+    try:
+        parallel = (walk_folder(folder), walk_archive(archive))
+        # Still there, so neither walk fell back to a serial parse.
+        assert parse_code._parse_pool is not None
+    finally:
+        if parse_code._parse_pool is not None:
+            parse_code._parse_pool.shutdown()
+    for parallel_structure, serial_structure in zip(parallel, serial):
+        assert list(parallel_structure) == list(serial_structure)
+        assert parallel_structure == serial_structure
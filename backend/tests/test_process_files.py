@@ -0,0 +1,133 @@
+import time
+import pytest
+from app.graph import graph
+from app.graph.graph import plan_files, process_files
+from app.models.state import DocGenBudget, DocGenPreferences, DocGenState
+from app.utils import manifest
+from app.utils.blob_store import blob_digest
+from app.utils.scheduler import SKIPPED
+from app.utils.workspace import workspace_manager
+
+REPO = {
+    "main.py": {"code": "def main():\n    return 1\n", "type": "py", "contains": ["main"], "boundaries": [[0, 0]]},
+    "util.py": {"code": "def helper():\n    return 2\n", "type": "py", "contains": ["helper"], "boundaries": [[0, 0]]},
+}
+
+
+@pytest.fixture
+def llm_calls(monkeypatch, tmp_path):
+    monkeypatch.setattr(manifest, "MANIFEST_PATH", str(tmp_path / "manifests.sqlite"))
+    monkeypatch.setattr(manifest, "_local", type(manifest._local)())
+    monkeypatch.setattr(manifest, "_is_setup", False)
+    calls = []
+
+    def summarize_file(file_path, file_info):
+        calls.append(("summary", file_path))
+        return f"About {file_path}", {"file": file_path, "summary": f"About {file_path}"}
+
+    def comment_file(file_path, file_info):
+        calls.append(("comment", file_path))
+        return "# commented\n" + file_info["code"]
+
+    monkeypatch.setattr(graph, "summarize_file", summarize_file)
+    monkeypatch.setattr(graph, "summarize_small_files", lambda file_paths, repo_data: {})
+    monkeypatch.setattr(graph, "comment_file", comment_file)
+    return calls
+
+
+def _run(budget: DocGenBudget = None, comment: bool = True, batches: int = None) -> DocGenState:
+    # Every run is a job of its own, with its own workspace.
+    workspace = workspace_manager.create()
+    state = DocGenState(
+        input_type="github",
+        input_data="https://github.com/octo/demo",
+        branch="main",
+        parsed_data={"repo_path": {file_path: dict(info) for file_path, info in REPO.items()}},
+        preferences=DocGenPreferences(
+            add_inline_comments=comment, generate_summary=True, generate_readme=False, visualize_structure=False,
+        ),
+        budget=budget,
+        workspace_id=workspace.id,
+    )
+    state.file_plan = plan_files(state)["file_plan"]
+    while state.file_plan.pending and batches != 0:
+        state = state.model_copy(update=process_files(state, comment))
+        batches = batches - 1 if batches is not None else None
+    workspace_manager.release(workspace.id)
+    return state
+
+
+def test_concurrent_run_matches_serial_run(llm_calls, monkeypatch):
+    monkeypatch.setitem(REPO, "a/late.py", {"code": "x = 3\n", "type": "py", "contains": [], "boundaries": []})
+    summarize_file = graph.summarize_file
+
+    def slow_first(file_path, file_info):
+        # The first files in repo order finish last.
+        time.sleep(0.05 if file_path == "main.py" else 0)
+        return summarize_file(file_path, file_info)
+
+    monkeypatch.setattr(graph, "summarize_file", slow_first)
+    monkeypatch.setattr(graph, "FILE_CONCURRENCY", 1)
+    serial = _run()
+    # A fresh manifest, so the second run does all the work again.
+    monkeypatch.setattr(graph, "FILE_CONCURRENCY", 8)
+    monkeypatch.setattr(manifest, "MANIFEST_PATH", manifest.MANIFEST_PATH + ".concurrent")
+    monkeypatch.setattr(manifest, "_local", type(manifest._local)())
+    monkeypatch.setattr(manifest, "_is_setup", False)
+    concurrent = _run()
+    assert len(llm_calls) == 2 * 2 * len(REPO)
+    for field in ("summaries", "readme_summaries", "modified_files"):
+        assert list(getattr(concurrent, field)) == list(REPO)
+    assert concurrent.summaries == serial.summaries
+    assert concurrent.readme_summaries == serial.readme_summaries
+    # Each run has its own workspace, so only the blob digests can match.
+    assert [blob_digest(ref) for ref in concurrent.modified_files.values()] == \
+        [blob_digest(ref) for ref in serial.modified_files.values()]
+
+
+def test_second_run_reuses_everything(llm_calls):
+    first = _run()
+    assert sorted(llm_calls) == [("comment", "main.py"), ("comment", "util.py"),
+                                 ("summary", "main.py"), ("summary", "util.py")]
+    llm_calls.clear()
+    second = _run()
+    assert llm_calls == []
+    assert second.summaries == first.summaries
+    assert second.file_plan.reused == 2
+
+
+def test_reused_files_are_not_reported_skipped_past_deadline(llm_calls):
+    _run()
+    llm_calls.clear()
+    state = _run(DocGenBudget(max_seconds=1e-9))
+    assert llm_calls == []
+    assert state.downgraded == {}
+    assert sorted(state.summaries) == ["main.py", "util.py"]
+
+
+def test_files_with_new_work_are_skipped_past_deadline(llm_calls):
+    _run(comment=False)
+    llm_calls.clear()
+    # Summaries are reused but comments were never made for these files.
+    state = _run(DocGenBudget(max_seconds=1e-9))
+    assert llm_calls == []
+    assert state.downgraded == {"main.py": SKIPPED, "util.py": SKIPPED}
+
+
+def test_failed_files_are_reported_as_events(llm_calls, monkeypatch, capsys):
+    events = []
+    monkeypatch.setattr(graph, "emit_progress", events.append)
+
+    def failing(file_path, file_info):
+        raise ConnectionError()
+
+    monkeypatch.setattr(graph, "summarize_file", failing)
+    state = _run(comment=False, batches=1)
+    assert state.file_plan.failed == {"main.py": "ConnectionError", "util.py": "ConnectionError"}
+    assert state.file_plan.pending == ["main.py", "util.py"]
+    # Events arrive in completion order.
+    assert sorted((event for event in events if "error" in event), key=lambda event: event["file"]) == [
+        {"type": "file", "file": "main.py", "error": "ConnectionError"},
+        {"type": "file", "file": "util.py", "error": "ConnectionError"},
+    ]
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,87 @@
+import time
+import pytest
+from app.utils import rate_limiter
+from app.utils.rate_limiter import (
+    AdaptiveRateLimiter, TokenBucket, call_with_rate_limit, is_rate_limit_error, retry_after_seconds,
+)
+
+
+class APIError(Exception):
+    def __init__(self, message: str, status_code: int = None, headers: dict = None):
+        super().__init__(message)
+        if status_code is not None:
+            self.status_code = status_code
+        if headers is not None:
+            self.response = type("Response", (), {"headers": headers})()
+
+
+@pytest.mark.parametrize("message", [
+    "Error code: 429 - {'error': {'code': 'rate_limit_exceeded'}}",
+    "API error occurred: Status 429\n{\"message\": \"Requests rate limit exceeded\"}",
+    "HTTP/1.1 429 Too Many Requests",
+    "Rate limit exceeded for model",
+])
+def test_rate_limit_messages(message):
+    assert is_rate_limit_error(APIError(message))
+
+
+@pytest.mark.parametrize("message", [
+    "prompt is 14290 tokens, over the context window",
+    "request req_429abc failed",
+    "line 429: unexpected token",
+])
+def test_429_elsewhere_in_message_is_not_rate_limit(message):
+    assert not is_rate_limit_error(APIError(message))
+
+
+def test_status_code_decides():
+    assert is_rate_limit_error(APIError("anything", status_code=429))
+    assert not is_rate_limit_error(APIError("Status 429 upstream", status_code=500))
+
+
+def test_retry_after_sources():
+    assert retry_after_seconds(APIError("x", headers={"retry-after": "3"}), 0) == 3.0
+    assert retry_after_seconds(APIError("Please try again in 1m2.5s"), 0) == 62.5
+    assert 2.0 <= retry_after_seconds(APIError("x"), 0) <= 3.0
+
+
+def test_bucket_waits_for_refill():
+    bucket = TokenBucket(per_minute=60)
+    bucket.consume(bucket.capacity)
+    assert bucket.wait_time(1, 1.0) == pytest.approx(1.0)
+    assert bucket.wait_time(1, 0.5) == pytest.approx(2.0)
+
+
+def test_aimd_scale():
+    limiter = AdaptiveRateLimiter(rpm=600, tpm=1_000_000)
+    limiter.on_rate_limited(0)
+    limiter.on_rate_limited(0)
+    assert limiter.scale == pytest.approx(0.25)
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.scale == 1.0
+    for _ in range(20):
+        limiter.on_rate_limited(0)
+    assert limiter.scale == rate_limiter.MIN_SCALE
+
+
+def test_call_retries_rate_limits_and_raises_others(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_limiters", {})
+    monkeypatch.setitem(rate_limiter.PROVIDER_LIMITS, "test", {"rpm": 6000.0, "tpm": 1e9})
+    calls = []
+
+    def request():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise APIError("slow down", status_code=429, headers={"retry-after": "0"})
+        return "ok"
+
+    assert call_with_rate_limit("test", "model", request, 10) == "ok"
+    assert len(calls) == 2
+    assert rate_limiter.get_limiter("test", "model").scale < 1.0
+
+    def broken():
+        raise APIError("bad request", status_code=400)
+
+    with pytest.raises(APIError):
+        call_with_rate_limit("test", "model", broken, 10)
@@ -0,0 +1,98 @@
+import pytest
+from app.graph import graph
+from app.graph.nodes import generate_readme
+from app.models.state import DocGenPreferences, DocGenState
+from app.utils import manifest
+from app.utils.checkpoints import get_checkpointer
+from app.utils.job_queue import JobQueue
+from app.utils.jobs import Worker, get_graph
+
+FILES = [f"m{i}.py" for i in range(7)]
+
+
+@pytest.fixture
+def repo(tmp_path):
+    folder = tmp_path / "repo"
+    folder.mkdir()
+    for i, name in enumerate(FILES):
+        (folder / name).write_text(f"def f{i}():\n    return {i}\n")
+    return folder
+
+
+@pytest.fixture
+def llm(monkeypatch, tmp_path):
+    monkeypatch.setattr(manifest, "MANIFEST_PATH", str(tmp_path / "manifests.sqlite"))
+    monkeypatch.setattr(manifest, "_local", type(manifest._local)())
+    monkeypatch.setattr(manifest, "_is_setup", False)
+    monkeypatch.setattr(graph, "FILE_BATCH_SIZE", 2)
+    calls = []
+    failures = {"m3.py": 1, "readme": 0}
+
+    def summarize_file(file_path, file_info):
+        calls.append(file_path)
+        if failures.get(file_path):
+            failures[file_path] -= 1
+            raise ConnectionError("provider unavailable")
+        return f"About {file_path}", {"file": file_path, "summary": f"About {file_path}"}
+
+    def readme(prompt):
+        calls.append("readme")
+        if failures["readme"]:
+            failures["readme"] -= 1
+            raise RuntimeError("worker died")
+        return "# Readme"
+
+    monkeypatch.setattr(graph, "summarize_file", summarize_file)
+    # One file at a time, so batches keep to FILE_BATCH_SIZE.
+    monkeypatch.setattr(graph, "pack_small_files", lambda file_paths, repo_data: [])
+    monkeypatch.setattr(generate_readme, "get_llm_response_readme", readme)
+    return calls, failures
+
+
+def _checkpoints(job_id: str) -> int:
+    with get_checkpointer().cursor() as cur:
+        return cur.execute("SELECT COUNT(*) FROM checkpoints WHERE thread_id = ?", (job_id,)).fetchone()[0]
+
+
+def test_interrupted_job_resumes_where_it_stopped(repo, llm, tmp_path):
+    calls, failures = llm
+    queue = JobQueue(path=str(tmp_path / "jobs.sqlite"))
+    worker = Worker(1, queue)
+    state = DocGenState(
+        input_type="upload",
+        input_data={"repo_path": str(repo)},
+        preferences=DocGenPreferences(
+            add_inline_comments=False, generate_summary=True, generate_readme=True, visualize_structure=False,
+        ),
+    )
+    queue.enqueue("job-1", state.model_dump_json())
+
+    # m3.py fails in the second batch, which pauses the job after it.
+    with pytest.raises(RuntimeError, match="1 files failed: m3.py"):
+        worker._run(queue.claim(worker.id))
+    row = queue.get("job-1")
+    assert row["status"] == "failed" and row["resumable"]
+    assert sorted(calls) == ["m0.py", "m1.py", "m2.py", "m3.py"]
+    # Only the latest checkpoint is kept, and the finished files' results are
+    # not part of it.
+    assert _checkpoints("job-1") == 1
+    saved = get_graph().get_state({"configurable": {"thread_id": "job-1"}}).values
+    assert saved["summaries"] == {} and saved["file_plan"].pending[0] == "m3.py"
+
+    # The resumed job retries m3.py, then crashes while writing the README.
+    calls.clear()
+    failures["readme"] = 1
+    assert queue.requeue("job-1")
+    with pytest.raises(RuntimeError, match="worker died"):
+        worker._run(queue.claim(worker.id))
+    assert calls == ["m3.py", "m4.py", "m5.py", "m6.py", "readme"]
+
+    # The last resume only redoes the step that crashed.
+    calls.clear()
+    assert queue.requeue("job-1")
+    result = worker._run(queue.claim(worker.id))
+    assert set(calls) == {"readme"}
+    assert sorted(result["summaries"]) == FILES
+    assert result["readme"].startswith("# Readme")
+    assert queue.get("job-1")["status"] == "completed"
+    assert _checkpoints("job-1") == 0
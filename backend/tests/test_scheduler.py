@@ -0,0 +1,65 @@
+from app.models.state import DocGenBudget
+from app.utils import scheduler
+from app.utils.scheduler import FULL, SIGNATURE, SKIPPED, effective_budget, fan_in, plan_treatments, signature_lines
+
+REPO = {
+    "app/main.py": {
+        "code": "from app import util\nimport helpers\n\ndef main():\n    util.run()\n",
+        "contains": ["main"],
+        "boundaries": [[3, 0]],
+    },
+    "app/util.py": {
+        "code": "import helpers\n\ndef run():\n    return helpers.go()\n",
+        "contains": ["run"],
+        "boundaries": [[2, 0]],
+    },
+    "lib/deep/helpers.py": {
+        "code": "def go():\n    return 1\n\n" + "x = 1\n" * 400,
+        "contains": ["go"],
+        "boundaries": [[0, 0]],
+    },
+}
+
+
+def test_effective_budget_applies_server_caps(monkeypatch):
+    assert effective_budget(None) == DocGenBudget()
+    assert effective_budget(DocGenBudget(max_tokens=0, max_seconds=-1)) == DocGenBudget()
+    monkeypatch.setattr(scheduler, "MAX_JOB_TOKENS", 1000)
+    monkeypatch.setattr(scheduler, "MAX_JOB_SECONDS", 60)
+    assert effective_budget(None) == DocGenBudget(max_tokens=1000, max_seconds=60)
+    assert effective_budget(DocGenBudget(max_tokens=500, max_seconds=600)) == DocGenBudget(max_tokens=500, max_seconds=60)
+
+
+def test_signature_lines():
+    assert signature_lines(REPO["app/main.py"]) == ["def main():"]
+    assert signature_lines({"code": "x = 1\n", "contains": [], "boundaries": [[0, 0]]}) == []
+
+
+def test_fan_in_counts_importers():
+    references = fan_in(REPO)
+    assert references["lib/deep/helpers.py"] == 2
+    assert references["app/util.py"] == 1
+    assert references["app/main.py"] == 0
+
+
+def test_unlimited_budget_is_all_full():
+    ranked, treatments = plan_treatments(REPO, list(REPO), DocGenBudget(), comment=False)
+    assert ranked[0] == "app/main.py"
+    assert set(treatments.values()) == {FULL}
+
+
+def test_tight_budget_downgrades_least_important():
+    ranked, _ = plan_treatments(REPO, list(REPO), DocGenBudget(), comment=False)
+    costs = {path: scheduler.estimate_costs(REPO[path], False) for path in REPO}
+    # Room for the two small files in full and a signature of the big one.
+    budget = costs["app/main.py"][0] + costs["app/util.py"][0] + costs["lib/deep/helpers.py"][1]
+    _, treatments = plan_treatments(REPO, list(REPO), DocGenBudget(max_tokens=budget), comment=False)
+    assert treatments == {"app/main.py": FULL, "app/util.py": FULL, "lib/deep/helpers.py": SIGNATURE}
+
+    _, treatments = plan_treatments(REPO, list(REPO), DocGenBudget(max_tokens=1), comment=False)
+    assert set(treatments.values()) == {SKIPPED}
+
+
+def test_comments_cost_more():
+    file_info = REPO["app/util.py"]
+    assert scheduler.estimate_costs(file_info, True)[0] > scheduler.estimate_costs(file_info, False)[0]
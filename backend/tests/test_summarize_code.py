@@ -0,0 +1,110 @@
+import re
+import pytest
+from app.graph import graph
+from app.graph.graph import plan_files, process_files
+from app.graph.nodes import summarize_code
+from app.graph.nodes.summarize_code import pack_small_files, parse_packed_summary_response
+from app.models.state import DocGenBudget, DocGenPreferences, DocGenState
+from app.utils import manifest
+
+SMALL = {f"pkg/m{i}.py": {"code": f"def f{i}():\n    return {i}\n", "type": "py"} for i in range(6)}
+
+
+def test_packed_response_header_variants():
+    response = (
+        "### File: a.py\n- Does a.\n\n"
+        "**File:** `b.py`\n- Does b.\n- And more.\n\n"
+        "File: c d.py\n- Has a space.\n"
+    )
+    parsed = parse_packed_summary_response(response, ["a.py", "b.py", "c d.py"])
+    assert parsed == {
+        "a.py": [{"symbol": None, "summary": "Does a."}],
+        "b.py": [{"symbol": None, "summary": "Does b."}, {"symbol": None, "summary": "And more."}],
+        "c d.py": [{"symbol": None, "summary": "Has a space."}],
+    }
+
+
+def test_packed_response_drops_unusable_sections():
+    response = (
+        "Sure! Here are the summaries.\n"
+        "### File: other.py\n- Not asked for.\n"
+        "### File: a.py\nno bullet here\n"
+        "### File: b.py\n- First b.\n"
+        "### File: b.py\n- Second b.\n"
+    )
+    parsed = parse_packed_summary_response(response, ["a.py", "b.py", "missing.py"])
+    # a.py has no summary lines and missing.py no section; both are retried alone.
+    assert parsed == {"b.py": [{"symbol": None, "summary": "First b."}]}
+    assert parse_packed_summary_response("", ["a.py"]) == {}
+
+
+def test_packs_group_small_files_by_language(monkeypatch):
+    monkeypatch.setattr(summarize_code, "PACK_MAX_FILES", 4)
+    repo = dict(SMALL)
+    repo["big.py"] = {"code": "x = 1\n" * 2000, "type": "py"}
+    repo["empty.py"] = {"code": "\n", "type": "py"}
+    repo["a.js"] = {"code": "function a() {}\n", "type": "js"}
+    repo["b.js"] = {"code": "function b() {}\n", "type": "js"}
+    repo["c.go"] = {"code": "func c() {}\n", "type": "go"}
+    packs = pack_small_files(list(repo), repo)
+    assert packs == [["a.js", "b.js"], ["pkg/m0.py", "pkg/m1.py", "pkg/m2.py", "pkg/m3.py"],
+                     ["pkg/m4.py", "pkg/m5.py"]]
+
+
+@pytest.fixture
+def llm_prompts(monkeypatch, tmp_path, workspace):
+    monkeypatch.setattr(manifest, "MANIFEST_PATH", str(tmp_path / "manifests.sqlite"))
+    monkeypatch.setattr(manifest, "_local", type(manifest._local)())
+    monkeypatch.setattr(manifest, "_is_setup", False)
+    monkeypatch.setattr(graph, "FILE_BATCH_SIZE", 3)
+    prompts = []
+
+    def respond(prompt, language):
+        prompts.append(prompt)
+        paths = re.findall(r"^### File: (.+)$", prompt, re.MULTILINE)
+        if paths:
+            return "\n\n".join(f"### File: {path}\n- Packed summary of {path}." for path in paths)
+        return "- A single file."
+
+    monkeypatch.setattr(summarize_code, "get_llm_response_summary", respond)
+    return prompts
+
+
+def _state(workspace, budget: DocGenBudget = None) -> DocGenState:
+    return DocGenState(
+        input_type="upload",
+        input_data=None,
+        parsed_data={"repo_path": {path: dict(info) for path, info in SMALL.items()}},
+        preferences=DocGenPreferences(
+            add_inline_comments=False, generate_summary=True, generate_readme=False, visualize_structure=False,
+        ),
+        budget=budget,
+        workspace_id=workspace.id,
+    )
+
+
+def _step(state: DocGenState) -> DocGenState:
+    return state.model_copy(update=process_files(state, comment=False))
+
+
+def test_batches_send_whole_packs(llm_prompts, monkeypatch, workspace):
+    monkeypatch.setattr(summarize_code, "PACK_MAX_FILES", 4)
+    state = _state(workspace)
+    state.file_plan = plan_files(state)["file_plan"]
+    # Planning makes no LLM calls; the batches do.
+    assert llm_prompts == []
+    # The batch of 3 grows to the end of its pack of 4.
+    state = _step(state)
+    assert len(llm_prompts) == 1 and state.file_plan.done == 4
+    state = _step(state)
+    assert len(llm_prompts) == 2 and not state.file_plan.pending
+    assert state.summaries == {path: f"Packed summary of {path}." for path in SMALL}
+
+
+def test_packed_requests_respect_the_deadline(llm_prompts, workspace):
+    state = _state(workspace, DocGenBudget(max_seconds=1e-9))
+    state.file_plan = plan_files(state)["file_plan"]
+    while state.file_plan.pending:
+        state = _step(state)
+    assert llm_prompts == []
+    assert set(state.downgraded.values()) == {"skipped"}
@@ -0,0 +1,85 @@
+import os
+import time
+import pytest
+from app.utils.workspace import USAGE_FILE, WorkspaceFull, WorkspaceManager
+
+
+def _manager(root, **options) -> WorkspaceManager:
+    manager = WorkspaceManager(root=str(root), **options)
+    # Collection runs when the tests call it, not on a background thread.
+    manager.start_collector = lambda interval=0: None
+    return manager
+
+
+def test_job_quota(tmp_path):
+    manager = _manager(tmp_path, quota_bytes=100, total_bytes=1000)
+    workspace = manager.create()
+    workspace.reserve(80)
+    with pytest.raises(ValueError):
+        workspace.reserve(30)
+    workspace.settle(80, 50)
+    workspace.reserve(30)
+    assert workspace.used == 80 and manager.used == 80
+
+
+def test_total_is_shared_between_processes(tmp_path):
+    # Two managers on one root stand in for the API and a worker process.
+    api = _manager(tmp_path, quota_bytes=1000, total_bytes=1000)
+    worker = _manager(tmp_path, quota_bytes=1000, total_bytes=1000)
+    api.create().reserve(600)
+    with pytest.raises(WorkspaceFull):
+        worker.create().reserve(500)
+    assert worker.used == api.used == 600
+
+
+def test_detached_workspace_stays_charged_until_adopted_or_released(tmp_path):
+    api = _manager(tmp_path, quota_bytes=1000, total_bytes=1000)
+    worker = _manager(tmp_path, quota_bytes=1000, total_bytes=1000)
+    workspace = api.create()
+    with open(workspace.file("code.zip"), "wb") as f:
+        f.write(b"x" * 300)
+    workspace.reserve(400)
+    api.detach(workspace.id)
+    assert api.used == 400
+    # The adopter re-counts what is actually on disk.
+    adopted = worker.adopt(workspace.id)
+    assert adopted.used == 300 and worker.used == 300
+    worker.release(workspace.id)
+    assert api.used == 0 and not os.path.exists(workspace.path)
+
+
+def test_orphans_are_collected(tmp_path):
+    manager = _manager(tmp_path, quota_bytes=1000, total_bytes=1000, orphan_seconds=60)
+    live = manager.create()
+    orphan = manager.create()
+    pinned = manager.create()
+    for workspace in (live, orphan, pinned):
+        workspace.reserve(100)
+    manager.detach(orphan.id)
+    manager.detach(pinned.id)
+    manager.add_pin_source(lambda: [pinned.id])
+    stale = time.time() - 120
+    for workspace in (live, orphan, pinned):
+        os.utime(workspace.path, (stale, stale))
+
+    assert manager.collect_orphans() == 1
+    assert not os.path.exists(orphan.path)
+    assert os.path.isdir(live.path) and os.path.isdir(pinned.path)
+    # The live workspace was refreshed for other processes' collectors.
+    assert os.path.getmtime(live.path) > stale
+    assert manager.used == 200
+    assert os.path.exists(os.path.join(str(tmp_path), USAGE_FILE))
+
+
+def test_collection_waits_for_pin_sources(tmp_path):
+    manager = _manager(tmp_path, orphan_seconds=60)
+    orphan = manager.create()
+    manager.detach(orphan.id)
+    os.utime(orphan.path, (0, 0))
+
+    def unavailable():
+        raise OSError("queue is locked")
+
+    manager.add_pin_source(unavailable)
+    assert manager.collect_orphans() == 0
+    assert os.path.isdir(orphan.path)